@@ -0,0 +1,547 @@
+"""Reproducible tar.gz writer for runtime layers and dependency archives.
+
+tarfile's defaults leak the build machine into the archive: real mtimes,
+uid/gid and user names, umask-dependent permissions, the order the
+filesystem happens to list directories in, and the gzip header timestamp.
+write_tar_gz() normalizes all of those so identical inputs produce
+bit-identical archives (and therefore identical sha256 digests).
+
+Timestamps come from SOURCE_DATE_EPOCH when set (the usual convention for
+reproducible builds), otherwise 0.
+
+Compression is done pigz-style by ParallelGzipWriter: the tar stream is cut
+into fixed-size blocks that are deflated on a thread pool (zlib releases
+the GIL) and concatenated into one ordinary gzip member.  The output only
+depends on the block size and level, never on the number of threads, so
+archives stay reproducible.
+
+write_zip() uses the same block-parallel deflate to stream files straight
+into a zip (with data descriptors, so nothing is staged or buffered per
+entry).  It writes classic zip only; inputs past the 4 GiB limits are an
+error rather than silently needing ZIP64.
+
+Both writers decide per file whether deflating is worth it (entry_level()):
+already-compressed formats such as PNGs, fonts and nested archives are
+stored as-is, and files of unknown type are sampled first.  The base level
+is chosen per artifact class (ARTIFACT_LEVELS).
+"""
+
+import functools
+import hashlib
+import io
+import os
+import stat
+import struct
+import tarfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+GZIP_BLOCK_SIZE = 128 * 1024
+# Each block is primed with the tail of the previous one so compression
+# barely suffers from the split (deflate can't look back further anyway).
+GZIP_DICT_SIZE = 32 * 1024
+GZIP_LEVEL = 9
+
+# Deflate level per artifact class.  Runtime layers and the extension zip
+# are downloaded by every install, so they get the best compression; the
+# portable zip is large and rebuilt for every Windows release.
+ARTIFACT_LEVELS = {
+    'runtime': 9,    # runtime layers and deltas
+    'deps': 9,       # extension .deps.tar.gz (stored as-is inside the runtime)
+    'extension': 9,  # ocbot-extension.zip
+    'portable': 6,   # Ocbot-<version>-win-x64-portable.zip
+}
+
+# Formats that are already compressed: deflating them again costs time
+# and rarely saves anything.
+STORED_SUFFIXES = frozenset((
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.ico', '.icns',
+    '.woff', '.woff2', '.mp3', '.mp4', '.m4a', '.ogg', '.opus', '.webm',
+    '.gz', '.tgz', '.zip', '.crx', '.xpi', '.jar', '.br', '.xz', '.zst', '.bz2', '.7z',
+))
+# Text formats that always compress well; no need to sample them.
+DEFLATE_SUFFIXES = frozenset((
+    '.js', '.mjs', '.cjs', '.json', '.html', '.css', '.svg', '.txt', '.xml',
+    '.md', '.map', '.ts', '.yml', '.yaml', '.py', '.sh', '.mo', '.pem',
+))
+# Files of other types are sampled: up to three windows (start, middle,
+# end) are deflated at level 1, and the file is stored if they don't shrink.
+SAMPLE_WINDOW = 32 * 1024
+SAMPLE_MIN_SIZE = 4 * 1024
+INCOMPRESSIBLE_RATIO = 0.95
+# Tar entries share one gzip stream, so switching level costs a block
+# boundary; only larger entries are worth storing.
+TAR_STORE_MIN_SIZE = 64 * 1024
+
+
+def _gf2_matrix_times(mat, vec):
+    total = 0
+    i = 0
+    while vec:
+        if vec & 1:
+            total ^= mat[i]
+        vec >>= 1
+        i += 1
+    return total
+
+
+def _gf2_matrix_square(mat):
+    return [_gf2_matrix_times(mat, mat[n]) for n in range(32)]
+
+
+@functools.lru_cache(maxsize=8)
+def _crc32_zeros_operator(length):
+    """Matrix that advances a CRC-32 over `length` zero bytes.
+
+    Built the way zlib's crc32_combine() does it, but returned as a matrix
+    so it can be cached: blocks are all the same size, so combining costs a
+    single matrix-vector product.
+    """
+    # Operator for one zero bit, then squared to two and four zero bits
+    odd = [0xedb88320] + [1 << n for n in range(31)]
+    even = _gf2_matrix_square(odd)
+    odd = _gf2_matrix_square(even)
+
+    result = [1 << n for n in range(32)]
+    while True:
+        # First square puts the operator at one zero byte
+        even = _gf2_matrix_square(odd)
+        if length & 1:
+            result = [_gf2_matrix_times(even, col) for col in result]
+        length >>= 1
+        if not length:
+            break
+        odd = _gf2_matrix_square(even)
+        if length & 1:
+            result = [_gf2_matrix_times(odd, col) for col in result]
+        length >>= 1
+        if not length:
+            break
+    return result
+
+
+def crc32_combine(crc1, crc2, len2):
+    """Return the CRC-32 of A+B given crc32(A), crc32(B) and len(B).
+
+    Python's zlib module doesn't expose zlib's crc32_combine().
+    """
+    if len2 <= 0:
+        return crc1
+    return _gf2_matrix_times(_crc32_zeros_operator(len2), crc1) ^ crc2
+
+
+def _sample_ratio(path, size):
+    """Compressed/uncompressed ratio of a few windows of the file at level 1."""
+    offsets = sorted({0, max(0, size // 2 - SAMPLE_WINDOW // 2), max(0, size - SAMPLE_WINDOW)})
+    sample = bytearray()
+    with open(path, 'rb') as f:
+        for offset in offsets:
+            f.seek(offset)
+            sample += f.read(SAMPLE_WINDOW)
+    if not sample:
+        return 1.0
+    return len(zlib.compress(bytes(sample), 1)) / len(sample)
+
+
+def entry_level(path, size, level):
+    """Return the deflate level for one file: level, or 0 to store it."""
+    if level == 0:
+        return 0
+    suffix = Path(path).suffix.lower()
+    if suffix in STORED_SUFFIXES:
+        return 0
+    if suffix in DEFLATE_SUFFIXES or size < SAMPLE_MIN_SIZE:
+        return level
+    try:
+        return 0 if _sample_ratio(path, size) > INCOMPRESSIBLE_RATIO else level
+    except OSError:
+        return level
+
+
+def _deflate_block(block, zdict, level):
+    """Raw-deflate one block, ending on a byte boundary so blocks concatenate."""
+    if zdict:
+        comp = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, 9, zlib.Z_DEFAULT_STRATEGY, zdict)
+    else:
+        comp = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, 9)
+    data = comp.compress(block) + comp.flush(zlib.Z_SYNC_FLUSH)
+    return data, zlib.crc32(block), len(block)
+
+
+class ParallelDeflater:
+    """Raw-deflate a stream block by block on a shared thread pool.
+
+    Data is buffered into block_size blocks; at most a couple of blocks per
+    worker are in flight, so memory stays bounded for large inputs.  The
+    compressed stream is written to sink in order.  finish() terminates the
+    deflate stream and returns (crc32, uncompressed size, compressed size).
+    """
+
+    def __init__(self, sink, pool, workers, level=GZIP_LEVEL, block_size=GZIP_BLOCK_SIZE):
+        self.sink = sink
+        self.pool = pool
+        self.workers = workers
+        self.level = level
+        self.block_size = block_size
+        self._pending = []
+        self._buffer = bytearray()
+        self._dict = b''
+        self.crc = 0
+        self.size = 0
+        self.compressed_size = 0
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self.block_size:
+            self._submit(bytes(self._buffer[:self.block_size]))
+            del self._buffer[:self.block_size]
+        return len(data)
+
+    def set_level(self, level):
+        """Compress data written from now on at level (0 stores it).
+
+        Changing level ends the current block early; the next one is still
+        primed with its tail, so the split costs only a few bytes.
+        """
+        if level == self.level:
+            return
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        self.level = level
+
+    def _submit(self, block):
+        self._pending.append(self.pool.submit(_deflate_block, block, self._dict, self.level))
+        self._dict = block[-GZIP_DICT_SIZE:]
+        if len(self._pending) >= 2 * self.workers:
+            self._drain(len(self._pending) - self.workers)
+
+    def _drain(self, count):
+        for future in self._pending[:count]:
+            data, crc, length = future.result()
+            self.sink.write(data)
+            self.crc = crc32_combine(self.crc, crc, length)
+            self.size += length
+            self.compressed_size += len(data)
+        del self._pending[:count]
+
+    def finish(self):
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        self._drain(len(self._pending))
+        # Empty final block marks the end of the deflate stream
+        tail = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS).flush()
+        self.sink.write(tail)
+        self.compressed_size += len(tail)
+        return self.crc, self.size, self.compressed_size
+
+
+def _compress_pool(workers):
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ocbot-deflate')
+
+
+class ParallelGzipWriter(io.RawIOBase):
+    """Write-only file object producing a single gzip member on several threads.
+
+    The gzip header carries no timestamp or file name.
+    """
+
+    def __init__(self, fileobj, level=GZIP_LEVEL, workers=None, block_size=GZIP_BLOCK_SIZE):
+        super().__init__()
+        self.fileobj = fileobj
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = _compress_pool(self.workers)
+        self._deflater = ParallelDeflater(fileobj, self._pool, self.workers, level, block_size)
+        xfl = 2 if level == 9 else (4 if level == 1 else 0)
+        self.fileobj.write(b'\x1f\x8b\x08\x00' + struct.pack('<I', 0) + bytes([xfl, 255]))
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self._deflater.write(data)
+
+    def set_level(self, level):
+        self._deflater.set_level(level)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            crc, size, _ = self._deflater.finish()
+            self.fileobj.write(struct.pack('<II', crc, size & 0xffffffff))
+        finally:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            super().close()
+
+
+class HashingWriter(io.RawIOBase):
+    """Pass-through writer that tracks the sha256 and size of what it writes.
+
+    Sits between the compressor and the output file so an archive's digest
+    is known as soon as it is written, without reading it back.
+    """
+
+    def __init__(self, fileobj):
+        super().__init__()
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+
+class HashingReader:
+    """Pass-through reader that tracks the sha256 of what is read from it.
+
+    Wraps each file handed to tarfile, so per-file digests (for layer
+    manifests) come out of the same read that archives the file.
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.sha256.update(data)
+        return data
+
+
+def source_date_epoch():
+    """Return the timestamp stamped on every archive entry."""
+    try:
+        return int(os.environ.get('SOURCE_DATE_EPOCH', '0'))
+    except ValueError:
+        return 0
+
+
+def normalized_mode(st_mode):
+    """Collapse permissions to 0755 (dirs, executables) or 0644 (everything else)."""
+    if stat.S_ISLNK(st_mode):
+        return 0o777
+    if stat.S_ISDIR(st_mode) or st_mode & 0o111:
+        return 0o755
+    return 0o644
+
+
+def iter_entries(entries, include_dirs=True, follow_symlinks=False):
+    """Expand (source path, arcname) pairs into a sorted list of every entry.
+
+    Directories are walked recursively; symlinks (including symlinked
+    directories) are returned as-is rather than followed, unless
+    follow_symlinks is set (zips, which store file contents only).  The
+    result is sorted by arcname so archive order does not depend on the
+    filesystem.
+    """
+    found = []
+    for src, arcname in entries:
+        src = Path(src)
+        if not src.is_dir() or (src.is_symlink() and not follow_symlinks):
+            found.append((src, arcname))
+            continue
+        if include_dirs:
+            found.append((src, arcname))
+        for dirpath, dirnames, filenames in os.walk(src, followlinks=follow_symlinks):
+            rel_dir = Path(dirpath).relative_to(src)
+            if follow_symlinks:
+                _check_link_loops(dirpath, dirnames)
+            for name in dirnames:
+                path = Path(dirpath) / name
+                if include_dirs or (path.is_symlink() and not follow_symlinks):
+                    found.append((path, f'{arcname}/{(rel_dir / name).as_posix()}'))
+            for name in filenames:
+                found.append((Path(dirpath) / name, f'{arcname}/{(rel_dir / name).as_posix()}'))
+    return sorted(found, key=lambda item: item[1])
+
+
+def _check_link_loops(dirpath, dirnames):
+    """Raise if a symlinked dir under dirpath points back at dirpath or an ancestor."""
+    real = os.path.realpath(dirpath)
+    for name in dirnames:
+        path = os.path.join(dirpath, name)
+        if not os.path.islink(path):
+            continue
+        target = os.path.realpath(path)
+        if real == target or real.startswith(target.rstrip(os.sep) + os.sep):
+            raise ValueError(f"Symlink loop: {path} -> {target}")
+
+
+def _normalize(info, mtime):
+    info.mtime = mtime
+    info.uid = info.gid = 0
+    info.uname = info.gname = ''
+    info.mode = normalized_mode(info.mode | {
+        tarfile.DIRTYPE: stat.S_IFDIR,
+        tarfile.SYMTYPE: stat.S_IFLNK,
+    }.get(info.type, stat.S_IFREG))
+    return info
+
+
+def write_tar(tar, entries, extra_files=(), set_level=None, level=GZIP_LEVEL, digests=None):
+    """Add entries to an open TarFile in reproducible form.
+
+    extra_files is a list of (arcname, bytes) written ahead of the entries,
+    for generated metadata that has no file on disk.  set_level, if given,
+    is called with each large entry's entry_level() before it is added.
+    digests, if given, is filled with {arcname: sha256 hex} of every
+    regular file from the entries, hashed as it is archived.
+    """
+    mtime = source_date_epoch()
+    for arcname, data in extra_files:
+        info = _normalize(tarfile.TarInfo(arcname), mtime)
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+
+    for path, arcname in iter_entries(entries):
+        info = _normalize(tar.gettarinfo(str(path), arcname=arcname), mtime)
+        if info.isreg():
+            if set_level:
+                # tarfile buffers up to one record (10 KiB) ahead, so the
+                # switch lands slightly before the entry; harmless.
+                set_level(entry_level(path, info.size, level)
+                          if info.size >= TAR_STORE_MIN_SIZE else level)
+            with open(path, 'rb') as f:
+                if digests is None:
+                    tar.addfile(info, f)
+                else:
+                    reader = HashingReader(f)
+                    tar.addfile(info, reader)
+                    digests[arcname] = reader.sha256.hexdigest()
+        else:
+            tar.addfile(info)
+
+
+def write_tar_gz(dest, entries, extra_files=(), level=GZIP_LEVEL, digests=None):
+    """Write a reproducible tar.gz of (source path, arcname) entries to dest.
+
+    digests is passed on to write_tar().
+    Returns (path, sha256 hex digest, size in bytes) of the written archive.
+    """
+    dest = Path(dest)
+    tmp = dest.with_name(dest.name + '.part')
+    try:
+        with open(tmp, 'wb') as raw:
+            tee = HashingWriter(raw)
+            with ParallelGzipWriter(tee, level=level) as gz:
+                # Stream mode: the gzip writer can't seek or tell
+                with tarfile.open(fileobj=gz, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+                    write_tar(tar, entries, extra_files, set_level=gz.set_level, level=level,
+                              digests=digests)
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return dest, tee.sha256.hexdigest(), tee.size
+
+
+ZIP_LEVEL = 6
+ZIP_READ_SIZE = 1024 * 1024
+_ZIP_LIMIT = 0xFFFFFFFF
+# Bit 3: sizes and CRC follow the data; bit 11: UTF-8 names
+_ZIP_FLAG_DESCRIPTOR = 0x08
+_ZIP_FLAG_UTF8 = 0x800
+
+
+def _dos_datetime(mtime):
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1  # 1980-01-01 00:00
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+def _read_chunks(path):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(ZIP_READ_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _zip_entry(out, pool, workers, path, arcname, level):
+    """Stream one file into the zip; return its central directory record."""
+    st = os.stat(path)
+    if st.st_size >= _ZIP_LIMIT:
+        raise ValueError(f"{path} is {st.st_size} bytes; zip entries over 4 GiB need ZIP64")
+    offset = out.size
+    if offset >= _ZIP_LIMIT:
+        raise ValueError(f"Zip archive passed 4 GiB at {arcname}; ZIP64 is not supported")
+
+    name = arcname.encode('utf-8')
+    flags = 0 if name.isascii() else _ZIP_FLAG_UTF8
+    dos_time, dos_date = _dos_datetime(st.st_mtime)
+
+    if entry_level(path, st.st_size, level) == 0:
+        # Stored: sizes are known up front, so the CRC is computed in a
+        # first pass and the header is complete (no data descriptor, which
+        # streaming unzippers can't handle for stored entries).
+        method = 0
+        crc = 0
+        for chunk in _read_chunks(path):
+            crc = zlib.crc32(chunk, crc)
+        size = csize = st.st_size
+        out.write(struct.pack('<IHHHHHIIIHH', 0x04034b50, 20, flags, method, dos_time, dos_date,
+                              crc, csize, size, len(name), 0) + name)
+        for chunk in _read_chunks(path):
+            out.write(chunk)
+    else:
+        method = 8
+        flags |= _ZIP_FLAG_DESCRIPTOR
+        out.write(struct.pack('<IHHHHHIIIHH', 0x04034b50, 20, flags, method, dos_time, dos_date,
+                              0, 0, 0, len(name), 0) + name)
+        deflater = ParallelDeflater(out, pool, workers, level)
+        for chunk in _read_chunks(path):
+            deflater.write(chunk)
+        crc, size, csize = deflater.finish()
+        out.write(struct.pack('<IIII', 0x08074b50, crc, csize, size))
+
+    return struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | 20, 20, flags, method,
+                       dos_time, dos_date, crc, csize, size, len(name), 0, 0, 0, 0,
+                       (st.st_mode & 0xFFFF) << 16, offset) + name
+
+
+def write_zip(dest, entries, level=ZIP_LEVEL, workers=None):
+    """Stream (source path, arcname) entries into a zip at dest.
+
+    Directories are expanded recursively and symlinks followed; files are
+    read straight from their source, so nothing needs to be staged first.
+    Each file is deflated at level or stored, as entry_level() decides.
+    Returns (path, sha256 hex digest, size in bytes) of the written archive.
+    """
+    dest = Path(dest)
+    tmp = dest.with_name(dest.name + '.part')
+    files = iter_entries(entries, include_dirs=False, follow_symlinks=True)
+    if len(files) >= 0xFFFF:
+        raise ValueError(f"{len(files)} entries; zip archives over 65535 entries need ZIP64")
+
+    workers = workers or os.cpu_count() or 1
+    try:
+        with open(tmp, 'wb') as raw, _compress_pool(workers) as pool:
+            out = HashingWriter(raw)
+            central = [_zip_entry(out, pool, workers, path, arcname, level)
+                       for path, arcname in files]
+            cd_offset = out.size
+            for record in central:
+                out.write(record)
+            cd_size = out.size - cd_offset
+            if out.size >= _ZIP_LIMIT:
+                raise ValueError(f"Zip archive is over 4 GiB; ZIP64 is not supported")
+            out.write(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, len(central), len(central),
+                                  cd_size, cd_offset, 0))
+        os.replace(tmp, dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return dest, out.sha256.hexdigest(), out.size
@@ -0,0 +1,210 @@
+"""Size and packaging-time history for release artifacts.
+
+Every packaging and release step records the artifact it produced (DMG,
+portable zip, installers, extension zip, runtime layers) with its size,
+file count and the wall time of each phase (staging, signing, compression,
+verification, upload...).  Records are appended to a JSON history in the
+dist dir, so `dev.py artifacts-report` can show trends and fail when an
+artifact outgrows its budget.
+
+Budgets live in artifact_budgets.json at the project root (optional):
+
+    {
+      "*": {"max_growth_percent": 5},
+      "dmg-arm64": {"max_size_mb": 220, "max_phase_seconds": {"signing": 300}}
+    }
+
+"*" applies to every artifact; specific entries override its keys.
+"""
+
+import contextlib
+import json
+import threading
+import time
+from pathlib import Path
+
+from common import get_logger, get_project_root
+
+HISTORY_FILE = 'artifact-history.json'
+# Releases are infrequent; this covers a long stretch of them.
+HISTORY_LIMIT = 500
+BUDGETS_FILE = 'artifact_budgets.json'
+CHART_WIDTH = 30
+
+_history_lock = threading.Lock()
+
+
+class PhaseTimer:
+    """Accumulates wall time per named phase.
+
+        timer = PhaseTimer()
+        with timer.phase('compression'):
+            ...
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self._start = time.monotonic()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(name, time.monotonic() - start)
+
+    def add(self, name, seconds):
+        self.phases[name] = round(self.phases.get(name, 0.0) + seconds, 3)
+
+    @property
+    def elapsed(self):
+        return round(time.monotonic() - self._start, 3)
+
+
+def get_history_path():
+    return get_project_root() / 'dist' / HISTORY_FILE
+
+
+def load_history(path=None):
+    path = Path(path) if path else get_history_path()
+    try:
+        history = json.loads(path.read_text())
+    except (OSError, json.JSONDecodeError):
+        return []
+    return history if isinstance(history, list) else []
+
+
+def _mb(size):
+    return f'{size / (1024 * 1024):.1f} MB'
+
+
+def record_artifact(artifact, path, version, phases=None, files=None, total_s=None,
+                    logger=None):
+    """Append one artifact record to the history and log the change since the last one.
+
+    Args:
+        artifact: Stable name across versions, e.g. 'dmg-arm64' or 'win-portable'.
+        path: The artifact file; its size is recorded.
+        version: Product (or layer) version the artifact was built for.
+        phases: {phase name: seconds}, e.g. PhaseTimer.phases.
+        files: Number of files packed into the artifact, if known.
+        total_s: Total wall time; defaults to the sum of the phases.
+    """
+    if logger is None:
+        logger = get_logger()
+    path = Path(path)
+    phases = dict(phases or {})
+    record = {
+        'timestamp': int(time.time()),
+        'artifact': artifact,
+        'file': path.name,
+        'version': version,
+        'size': path.stat().st_size,
+        'files': files,
+        'phases': phases,
+        'total_s': round(total_s if total_s is not None else sum(phases.values()), 3),
+    }
+
+    history_path = get_history_path()
+    with _history_lock:
+        history = load_history(history_path)
+        previous = next((h for h in reversed(history) if h.get('artifact') == artifact), None)
+        history = (history + [record])[-HISTORY_LIMIT:]
+        try:
+            history_path.parent.mkdir(parents=True, exist_ok=True)
+            history_path.write_text(json.dumps(history, indent=2))
+        except OSError as e:
+            logger.warning(f"Could not write artifact history: {e}")
+
+    summary = ', '.join(f"{name} {seconds:.1f}s" for name, seconds in phases.items())
+    logger.info(f"  {artifact}: {_mb(record['size'])} in {record['total_s']:.1f}s"
+                + (f" ({summary})" if summary else ''))
+    if previous:
+        delta = record['size'] - previous['size']
+        logger.info(f"  vs {previous['version']}: {delta / (1024 * 1024):+.1f} MB, "
+                    f"{record['total_s'] - previous.get('total_s', 0):+.1f}s")
+    return record
+
+
+def load_budgets(path=None):
+    """Load size/time budgets, or an empty dict if there are none."""
+    path = Path(path) if path else get_project_root() / BUDGETS_FILE
+    try:
+        budgets = json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        get_logger().warning(f"Ignoring unreadable budgets file {path}: {e}")
+        return {}
+    return budgets if isinstance(budgets, dict) else {}
+
+
+def budget_for(budgets, artifact):
+    return dict(budgets.get('*', {}), **budgets.get(artifact, {}))
+
+
+def check_budgets(record, previous, budget):
+    """Return the budget violations of one record (empty if within budget)."""
+    violations = []
+    name = record['artifact']
+    max_size_mb = budget.get('max_size_mb')
+    if max_size_mb is not None and record['size'] > max_size_mb * 1024 * 1024:
+        violations.append(f"{name} is {_mb(record['size'])} (budget {max_size_mb} MB)")
+    max_growth = budget.get('max_growth_percent')
+    if max_growth is not None and previous and previous['size']:
+        growth = (record['size'] - previous['size']) / previous['size'] * 100
+        if growth > max_growth:
+            violations.append(f"{name} grew {growth:+.1f}% since {previous['version']} "
+                              f"(budget {max_growth}%)")
+    max_total = budget.get('max_total_seconds')
+    if max_total is not None and record.get('total_s', 0) > max_total:
+        violations.append(f"{name} took {record['total_s']:.0f}s (budget {max_total}s)")
+    for phase, limit in budget.get('max_phase_seconds', {}).items():
+        seconds = record.get('phases', {}).get(phase)
+        if seconds is not None and seconds > limit:
+            violations.append(f"{name} {phase} took {seconds:.0f}s (budget {limit}s)")
+    return violations
+
+
+def report(history, budgets=None, artifacts=None, last=10, logger=None):
+    """Log size/time trends per artifact and check the latest record against budgets.
+
+    Returns the list of budget violations.
+    """
+    if logger is None:
+        logger = get_logger()
+    budgets = budgets or {}
+    by_artifact = {}
+    for record in history:
+        by_artifact.setdefault(record.get('artifact'), []).append(record)
+    names = sorted(n for n in by_artifact if n and (not artifacts or n in artifacts))
+    if not names:
+        logger.info("No artifact history recorded yet.")
+        return []
+
+    violations = []
+    for name in names:
+        records = by_artifact[name][-last:]
+        largest = max(r['size'] for r in records) or 1
+        logger.info("=" * 70)
+        logger.info(f"  {name} (last {len(records)} of {len(by_artifact[name])})")
+        prev = None
+        for record in records:
+            bar = '#' * max(1, round(record['size'] / largest * CHART_WIDTH))
+            delta = f"{(record['size'] - prev['size']) / (1024 * 1024):+7.1f}" if prev else ' ' * 7
+            when = time.strftime('%Y-%m-%d', time.localtime(record['timestamp']))
+            logger.info(f"    {when} {record['version']:<16} {_mb(record['size']):>10} {delta} "
+                        f"{record.get('total_s', 0):>7.1f}s  {bar}")
+            prev = record
+        latest = records[-1]
+        if latest.get('phases'):
+            logger.info("    phases: " + ', '.join(f"{phase} {seconds:.1f}s"
+                                                   for phase, seconds in latest['phases'].items()))
+        previous = records[-2] if len(records) > 1 else None
+        violations.extend(check_budgets(latest, previous, budget_for(budgets, name)))
+    logger.info("=" * 70)
+
+    for violation in violations:
+        logger.error(f"Artifact budget exceeded: {violation}")
+    return violations
@@ -1,3 +1,4 @@
+import copy
 import subprocess
 import hashlib
 import json
@@ -6,16 +7,28 @@ import shutil
 import sys
 import platform
 import tarfile
+import threading
 import zipfile
 import urllib.request
 import hashlib
 from pathlib import Path
-from common import get_logger, get_source_dir, get_project_root, get_agent_root, sync_extension_version, get_out_dir_name, get_product_version, get_chromium_version, get_openclaw_version
+from common import copy_tree, format_copy_stats, get_logger, get_source_dir, get_project_root, get_agent_root, sync_extension_version, get_out_dir_name, get_product_version, get_chromium_version, get_openclaw_version
+from concurrent.futures import ThreadPoolExecutor
+from archive import ARTIFACT_LEVELS, write_tar_gz
+from ninja_stats import ninja_log_size, parse_progress, record_build
+from prune import prune_node_modules
 
 # Node.js version to embed
 NODE_VERSION = 'v22.16.0'
 # Cache downloaded Node.js archives here
 NODE_CACHE_DIR = Path.home() / '.cache' / 'ocbot' / 'node'
+# Written to out/<dir>/ after a successful build; see _compute_build_fingerprint()
+BUILD_FINGERPRINT_FILE = '.ocbot_build_fingerprint.json'
+# A queued matrix build starts once this fraction of the job pool is free
+MATRIX_MIN_JOB_SHARE = 0.75
+
+# Serializes prefixed ninja output from concurrent matrix builds
+_output_lock = threading.Lock()
 
 
 def _get_resources_dir(logger, out_dir):
@@ -46,23 +59,12 @@ def _has_openclaw_runtime_deps(openclaw_dir):
     return (openclaw_dir / 'node_modules' / 'tslog' / 'package.json').exists()
 
 
-def _install_node(logger, out_dir):
-    """Download Node.js binary and install into app bundle Resources/node."""
-    resources_dir = _get_resources_dir(logger, out_dir)
-    if not resources_dir:
-        return
-
-    if sys.platform == 'win32':
-        node_dest = resources_dir / 'node.exe'
-    else:
-        node_dest = resources_dir / 'node'
-
-    # Skip if node binary already exists and version matches
-    version_marker = resources_dir / '.node-version'
-    if node_dest.exists() and version_marker.exists() and version_marker.read_text().strip() == NODE_VERSION:
-        logger.info(f"Node.js {NODE_VERSION} already installed, skipping.")
-        return
+def fetch_node_archive(logger):
+    """Download the Node.js archive into NODE_CACHE_DIR if it isn't cached yet.
 
+    Returns (cached_archive, node_bin_path) or (None, None) on failure or
+    unsupported platforms.  Safe to run before the app bundle exists.
+    """
     # Determine platform and architecture for download URL
     if sys.platform == 'darwin':
         arch = platform.machine()  # 'arm64' or 'x86_64'
@@ -77,7 +79,7 @@ def _install_node(logger, out_dir):
         node_bin_path = f'node-{NODE_VERSION}-{node_platform}/node.exe'
     else:
         logger.warning(f"Unsupported platform for Node.js embedding: {sys.platform}")
-        return
+        return None, None
 
     download_url = f'https://nodejs.org/dist/{NODE_VERSION}/{archive_name}'
 
@@ -88,31 +90,61 @@ def _install_node(logger, out_dir):
     if not cached_archive.exists():
         logger.info(f"Downloading Node.js {NODE_VERSION} for {node_platform}...")
         logger.info(f"  URL: {download_url}")
+        # Download to a temp name so a concurrent reader never sees a partial file
+        partial = cached_archive.with_name(cached_archive.name + '.part')
         try:
-            urllib.request.urlretrieve(download_url, cached_archive)
+            urllib.request.urlretrieve(download_url, partial)
+            os.replace(partial, cached_archive)
         except Exception as e:
             logger.error(f"Failed to download Node.js: {e}")
-            if cached_archive.exists():
-                cached_archive.unlink()
-            return
+            if partial.exists():
+                partial.unlink()
+            return None, None
         logger.info(f"  Cached to {cached_archive}")
     else:
         logger.info(f"Using cached Node.js archive: {cached_archive}")
 
+    return cached_archive, node_bin_path
+
+
+def _install_node(logger, out_dir):
+    """Download Node.js binary and install into app bundle Resources/node.
+
+    Returns True on success.
+    """
+    resources_dir = _get_resources_dir(logger, out_dir)
+    if not resources_dir:
+        return False
+
+    if sys.platform == 'win32':
+        node_dest = resources_dir / 'node.exe'
+    else:
+        node_dest = resources_dir / 'node'
+
+    # Skip if node binary already exists and version matches
+    version_marker = resources_dir / '.node-version'
+    if node_dest.exists() and version_marker.exists() and version_marker.read_text().strip() == NODE_VERSION:
+        logger.info(f"Node.js {NODE_VERSION} already installed, skipping.")
+        return True
+
+    cached_archive, node_bin_path = fetch_node_archive(logger)
+    if not cached_archive:
+        return False
+
     # Extract the node binary
     logger.info(f"Extracting node binary to {node_dest}...")
     try:
-        if archive_name.endswith('.tar.gz'):
+        if cached_archive.name.endswith('.tar.gz'):
             with tarfile.open(cached_archive, 'r:gz') as tar:
                 member = tar.getmember(node_bin_path)
                 f = tar.extractfile(member)
                 if f is None:
                     logger.error(f"Could not extract {node_bin_path} from archive")
-                    return
+                    return False
                 node_dest.parent.mkdir(parents=True, exist_ok=True)
                 with open(node_dest, 'wb') as out:
                     out.write(f.read())
-        elif archive_name.endswith('.zip'):
+        elif cached_archive.name.endswith('.zip'):
             with zipfile.ZipFile(cached_archive, 'r') as zf:
                 with zf.open(node_bin_path) as f:
                     node_dest.parent.mkdir(parents=True, exist_ok=True)
@@ -120,7 +152,7 @@ def _install_node(logger, out_dir):
                         out.write(f.read())
     except Exception as e:
         logger.error(f"Failed to extract Node.js binary: {e}")
-        return
+        return False
 
     # Ensure executable permission on Unix
     if sys.platform != 'win32':
@@ -129,6 +161,7 @@ def _install_node(logger, out_dir):
     size_mb = node_dest.stat().st_size / (1024 * 1024)
     logger.info(f"Node.js installed to {node_dest} ({size_mb:.1f} MB)")
     version_marker.write_text(NODE_VERSION)
+    return True
 
 
 def _install_extension_deps(logger, openclaw_dest, *, official=False):
@@ -138,11 +171,13 @@ def _install_extension_deps(logger, openclaw_dest, *, official=False):
     production node_modules.  These archives are extracted on demand at
     runtime (by run.py or RuntimeManager) when a channel is configured —
     so the app starts fast and only pays the cost of extraction for
-    channels that are actually used.
+    channels that are actually used.  Returns False if pruning broke an
+    extension's dependencies (no archive is written for it).
     """
     extensions_dir = openclaw_dest / 'extensions'
     if not extensions_dir.is_dir():
-        return
+        return True
+    ok = True
 
     _shell = sys.platform == 'win32'
     for ext_dir in sorted(extensions_dir.iterdir()):
@@ -204,26 +239,36 @@ def _install_extension_deps(logger, openclaw_dest, *, official=False):
                     logger.warning(f"npm install produced no node_modules for {ext_dir.name}")
                     continue
 
-                # Create compressed archive
-                with tarfile.open(archive_path, 'w:gz') as tar:
-                    tar.add(str(tmp_nm), arcname='node_modules')
+                # Keep prebuilds for every arch: universal macOS bundles need both
+                prune_node_modules(tmp_nm, platform=sys.platform, logger=logger)
+
+                # Create compressed archive (reproducible, see archive.py)
+                write_tar_gz(archive_path, [(tmp_nm, 'node_modules')],
+                             level=ARTIFACT_LEVELS['deps'])
 
                 size_kb = archive_path.stat().st_size / 1024
                 logger.info(f"  {ext_dir.name}: .deps.tar.gz ({size_kb:.0f} KB)")
         except (subprocess.CalledProcessError, FileNotFoundError) as e:
             logger.warning(f"Failed to build dep archive for {ext_dir.name}: {e}")
+        except RuntimeError as e:
+            logger.error(f"{ext_dir.name}: {e}")
+            ok = False
+    return ok
 
 
 def _install_openclaw_runtime(logger, out_dir, *, official=False):
-    """Package OpenClaw runtime and install into app bundle Resources/openclaw/."""
+    """Package OpenClaw runtime and install into app bundle Resources/openclaw/.
+
+    Returns True when the runtime and its dependencies were installed.
+    """
     resources_dir = _get_resources_dir(logger, out_dir)
     if not resources_dir:
-        return
+        return False
 
     openclaw_src = get_project_root().parent / 'openclaw'
     if not openclaw_src.exists():
         logger.warning(f"OpenClaw source not found: {openclaw_src}")
-        return
+        return False
 
     # Ensure OpenClaw is built
     dist_dir = openclaw_src / 'dist'
@@ -235,7 +280,7 @@ def _install_openclaw_runtime(logger, out_dir, *, official=False):
             subprocess.run(['pnpm', 'build'], cwd=openclaw_src, check=True, shell=_shell)
         except (subprocess.CalledProcessError, FileNotFoundError) as e:
             logger.error(f"Failed to build OpenClaw: {e}")
-            return
+            return False
 
     dest = resources_dir / 'openclaw'
     dest.mkdir(parents=True, exist_ok=True)
@@ -266,30 +311,33 @@ def _install_openclaw_runtime(logger, out_dir, *, official=False):
         (dest / 'scripts').mkdir(parents=True, exist_ok=True)
         shutil.copy2(run_node, dest / 'scripts' / 'run-node.mjs')
 
+    pkg_bytes = None
     for item_name, is_dir in items_to_copy:
         src_item = openclaw_src / item_name
         if not src_item.exists():
             logger.warning(f"OpenClaw item not found, skipping: {src_item}")
             continue
         dest_item = dest / item_name
-        if is_dir:
+        if item_name == 'package.json':
+            # Read once: .pkg-hash below is computed from the same bytes
+            pkg_bytes = src_item.read_bytes()
+            dest_item.write_bytes(pkg_bytes)
+            shutil.copystat(src_item, dest_item)
+        elif is_dir:
             # Skip node_modules — pnpm symlinks break outside the monorepo.
             # Root deps are installed via npm below; extension deps installed
             # separately in _install_extension_deps().
             def _ignore_node_modules(directory, contents):
                 return ['node_modules'] if 'node_modules' in contents else []
-            shutil.copytree(src_item, dest_item, symlinks=False,
-                            ignore=_ignore_node_modules)
+            copy_tree(src_item, dest_item, symlinks=False, ignore=_ignore_node_modules)
         else:
             shutil.copy2(src_item, dest_item)
 
     # Install production dependencies (skip if package.json unchanged)
-    pkg_json = dest / 'package.json'
     node_modules = dest / 'node_modules'
     hash_file = dest / '.pkg-hash'
-    pkg_hash = ''
-    if pkg_json.exists():
-        pkg_hash = hashlib.md5(pkg_json.read_bytes()).hexdigest()
+    deps_ok = True
+    pkg_hash = hashlib.md5(pkg_bytes).hexdigest() if pkg_bytes is not None else ''
     if (
         node_modules.exists()
         and hash_file.exists()
@@ -337,6 +385,7 @@ def _install_openclaw_runtime(logger, out_dir, *, official=False):
             if hash_file.exists():
                 hash_file.unlink()
             logger.error(f"OpenClaw runtime dependencies are incomplete at {dest / 'node_modules'}")
+            deps_ok = False
         elif pkg_hash:
             hash_file.write_text(pkg_hash)
 
@@ -345,7 +394,7 @@ def _install_openclaw_runtime(logger, out_dir, *, official=False):
     # dependencies that aren't in the root package.json.  In the pnpm
     # monorepo these are resolved via workspace symlinks, but those
     # break once copied into the app bundle.
-    _install_extension_deps(logger, dest, official=official)
+    ext_deps_ok = _install_extension_deps(logger, dest, official=official)
 
     # Clean up incomplete plugin directories in dist/extensions/.
     # The openclaw build may produce extension dirs with only index.js or
@@ -363,14 +412,18 @@ def _install_openclaw_runtime(logger, out_dir, *, official=False):
                 logger.info(f"Removed incomplete plugin dir: {ext_dir.name}")
 
     logger.info(f"OpenClaw runtime installed to {dest}")
+    return deps_ok and ext_deps_ok
 
 
 def _install_extension(logger, out_dir):
-    """Copy built extension into the app bundle or build output directory."""
+    """Copy built extension into the app bundle or build output directory.
+
+    Returns True on success.
+    """
     extension_src = get_agent_root() / '.output' / 'chrome-mv3'
     if not extension_src.exists():
         logger.warning(f"Extension build output not found: {extension_src}")
-        return
+        return False
 
     if sys.platform == 'win32':
         # Windows: DIR_RESOURCES resolves to <exe_dir>/resources/
@@ -380,7 +433,7 @@ def _install_extension(logger, out_dir):
         app_dir = out_dir / 'Ocbot.app'
         if not app_dir.exists():
             logger.warning(f"App bundle not found: {app_dir}")
-            return
+            return False
 
         frameworks_dir = app_dir / 'Contents' / 'Frameworks'
         framework = None
@@ -392,15 +445,14 @@ def _install_extension(logger, out_dir):
 
         if not framework:
             logger.warning("Framework bundle not found in app bundle")
-            return
+            return False
 
         dest = framework / 'Resources' / 'ocbot'
 
-    # Remove old copy and replace
-    if dest.exists():
-        shutil.rmtree(dest)
-    shutil.copytree(extension_src, dest)
-    logger.info(f"Extension installed to {dest}")
+    # Replace the old copy. The build output is rewritten, never edited in
+    # place, so it may be hardlinked.
+    stats = copy_tree(extension_src, dest, immutable=True)
+    logger.info(f"Extension installed to {dest} ({format_copy_stats(stats)})")
 
     # Copy menu bar icon to Framework Resources (macOS only).
     if sys.platform != 'win32':
@@ -409,48 +461,121 @@ def _install_extension(logger, out_dir):
             icon_dest = framework / 'Resources' / 'ocbot_toolbar_icon.png'
             shutil.copy2(icon_src, icon_dest)
             logger.info(f"Status bar icon installed to {icon_dest}")
+    return True
+
 
+# First four bytes of thin Mach-O files (MH_MAGIC/MH_CIGAM, 32 and 64 bit)
+_MACHO_MAGICS = {
+    b'\xfe\xed\xfa\xce', b'\xce\xfa\xed\xfe',
+    b'\xfe\xed\xfa\xcf', b'\xcf\xfa\xed\xfe',
+}
+# Fat (universal) headers: FAT_MAGIC/FAT_CIGAM and their 64-bit variants
+_FAT_MAGICS = {
+    b'\xca\xfe\xba\xbe', b'\xbe\xba\xfe\xca',
+    b'\xca\xfe\xba\xbf', b'\xbf\xba\xfe\xca',
+}
 
-def _is_macho(path):
-    """Check if a file is a Mach-O binary."""
+
+def macho_kind(path):
+    """Return 'thin' or 'fat' for Mach-O files, None for anything else.
+
+    Reads the header bytes instead of forking `file`.  Java class files share
+    0xCAFEBABE with fat binaries; they are told apart by the next word, which
+    is a small architecture count for fat files and the class version (>= 45)
+    for Java.
+    """
     try:
-        result = subprocess.run(
-            ['file', '--brief', str(path)],
-            capture_output=True, text=True, check=True
-        )
-        return 'mach-o' in result.stdout.lower()
-    except subprocess.CalledProcessError:
-        return False
+        with open(path, 'rb') as f:
+            header = f.read(8)
+    except OSError:
+        return None
+    magic = header[:4]
+    if magic in _MACHO_MAGICS:
+        return 'thin'
+    if magic in _FAT_MAGICS and len(header) == 8:
+        order = 'big' if magic[:2] == b'\xca\xfe' else 'little'
+        nfat_arch = int.from_bytes(header[4:], order)
+        if 0 < nfat_arch < 45:
+            return 'fat'
+    return None
 
 
-def _lipo_merge(logger, universal_app, arm64_app, x64_app):
-    """Walk a .app bundle and lipo-merge all Mach-O binaries from arm64 and x64 builds."""
-    merged = 0
-    skipped = 0
-    for universal_path in universal_app.rglob('*'):
-        if universal_path.is_symlink() or not universal_path.is_file():
-            continue
-        rel = universal_path.relative_to(universal_app)
-        arm64_path = arm64_app / rel
-        x64_path = x64_app / rel
-        if not arm64_path.exists() or not x64_path.exists():
-            continue
-        if not _is_macho(arm64_path):
-            continue
+def _lipo_create(arm64_path, x64_path, output_path):
+    """Default merger for _lipo_merge()."""
+    subprocess.run(
+        ['lipo', '-create', str(arm64_path), str(x64_path), '-output', str(output_path)],
+        check=True, capture_output=True, text=True
+    )
+
+
+def _lipo_merge(logger, universal_app, arm64_app, x64_app, merge=None, jobs=None):
+    """Walk a .app bundle and lipo-merge all Mach-O binaries from arm64 and x64 builds.
+
+    Mach-O detection is done in-process and the merges run on a thread pool.
+    `merge(arm64_path, x64_path, output_path)` defaults to `lipo -create`; any
+    exception it raises marks that file as failed.
+
+    Returns (merged, skipped, failed): lists of relative paths, the latter two
+    as (path, reason) tuples.
+    """
+    if merge is None:
+        merge = _lipo_create
+
+    candidates = []
+    skipped = []
+    for dirpath, _dirnames, filenames in os.walk(universal_app):
+        for name in filenames:
+            universal_path = Path(dirpath) / name
+            if universal_path.is_symlink():
+                continue
+            rel = universal_path.relative_to(universal_app)
+            arm64_path = arm64_app / rel
+            x64_path = x64_app / rel
+            arm64_kind = macho_kind(arm64_path)
+            if arm64_kind is None:
+                continue
+            if arm64_kind == 'fat':
+                skipped.append((rel, 'already universal in arm64 build'))
+            elif not x64_path.exists():
+                skipped.append((rel, 'missing from x64 build'))
+            elif macho_kind(x64_path) != 'thin':
+                skipped.append((rel, 'x64 counterpart is not a thin Mach-O'))
+            else:
+                candidates.append((rel, arm64_path, x64_path, universal_path))
+
+    def _merge(candidate):
+        rel, arm64_path, x64_path, universal_path = candidate
         try:
-            subprocess.run(
-                ['lipo', '-create', str(arm64_path), str(x64_path), '-output', str(universal_path)],
-                check=True, capture_output=True, text=True
-            )
-            merged += 1
+            merge(arm64_path, x64_path, universal_path)
+            return rel, None
         except subprocess.CalledProcessError as e:
-            logger.warning(f"lipo failed for {rel}: {e.stderr.strip()}")
-            skipped += 1
-    logger.info(f"lipo merge complete: {merged} binaries merged, {skipped} skipped")
+            return rel, (e.stderr or str(e)).strip()
+        except Exception as e:
+            return rel, str(e)
+
+    merged = []
+    failed = []
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        for rel, error in pool.map(_merge, candidates):
+            if error is None:
+                merged.append(rel)
+            else:
+                failed.append((rel, error))
+
+    for rel, reason in skipped:
+        logger.warning(f"lipo skipped {rel}: {reason}")
+    for rel, error in failed:
+        logger.error(f"lipo failed for {rel}: {error}")
+    logger.info(f"lipo merge complete: {len(merged)} binaries merged, "
+                f"{len(skipped)} skipped, {len(failed)} failed")
+    return merged, skipped, failed
 
 
 def _create_universal_binary(args):
-    """Merge arm64 and x64 builds into a universal binary .app bundle."""
+    """Merge arm64 and x64 builds into a universal binary .app bundle.
+
+    Returns True when every Mach-O binary was merged.
+    """
     logger = get_logger()
 
     if args.src_dir:
@@ -467,34 +592,139 @@ def _create_universal_binary(args):
 
     if not arm64_app.exists():
         logger.error(f"arm64 app not found: {arm64_app}")
-        return
+        return False
     if not x64_app.exists():
         logger.error(f"x64 app not found: {x64_app}")
-        return
+        return False
 
     # Copy arm64 build as the base for the universal binary
+    # (cloned, never hardlinked: lipo and codesign rewrite these files)
     universal_app = universal_dir / 'Ocbot.app'
-    if universal_app.exists():
-        shutil.rmtree(universal_app)
-    universal_dir.mkdir(parents=True, exist_ok=True)
     logger.info(f"Copying arm64 app as universal base...")
-    shutil.copytree(arm64_app, universal_app, symlinks=True)
+    stats = copy_tree(arm64_app, universal_app)
+    logger.info(f"  {format_copy_stats(stats)}")
 
     # Merge all Mach-O binaries
     logger.info("Merging Mach-O binaries with lipo...")
-    _lipo_merge(logger, universal_app, arm64_app, x64_app)
-
-    # Sync extension version and install into universal app
-    sync_extension_version()
-    _install_extension(logger, universal_dir)
-    _install_node(logger, universal_dir)
-    _install_openclaw_runtime(logger, universal_dir, official=args.official)
+    _merged, _skipped, failed = _lipo_merge(logger, universal_app, arm64_app, x64_app)
+    if failed:
+        logger.error(f"Universal binary is incomplete: {len(failed)} binaries failed to merge")
+        return False
 
     logger.info(f"Universal binary created: {universal_app}")
+    return True
 
 
-def _build_single_arch(args, arch=None):
-    """Build Chromium for a single architecture."""
+def _parse_gn_args(text):
+    """Parse args.gn content into a {name: value} dict, ignoring order, blanks and comments."""
+    parsed = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#') or '=' not in line:
+            continue
+        name, _, value = line.partition('=')
+        parsed[name.strip()] = value.strip()
+    return parsed
+
+
+def _run_version_cmd(cmd, cwd=None):
+    """Return the stripped stdout of a version command, or None if it can't run."""
+    try:
+        result = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+
+def _get_toolchain_versions(src_dir, gn_cmd='gn'):
+    """Collect the toolchain versions that affect build outputs."""
+    versions = {'gn': _run_version_cmd([gn_cmd, '--version'], cwd=src_dir)}
+    # Chromium's pinned clang and rust toolchains record their revision
+    # next to the binaries.
+    for name, rel in (('clang', 'third_party/llvm-build/Release+Asserts/cr_build_revision'),
+                      ('rust', 'third_party/rust-toolchain/VERSION')):
+        path = src_dir / rel
+        versions[name] = path.read_text().strip() if path.is_file() else None
+    if sys.platform == 'darwin':
+        versions['sdk'] = _run_version_cmd(['xcrun', '--show-sdk-version'])
+        versions['xcode'] = _run_version_cmd(['xcodebuild', '-version'])
+    return versions
+
+
+def _get_source_state(src_dir):
+    """Return (HEAD, digest of uncommitted changes) for the Chromium checkout.
+
+    The digest covers `git status` of tracked files plus size/mtime of every
+    listed path, so direct edits in src/ (not yet exported as patches) still
+    invalidate the build fingerprint without hashing file contents.
+    Untracked files are not scanned (too slow on a Chromium tree), and
+    DEPS sub-repos with their own .git are not covered; patches applied to
+    them are, through the patch manifest.
+    """
+    head = _run_version_cmd(['git', 'rev-parse', 'HEAD'], cwd=src_dir)
+    try:
+        result = subprocess.run(
+            ['git', 'status', '--porcelain=v1', '-z', '--untracked-files=no',
+             '--', '.', ':(exclude)out'],
+            cwd=src_dir, capture_output=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return head, None
+
+    # Records are "XY path"; renames and copies are followed by a bare
+    # record with the original path.
+    records = iter(result.stdout.split(b'\0'))
+    changes = []
+    for entry in records:
+        if not entry:
+            continue
+        if entry[0:1] in b'RC' or entry[1:2] in b'RC':
+            entry += b'\0' + next(records, b'')
+        changes.append(entry)
+
+    h = hashlib.sha256()
+    for entry in sorted(changes):
+        h.update(entry + b'\0')
+        path = src_dir / os.fsdecode(entry[3:].split(b'\0')[0])
+        try:
+            st = path.stat()
+            h.update(f'{st.st_size}:{st.st_mtime_ns}'.encode())
+        except OSError:
+            pass
+    return head, h.hexdigest()
+
+
+def _compute_build_fingerprint(src_dir, flags, target, gn_cmd='gn'):
+    """Fingerprint everything that decides whether a ninja build can be a no-op."""
+    manifest = src_dir / '.ocbot_patch_manifest.json'
+    head, worktree = _get_source_state(src_dir)
+    return {
+        'target': target,
+        'gn_args': _parse_gn_args('\n'.join(flags)),
+        'patches': hashlib.sha256(manifest.read_bytes()).hexdigest() if manifest.is_file() else None,
+        'head': head,
+        'worktree': worktree,
+        'toolchain': _get_toolchain_versions(src_dir, gn_cmd),
+    }
+
+
+def _load_build_fingerprint(out_dir):
+    path = out_dir / BUILD_FINGERPRINT_FILE
+    try:
+        return json.loads(path.read_text())
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _prepare_out_dir(args, arch=None):
+    """Write args.gn and run `gn gen` for one out dir when its flags changed.
+
+    Returns (src_dir, out_dir, fingerprint, up_to_date), or None on failure.
+    up_to_date means the recorded build fingerprint matches and ninja can be
+    skipped.
+    """
     logger = get_logger()
 
     if args.src_dir:
@@ -504,7 +734,7 @@ def _build_single_arch(args, arch=None):
 
     if not src_dir.exists():
         logger.error("Source directory not found.")
-        return
+        return None
 
     logger.info("Starting build process...")
     logger.info("NOTE: This requires 'gn' and 'ninja' to be in PATH and depot_tools configured.")
@@ -564,9 +794,10 @@ def _build_single_arch(args, arch=None):
     # Always ensure gn is available and args.gn is correct
     if shutil.which('gn') is None:
             logger.error("'gn' command not found. Please install depot_tools and add to PATH.")
-            return
+            return None
 
-    # Check if args.gn exists and needs updating
+    # Check if args.gn exists and needs updating (compared as a flag set, so
+    # ordering and whitespace differences don't force a regen)
     args_gn_path = out_dir / 'args.gn'
     needs_gen = False
     expected_content = '\n'.join(flags)
@@ -574,7 +805,7 @@ def _build_single_arch(args, arch=None):
     if args_gn_path.exists():
         with open(args_gn_path, 'r') as f:
             content = f.read()
-        if content.strip() != expected_content.strip():
+        if _parse_gn_args(content) != _parse_gn_args(expected_content):
             logger.info("Updating args.gn with current flags...")
             with open(args_gn_path, 'w') as f:
                 f.write(expected_content)
@@ -587,30 +818,314 @@ def _build_single_arch(args, arch=None):
             f.write('\n'.join(flags))
         needs_gen = True
 
-    if needs_gen:
-        gn_cmd = 'gn'
-        if sys.platform == 'win32':
-             # Use gn.bat if it exists, otherwise gn.exe (depot_tools usually has gn.bat wrapping gn.exe)
-             # But gn.exe is the actual binary.
-             # However, subprocess.run(['gn', ...]) usually works because gn is an exe.
-             # Just in case, try to find it.
-             if shutil.which('gn.bat'):
-                 gn_cmd = 'gn.bat'
+    gn_cmd = 'gn'
+    if sys.platform == 'win32':
+         # Use gn.bat if it exists, otherwise gn.exe (depot_tools usually has gn.bat wrapping gn.exe)
+         # But gn.exe is the actual binary.
+         # However, subprocess.run(['gn', ...]) usually works because gn is an exe.
+         # Just in case, try to find it.
+         if shutil.which('gn.bat'):
+             gn_cmd = 'gn.bat'
 
+    if needs_gen:
         subprocess.run([gn_cmd, 'gen', str(out_dir)], cwd=src_dir, check=True)
 
-    logger.info(f"Building {args.target}...")
+    # Skip ninja entirely when nothing that feeds the build has changed
+    fingerprint = _compute_build_fingerprint(src_dir, flags, args.target, gn_cmd)
+    up_to_date = (not needs_gen and not getattr(args, 'force', False)
+                  and _load_build_fingerprint(out_dir) == fingerprint)
+    if up_to_date:
+        logger.info(f"{out_dir.name}/{args.target} is up to date (build fingerprint unchanged), "
+                    "skipping autoninja. Use --force to rebuild anyway.")
+    return src_dir, out_dir, fingerprint, up_to_date
+
+
+def _run_ninja(args, src_dir, out_dir, fingerprint, jobs=None, on_progress=None):
+    """Run autoninja for one out dir, then record telemetry and the build fingerprint.
+
+    By default ninja's output goes straight to the terminal.  With an
+    on_progress(finished, total) callback, output is piped, echoed with the
+    out dir name as prefix, and its [finished/total] status parsed.
+    Returns True on success.
+    """
+    logger = get_logger()
+    logger.info(f"Building {args.target} in {out_dir.name}...")
 
     # On Windows, autoninja is a batch file (autoninja.bat)
     autoninja_cmd = 'autoninja'
     if sys.platform == 'win32':
         autoninja_cmd = 'autoninja.bat'
 
-    subprocess.run([autoninja_cmd, '-C', str(out_dir), args.target], cwd=src_dir)
+    cmd = [autoninja_cmd, '-C', str(out_dir), args.target]
+    if jobs:
+        cmd += ['-j', str(jobs)]
+
+    log_offset = ninja_log_size(out_dir)
+    if on_progress is None:
+        returncode = subprocess.run(cmd, cwd=src_dir).returncode
+    else:
+        env = os.environ.copy()
+        env['NINJA_STATUS'] = '[%f/%t] '
+        proc = subprocess.Popen(cmd, cwd=src_dir, env=env, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, text=True, errors='replace')
+        for line in proc.stdout:
+            with _output_lock:
+                sys.stdout.write(f"[{out_dir.name}] {line}")
+                sys.stdout.flush()
+            progress = parse_progress(line)
+            if progress:
+                on_progress(*progress)
+        returncode = proc.wait()
+
+    record_build(out_dir, log_offset, args.target, returncode, logger)
+    fingerprint_path = out_dir / BUILD_FINGERPRINT_FILE
+    if returncode != 0:
+        logger.error(f"autoninja failed for {out_dir.name} with exit code {returncode}")
+        if fingerprint_path.exists():
+            fingerprint_path.unlink()
+        return False
+
+    fingerprint_path.write_text(json.dumps(fingerprint, indent=2, sort_keys=True))
+    return True
+
+
+def _build_single_arch(args, arch=None):
+    """Build Chromium for a single architecture.
+
+    Returns True when the out dir is built (or already up to date).
+    """
+    prepared = _prepare_out_dir(args, arch)
+    if prepared is None:
+        return False
+    src_dir, out_dir, fingerprint, up_to_date = prepared
+    if up_to_date:
+        return True
+    return _run_ninja(args, src_dir, out_dir, fingerprint, jobs=getattr(args, 'jobs', None))
+
+
+class JobPool:
+    """Ninja job slots shared by concurrent builds in a matrix.
 
+    Ninja can't change -j of a running build, so slots are handed out when
+    a build starts and given back as soon as it can no longer use them
+    (fewer edges left than slots held).  A build only starts once it can get
+    a large share of the pool; otherwise it would be stuck at a low -j for
+    hours after the build it overlapped with finished.
+    """
+
+    def __init__(self, size):
+        self.size = max(1, size)
+        self._free = self.size
+        self._cond = threading.Condition()
+
+    def acquire(self, minimum):
+        """Block until `minimum` slots are free, then take all free slots."""
+        minimum = max(1, min(minimum, self.size))
+        with self._cond:
+            self._cond.wait_for(lambda: self._free >= minimum)
+            granted = self._free
+            self._free = 0
+            return granted
+
+    def release(self, count):
+        if count <= 0:
+            return
+        with self._cond:
+            self._free += count
+            self._cond.notify_all()
 
-def build_chromium(args):
-    """Build Chromium, dispatching to single-arch or universal build."""
+
+def get_build_matrix(args):
+    """Return the [(official, arch)] targets selected by --variant and --arch.
+
+    Both options take comma-separated lists; without --variant the single
+    variant comes from --official.
+    """
+    variant = getattr(args, 'variant', None)
+    variants = variant.split(',') if variant else ['official' if args.official else 'default']
+    arch = getattr(args, 'arch', None)
+    targets = []
+    for v in variants:
+        official = v == 'official'
+        for a in (arch.split(',') if arch else [None]):
+            if a is None and official and sys.platform == 'darwin':
+                a = 'universal'
+            if (official, a) not in targets:
+                targets.append((official, a))
+    return targets
+
+
+def _variant_args(args, official, arch):
+    """Copy of args for one matrix target, so helpers that read args.official/arch just work."""
+    variant = copy.copy(args)
+    variant.official = official
+    variant.arch = arch
+    variant.variant = None
+    return variant
+
+
+def get_build_out_dirs(args):
+    """Return the out dirs that receive the final apps (universal dirs for universal builds)."""
+    if args.src_dir:
+        src_dir = Path(args.src_dir).resolve()
+    else:
+        src_dir = get_source_dir()
+    return [src_dir / 'out' / get_out_dir_name(official, arch)
+            for official, arch in get_build_matrix(args)]
+
+
+def install_bundle_extras(logger, out_dir, *, official=False):
+    """Install extension, Node.js and the OpenClaw runtime into a built out dir.
+
+    Every install is attempted; returns True only if all of them succeeded.
+    """
+    sync_extension_version()
+    results = [
+        _install_extension(logger, out_dir),
+        _install_node(logger, out_dir),
+        _install_openclaw_runtime(logger, out_dir, official=official),
+    ]
+    return all(results)
+
+
+# sync_extension_version() rewrites wxt.config.ts; keep concurrent installs apart
+_install_lock = threading.Lock()
+
+
+def _install_target(logger, args, out_dir, install_ready):
+    if install_ready is not None and not install_ready():
+        logger.error(f"Skipping installs into {out_dir.name}: their inputs failed to build.")
+        return False
+    with _install_lock:
+        ok = install_bundle_extras(logger, out_dir, official=args.official)
+    if not ok:
+        logger.error(f"Installs into {out_dir.name} are incomplete.")
+    return ok
+
+
+def _build_matrix(args, targets, install=True, install_ready=None):
+    """Build several out dirs at once, sharing one pool of ninja job slots.
+
+    All `gn gen` steps run in parallel first.  Ninja builds then start as
+    job slots allow (see JobPool), and each target's post-build installs
+    run as soon as that target (or, for universal, both of its arches) is
+    done.  Returns True when every target built, merged and installed.
+    """
+    logger = get_logger()
+
+    # Universal targets are built as arm64 + x64 and merged afterwards
+    ninja_targets = []
+    for official, arch in targets:
+        for a in (('arm64', 'x64') if arch == 'universal' else (arch,)):
+            if (official, a) not in ninja_targets:
+                ninja_targets.append((official, a))
+    if any(arch == 'universal' for _, arch in targets) and sys.platform != 'darwin':
+        logger.error("Universal binary is macOS only.")
+        return False
+
+    logger.info(f"Build matrix: {', '.join(get_out_dir_name(o, a) for o, a in ninja_targets)}")
+
+    with ThreadPoolExecutor(max_workers=len(ninja_targets), thread_name_prefix='ocbot-gn') as pool:
+        prepared = list(pool.map(lambda t: _prepare_out_dir(_variant_args(args, t[0], t[1]), t[1]),
+                                 ninja_targets))
+    if any(p is None for p in prepared):
+        return False
+    src_dir = prepared[0][0]
+
+    jobs = getattr(args, 'jobs', None) or os.cpu_count() or 1
+    job_pool = JobPool(jobs)
+    results = {}
+    results_lock = threading.Lock()
+    merged = set()
+    # Outcome of each target's post-build steps (universal merge, installs)
+    finished = {}
+
+    def _after_build(official, arch):
+        """Run installs (and universal merges) that became possible."""
+        for t_official, t_arch in targets:
+            if t_official != official:
+                continue
+            t_args = _variant_args(args, t_official, t_arch)
+            if t_arch == 'universal':
+                with results_lock:
+                    parts = [results.get((official, a)) for a in ('arm64', 'x64')]
+                    ready = arch in ('arm64', 'x64') and all(parts) and official not in merged
+                    if ready:
+                        merged.add(official)
+                if not ready:
+                    continue
+                ok = _create_universal_binary(t_args)
+                if ok and install:
+                    out_dir = src_dir / 'out' / get_out_dir_name(official, 'universal')
+                    ok = _install_target(logger, t_args, out_dir, install_ready)
+            elif t_arch == arch and install:
+                out_dir = prepared[ninja_targets.index((official, arch))][1]
+                ok = _install_target(logger, t_args, out_dir, install_ready)
+            else:
+                continue
+            with results_lock:
+                finished[(t_official, t_arch)] = ok
+
+    def _build(index):
+        official, arch = ninja_targets[index]
+        t_args = _variant_args(args, official, arch)
+        _, out_dir, fingerprint, up_to_date = prepared[index]
+        ok = True
+        if not up_to_date:
+            held = job_pool.acquire(int(jobs * MATRIX_MIN_JOB_SHARE))
+            held_lock = threading.Lock()
+            logger.info(f"{out_dir.name}: starting ninja with -j{held}")
+
+            def _on_progress(finished, total):
+                # Hand back slots this build can no longer fill
+                nonlocal held
+                with held_lock:
+                    surplus = held - max(1, total - finished)
+                    if surplus > 0:
+                        held -= surplus
+                        job_pool.release(surplus)
+
+            try:
+                ok = _run_ninja(t_args, src_dir, out_dir, fingerprint, jobs=held,
+                                on_progress=_on_progress)
+            finally:
+                with held_lock:
+                    job_pool.release(held)
+                    held = 0
+        with results_lock:
+            results[(official, arch)] = ok
+        if ok:
+            _after_build(official, arch)
+        return ok
+
+    with ThreadPoolExecutor(max_workers=len(ninja_targets), thread_name_prefix='ocbot-ninja') as pool:
+        outcomes = list(pool.map(_build, range(len(ninja_targets))))
+
+    for (official, arch), ok in zip(ninja_targets, outcomes):
+        logger.info(f"  {get_out_dir_name(official, arch):<32} {'ok' if ok else 'FAILED'}")
+    # Targets whose merge/install never ran (an arch failed) count as failed
+    post_ok = True
+    for official, arch in targets:
+        steps = [s for s, on in (('merge', arch == 'universal'), ('install', install)) if on]
+        if not steps:
+            continue
+        ok = finished.get((official, arch))
+        status = 'skipped' if ok is None else 'ok' if ok else 'FAILED'
+        logger.info(f"  {get_out_dir_name(official, arch) + ' ' + '+'.join(steps):<32} {status}")
+        post_ok = post_ok and bool(ok)
+    return all(outcomes) and post_ok
+
+
+def build_chromium(args, install=True, install_ready=None):
+    """Build Chromium for every target in the build matrix.
+
+    A single target keeps the plain sequential flow (arm64 then x64 for
+    universal); several targets go through _build_matrix.  With
+    install=False the post-build installs (extension, Node.js, OpenClaw)
+    are left to the caller.  install_ready, if given, is called before each
+    target's installs and blocks until their inputs exist, returning False
+    if they never will.  Returns True when the build succeeded.
+    """
     logger = get_logger()
     logger.info("=" * 50)
     logger.info(f"  Ocbot     : {get_product_version()}")
@@ -619,29 +1134,26 @@ def build_chromium(args):
     logger.info(f"  Node.js   : {NODE_VERSION}")
     logger.info("=" * 50)
 
-    arch = getattr(args, 'arch', None)
-    # Default to universal for official macOS builds
-    if arch is None and args.official and sys.platform == 'darwin':
-        arch = 'universal'
+    targets = get_build_matrix(args)
+    if len(targets) > 1:
+        return _build_matrix(args, targets, install=install, install_ready=install_ready)
+
+    official, arch = targets[0]
+    args = _variant_args(args, official, arch)
     if arch == 'universal':
         if sys.platform != 'darwin':
             get_logger().error("Universal binary is macOS only.")
-            return
-        _build_single_arch(args, 'arm64')
-        _build_single_arch(args, 'x64')
-        _create_universal_binary(args)
-        return
-
-    _build_single_arch(args, arch)
+            return False
+        if not (_build_single_arch(args, 'arm64') and _build_single_arch(args, 'x64')):
+            logger.error("Skipping universal merge because an architecture failed to build.")
+            return False
+        if not _create_universal_binary(args):
+            return False
+    elif not _build_single_arch(args, arch):
+        return False
 
-    # Sync extension version and install for non-universal builds
-    sync_extension_version()
-    logger = get_logger()
-    if args.src_dir:
-        src_dir = Path(args.src_dir).resolve()
-    else:
-        src_dir = get_source_dir()
-    out_dir = src_dir / 'out' / get_out_dir_name(args.official, arch)
-    _install_extension(logger, out_dir)
-    _install_node(logger, out_dir)
-    _install_openclaw_runtime(logger, out_dir, official=args.official)
\ No newline at end of file
+    # Sync extension version and install
+    if install:
+        out_dir = get_build_out_dirs(args)[0]
+        return _install_target(logger, args, out_dir, install_ready)
+    return True
@@ -4,19 +4,27 @@
 Produces two tar.gz archives:
   - base layer: node_modules/ (platform-specific, contains native modules)
   - app layer:  openclaw.mjs, package.json, dist/, extensions/, skills/, scripts/
+
+Each layer also gets a per-file manifest (path, size, mode, sha256) and,
+when the previously published manifest is known, a delta archive holding
+only the files added or changed since then.  Archives are reproducible
+(see archive.py): the same inputs always give the same sha256.
 """
 
 import hashlib
 import json
+import os
 import platform
 import shutil
 import subprocess
 import sys
-import tarfile
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from archive import ARTIFACT_LEVELS, iter_entries, normalized_mode, write_tar_gz
 from common import get_logger, get_project_root
+from prune import prune_node_modules
 
 logger = get_logger()
 
@@ -60,16 +68,109 @@ def sha256_file(path):
     return h.hexdigest()
 
 
-def build_base_layer(openclaw_dir, output_dir, platform_tag=None):
+def _manifest_entry(item, digests=None):
+    path, arcname = item
+    st = path.lstat()
+    if os.path.islink(path):
+        return {'path': arcname, 'link': os.readlink(path)}
+    digest = digests.get(arcname) if digests else None
+    return {
+        'path': arcname,
+        'size': st.st_size,
+        'mode': normalized_mode(st.st_mode),
+        'sha256': digest or sha256_file(path),
+    }
+
+
+def build_file_manifest(files, layer_version, digests=None):
+    """Build the manifest dict for (path, arcname) pairs from iter_entries().
+
+    digests ({arcname: sha256}, as collected by write_tar_gz) saves reading
+    the files again; files missing from it are hashed here.
+    """
+    with ThreadPoolExecutor() as pool:
+        entries = list(pool.map(lambda item: _manifest_entry(item, digests), files))
+    return {'version': layer_version, 'files': entries}
+
+
+def diff_manifests(manifest, previous):
+    """Return (changed, removed) arcnames between two manifests.
+
+    changed covers added files and files whose size, mode, digest or link
+    target differ.
+    """
+    before = {f['path']: f for f in previous.get('files', [])}
+    changed = [f['path'] for f in manifest['files'] if before.get(f['path']) != f]
+    current = {f['path'] for f in manifest['files']}
+    removed = sorted(p for p in before if p not in current)
+    return changed, removed
+
+
+def _write_delta_archive(files, changed, removed, delta_path, from_version, to_version):
+    """Write a tar.gz with only the changed files plus a .ocbot-delta.json index.
+
+    Returns (path, sha256, size) as write_tar_gz() does.
+    """
+    by_arcname = dict((arcname, path) for path, arcname in files)
+    index = json.dumps({
+        'from': from_version,
+        'to': to_version,
+        'changed': changed,
+        'removed': removed,
+    }, indent=2).encode()
+    return write_tar_gz(delta_path, [(by_arcname[arcname], arcname) for arcname in changed],
+                        extra_files=[('.ocbot-delta.json', index)],
+                        level=ARTIFACT_LEVELS['runtime'])
+
+
+def _write_layer_metadata(entries, archive_path, layer_version, previous_manifest, digests=None):
+    """Write the manifest (and delta, if possible) next to a layer archive.
+
+    digests are the per-file sha256s collected while the archive was written.
+
+    Returns a dict with manifest, manifest_sha256, delta, delta_from,
+    delta_sha256 and delta_size; the delta fields are None without a
+    previous manifest of a different version.
+    """
+    files = iter_entries(entries, include_dirs=False)
+    manifest = build_file_manifest(files, layer_version, digests)
+    stem = archive_path.name[:-len('.tar.gz')]
+    manifest_path = archive_path.with_name(f'{stem}.manifest.json')
+    manifest_bytes = json.dumps(manifest, separators=(',', ':')).encode()
+    manifest_path.write_bytes(manifest_bytes)
+    meta = {
+        'manifest': manifest_path,
+        'manifest_sha256': hashlib.sha256(manifest_bytes).hexdigest(),
+        'delta': None, 'delta_from': None, 'delta_sha256': None, 'delta_size': None,
+    }
+
+    if not previous_manifest or previous_manifest.get('version') == layer_version:
+        return meta
+
+    from_version = previous_manifest['version']
+    changed, removed = diff_manifests(manifest, previous_manifest)
+    delta_path = archive_path.with_name(f'{stem}.delta-from-{from_version}.tar.gz')
+    _, delta_sha, delta_size = _write_delta_archive(
+        files, changed, removed, delta_path, from_version, layer_version)
+    logger.info(f"Delta from {from_version}: {len(changed)} changed, {len(removed)} removed "
+                f"({delta_size} bytes)")
+    meta.update(delta=delta_path, delta_from=from_version, delta_sha256=delta_sha, delta_size=delta_size)
+    return meta
+
+
+def build_base_layer(openclaw_dir, output_dir, platform_tag=None, previous_manifest=None):
     """Build base layer tar.gz containing production node_modules.
 
     Args:
         openclaw_dir: Path to openclaw source.
         output_dir: Directory to write the archive to.
         platform_tag: Platform tag (e.g. macos-arm64). Auto-detected if None.
+        previous_manifest: Manifest dict of the last published base layer for
+            this platform, used to build a delta archive.
 
     Returns:
-        (archive_path, sha256, version) tuple.
+        dict with path, sha256, size and version of the archive plus the
+        manifest/delta fields from _write_layer_metadata().
     """
     if platform_tag is None:
         platform_tag = get_platform_tag()
@@ -114,6 +215,12 @@ def build_base_layer(openclaw_dir, output_dir, platform_tag=None):
             logger.error("node_modules not created")
             sys.exit(1)
 
+        try:
+            prune_node_modules(node_modules, platform_tag=platform_tag, logger=logger)
+        except RuntimeError as e:
+            logger.error(str(e))
+            sys.exit(1)
+
         # Create tar.gz
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
@@ -121,25 +228,30 @@ def build_base_layer(openclaw_dir, output_dir, platform_tag=None):
         archive_path = output_dir / archive_name
 
         logger.info(f"Creating {archive_name}...")
-        with tarfile.open(archive_path, 'w:gz') as tar:
-            tar.add(node_modules, arcname='node_modules')
+        entries = [(node_modules, 'node_modules')]
+        digests = {}
+        _, digest, size = write_tar_gz(archive_path, entries, level=ARTIFACT_LEVELS['runtime'],
+                                       digests=digests)
+        meta = _write_layer_metadata(entries, archive_path, base_version, previous_manifest,
+                                     digests)
 
-    digest = sha256_file(archive_path)
-    size = archive_path.stat().st_size
     logger.info(f"Base layer: {archive_path} ({size} bytes, sha256={digest[:16]}...)")
 
-    return archive_path, digest, size, base_version
+    return dict(meta, path=archive_path, sha256=digest, size=size, version=base_version)
 
 
-def build_app_layer(openclaw_dir, output_dir):
+def build_app_layer(openclaw_dir, output_dir, previous_manifest=None):
     """Build app layer tar.gz containing OpenClaw application files.
 
     Args:
         openclaw_dir: Path to openclaw source.
         output_dir: Directory to write the archive to.
+        previous_manifest: Manifest dict of the last published app layer,
+            used to build a delta archive.
 
     Returns:
-        (archive_path, sha256, version) tuple.
+        dict with path, sha256, size and version of the archive plus the
+        manifest/delta fields from _write_layer_metadata().
     """
     version = get_runtime_version(openclaw_dir)
     app_version = f'app-{version}'
@@ -172,22 +284,25 @@ def build_app_layer(openclaw_dir, output_dir):
     archive_name = f'ocbot-runtime-{app_version}.tar.gz'
     archive_path = output_dir / archive_name
 
+    entries = []
+    for item_name, is_dir in items:
+        src = openclaw_dir / item_name
+        if not src.exists():
+            logger.warning(f"Skipping missing item: {src}")
+            continue
+        entries.append((src, item_name))
+
+    # scripts/run-node.mjs
+    run_node = openclaw_dir / 'scripts' / 'run-node.mjs'
+    if run_node.exists():
+        entries.append((run_node, 'scripts/run-node.mjs'))
+
     logger.info(f"Creating {archive_name}...")
-    with tarfile.open(archive_path, 'w:gz') as tar:
-        for item_name, is_dir in items:
-            src = openclaw_dir / item_name
-            if not src.exists():
-                logger.warning(f"Skipping missing item: {src}")
-                continue
-            tar.add(src, arcname=item_name)
-
-        # scripts/run-node.mjs
-        run_node = openclaw_dir / 'scripts' / 'run-node.mjs'
-        if run_node.exists():
-            tar.add(run_node, arcname='scripts/run-node.mjs')
-
-    digest = sha256_file(archive_path)
-    size = archive_path.stat().st_size
+    digests = {}
+    _, digest, size = write_tar_gz(archive_path, entries, level=ARTIFACT_LEVELS['runtime'],
+                                   digests=digests)
+    meta = _write_layer_metadata(entries, archive_path, app_version, previous_manifest, digests)
+
     logger.info(f"App layer: {archive_path} ({size} bytes, sha256={digest[:16]}...)")
 
-    return archive_path, digest, size, app_version
+    return dict(meta, path=archive_path, sha256=digest, size=size, version=app_version)
@@ -1,5 +1,9 @@
+import errno
 import logging
+import os
+import shutil
 import sys
+from collections import Counter
 from pathlib import Path
 
 # Constants
@@ -124,3 +128,155 @@ def get_source_dir(version=None):
         if legacy2.exists():
             return legacy2
     return get_chromium_root() / 'src'
+
+
+# --- Copy engine ---------------------------------------------------------
+#
+# Staging an app bundle or syncing the extension copies thousands of files.
+# copy_file()/copy_tree() try the cheapest strategy first and fall back:
+#   clone     copy-on-write clone (FICLONE on Linux btrfs/XFS, clonefile on APFS)
+#   hardlink  only for inputs the caller marks immutable (never modified in
+#             place afterwards, e.g. by codesign or lipo)
+#   copy      copy_file_range where available (server-side/reflink on some
+#             filesystems), otherwise a buffered copy
+# Each call reports which strategy it used.
+
+_FICLONE = 0x40049409
+# (strategy, src device, dst device) pairs known not to work, so a
+# non-CoW filesystem only pays for the failed attempt once.
+_unsupported = set()
+_clonefile = None
+
+
+def _macos_clonefile():
+    global _clonefile
+    if _clonefile is None:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        _clonefile = getattr(libc, 'clonefile', False)
+        if _clonefile:
+            _clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint32]
+    return _clonefile
+
+
+def _try_clone(src, dst, devs):
+    """Clone src to dst (which must not exist). Returns True on success."""
+    if ('clone',) + devs in _unsupported:
+        return False
+    try:
+        if sys.platform == 'darwin':
+            clonefile = _macos_clonefile()
+            # CLONE_NOFOLLOW: clone symlinks themselves
+            if clonefile and clonefile(os.fsencode(src), os.fsencode(dst), 0x0001) == 0:
+                return True
+        elif sys.platform.startswith('linux'):
+            import fcntl
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return True
+    except OSError:
+        pass
+    try:
+        os.unlink(dst)
+    except OSError:
+        pass
+    _unsupported.add(('clone',) + devs)
+    return False
+
+
+def _copy_data(src, dst):
+    """Copy file contents, in-kernel with copy_file_range when possible."""
+    if hasattr(os, 'copy_file_range'):
+        size = os.stat(src).st_size
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            copied = 0
+            try:
+                while copied < size:
+                    n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+                    if n == 0:
+                        break
+                    copied += n
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                    raise
+            if copied == size:
+                shutil.copystat(src, dst)
+                return
+    shutil.copy2(src, dst)
+
+
+def copy_file(src, dst, immutable=False):
+    """Copy one file (or symlink) to dst, replacing it. Returns the strategy used."""
+    src, dst = Path(src), Path(dst)
+    if dst.is_symlink() or dst.exists():
+        dst.unlink()
+    if src.is_symlink():
+        os.symlink(os.readlink(src), dst)
+        return 'symlink'
+
+    devs = (src.stat().st_dev, dst.parent.stat().st_dev)
+    if _try_clone(src, dst, devs):
+        return 'clone'
+    if immutable and ('hardlink',) + devs not in _unsupported:
+        try:
+            os.link(src, dst)
+            return 'hardlink'
+        except OSError:
+            _unsupported.add(('hardlink',) + devs)
+    _copy_data(src, dst)
+    return 'copy'
+
+
+def copy_tree(src, dst, symlinks=True, immutable=False, ignore=None):
+    """Replace dst with a copy of the directory src.
+
+    Args:
+        symlinks: Recreate symlinks (True) or copy what they point to.
+        immutable: The source files are never modified in place, so they
+            may be hardlinked when cloning isn't available.
+        ignore: shutil.copytree-style callable (dir, names) -> names to skip.
+
+    Returns a Counter of files per strategy, e.g. {'clone': 812, 'copy': 3}.
+    """
+    src, dst = Path(src), Path(dst)
+    if dst.is_symlink() or dst.is_file():
+        dst.unlink()
+    elif dst.exists():
+        shutil.rmtree(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+
+    stats = Counter()
+    # APFS clones a whole directory tree in one call
+    if sys.platform == 'darwin' and symlinks and ignore is None:
+        if _try_clone(src, dst, (src.stat().st_dev, dst.parent.stat().st_dev)):
+            stats['clone (tree)'] += 1
+            return stats
+
+    for dirpath, dirnames, filenames in os.walk(src, followlinks=not symlinks):
+        rel = Path(dirpath).relative_to(src)
+        target = dst / rel
+        target.mkdir(exist_ok=True)
+        skip = set(ignore(dirpath, dirnames + filenames)) if ignore else set()
+        dirnames[:] = [d for d in dirnames if d not in skip]
+        for name in list(dirnames):
+            if symlinks and (Path(dirpath) / name).is_symlink():
+                dirnames.remove(name)
+                stats[copy_file(Path(dirpath) / name, target / name)] += 1
+        for name in filenames:
+            if name in skip:
+                continue
+            path = Path(dirpath) / name
+            if symlinks and path.is_symlink():
+                stats[copy_file(path, target / name)] += 1
+            else:
+                stats[copy_file(path.resolve() if path.is_symlink() else path,
+                                target / name, immutable)] += 1
+        shutil.copystat(dirpath, target)
+    return stats
+
+
+def format_copy_stats(stats):
+    """Render copy_tree() stats as e.g. 'clone: 812, copy: 3'."""
+    return ', '.join(f'{k}: {v}' for k, v in stats.most_common()) or 'nothing copied'
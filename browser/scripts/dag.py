@@ -0,0 +1,206 @@
+"""Small dependency-graph executor for multi-step dev.py commands.
+
+Each step declares the steps it depends on, the paths it reads (inputs)
+and the paths it produces (outputs).  An input that lives under another
+step's output adds an implicit dependency on that step.  Steps whose
+prerequisites are done run concurrently on worker threads as long as the
+sum of their CPU weights fits in the budget; the steps themselves mostly
+wait on subprocesses, so threads are enough.
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from common import get_logger
+
+
+class Step:
+    """One node of a build graph."""
+
+    def __init__(self, name, func, deps=(), inputs=(), outputs=(), cpus=1):
+        self.name = name
+        self.func = func
+        self.deps = set(deps)
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        # 0 for steps that only wait on I/O; they never hold back others
+        self.cpus = max(0, cpus)
+        self.start = None
+        self.end = None
+        self.result = None
+        self.status = 'pending'
+
+    @property
+    def duration(self):
+        if self.start is None or self.end is None:
+            return 0.0
+        return self.end - self.start
+
+
+def _is_within(path, root):
+    try:
+        path.relative_to(root)
+        return True
+    except ValueError:
+        return False
+
+
+def _resolve_deps(steps):
+    """Add implicit output→input dependencies and validate the graph."""
+    by_name = {s.name: s for s in steps}
+    if len(by_name) != len(steps):
+        raise ValueError("Duplicate step names in build graph")
+
+    for step in steps:
+        for other in steps:
+            if other is step:
+                continue
+            if any(_is_within(i, o) for i in step.inputs for o in other.outputs):
+                step.deps.add(other.name)
+        unknown = step.deps - by_name.keys()
+        if unknown:
+            raise ValueError(f"Step '{step.name}' depends on unknown step(s): {', '.join(sorted(unknown))}")
+
+    # Kahn's algorithm: every step must be reachable without a cycle
+    remaining = {s.name: set(s.deps) for s in steps}
+    order = []
+    while remaining:
+        ready = [n for n, d in remaining.items() if not d]
+        if not ready:
+            raise ValueError(f"Cycle in build graph between: {', '.join(sorted(remaining))}")
+        for name in ready:
+            order.append(by_name[name])
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return order
+
+
+def critical_path(steps):
+    """Return (path, seconds) of the longest dependency chain by measured duration."""
+    order = _resolve_deps(steps)
+    finish = {}
+    via = {}
+    for step in order:
+        prev = max(step.deps, key=lambda d: finish[d], default=None)
+        finish[step.name] = step.duration + (finish[prev] if prev else 0.0)
+        via[step.name] = prev
+    if not finish:
+        return [], 0.0
+    name = max(finish, key=finish.get)
+    total = finish[name]
+    path = []
+    while name:
+        path.append(name)
+        name = via[name]
+    return list(reversed(path)), total
+
+
+def format_duration(seconds):
+    """Format seconds as e.g. '4.2s', '3m05s' or '1h02m'."""
+    if seconds < 60:
+        return f'{seconds:.1f}s'
+    minutes, secs = divmod(int(seconds), 60)
+    if minutes < 60:
+        return f'{minutes}m{secs:02d}s'
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours}h{minutes:02d}m'
+
+
+def log_report(steps, t0, logger=None):
+    """Log per-step timings and the critical path."""
+    if logger is None:
+        logger = get_logger()
+    path, path_time = critical_path(steps)
+    wall = max((s.end for s in steps if s.end is not None), default=t0) - t0
+    busy = sum(s.duration for s in steps)
+
+    logger.info("=" * 50)
+    logger.info("  Step timings")
+    for step in sorted(steps, key=lambda s: (s.start is None, s.start or 0)):
+        if step.start is None:
+            logger.info(f"    {step.name:<24} {step.status}")
+            continue
+        marker = '*' if step.name in path else ' '
+        logger.info(f"  {marker} {step.name:<24} +{format_duration(step.start - t0):>8} "
+                    f"{format_duration(step.duration):>8}  {step.status}")
+    logger.info(f"  Wall time     : {format_duration(wall)} (sequential: {format_duration(busy)})")
+    logger.info(f"  Critical path : {' -> '.join(path)} ({format_duration(path_time)})")
+    logger.info("=" * 50)
+
+
+def run_steps(steps, cpu_budget=None, logger=None, report=True):
+    """Run a list of Steps, respecting dependencies and the CPU budget.
+
+    A step whose weight exceeds the budget is clamped to it, so it runs
+    alone rather than never.  If a step raises, no new steps are started,
+    running ones are allowed to finish, steps depending on the failed one
+    are marked skipped, and the first exception is re-raised.
+
+    Returns a {name: result} dict of the values returned by each step.
+    """
+    if logger is None:
+        logger = get_logger()
+    budget = max(1, cpu_budget or os.cpu_count() or 1)
+    order = _resolve_deps(steps)
+
+    done = set()
+    failed = None
+    used = 0
+    running = {}
+    pending = list(order)
+    t0 = time.monotonic()
+
+    def _timed(step):
+        step.start = time.monotonic()
+        try:
+            return step.func()
+        finally:
+            step.end = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max(1, len(steps)),
+                            thread_name_prefix='ocbot-step') as pool:
+        while pending or running:
+            if failed is None:
+                for step in list(pending):
+                    if not step.deps <= done:
+                        continue
+                    weight = min(step.cpus, budget)
+                    if running and used + weight > budget:
+                        continue
+                    pending.remove(step)
+                    step.status = 'running'
+                    used += weight
+                    logger.info(f"[{step.name}] started")
+                    running[pool.submit(_timed, step)] = (step, weight)
+
+            if not running:
+                # Only reachable after a failure: the rest get skipped.
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step, weight = running.pop(future)
+                used -= weight
+                try:
+                    step.result = future.result()
+                except BaseException as e:
+                    step.status = 'failed'
+                    logger.error(f"[{step.name}] failed after {format_duration(step.duration)}: {e!r}")
+                    if failed is None:
+                        failed = e
+                    continue
+                step.status = 'done'
+                done.add(step.name)
+                logger.info(f"[{step.name}] done in {format_duration(step.duration)}")
+
+    for step in pending:
+        step.status = 'skipped'
+
+    if report:
+        log_report(steps, t0, logger)
+    if failed is not None:
+        raise failed
+    return {s.name: s.result for s in steps}
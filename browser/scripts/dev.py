@@ -4,13 +4,15 @@ import sys
 import subprocess
 import os
 import json
+import time
 from pathlib import Path
 
 try:
     from common import get_logger
     from download import init_chromium, create_worktree, list_worktrees, remove_worktree, sync_worktree
     from patch import apply_patches, reset_source, update_patches, repatch_source
-    from build import build_chromium
+    from build import build_chromium, fetch_node_archive, get_build_out_dirs, NODE_CACHE_DIR
+    from dag import Step, run_steps
     from run import run_ocbot
     from check import check_environment
     from icons import install_icons
@@ -45,6 +47,72 @@ def _build_extension(logger, zip=True):
         sys.exit(1)
 
 
+def _build_all(args, logger):
+    """Run the full `dev.py build` as a step graph.
+
+    Icons, the extension build and the Node.js download don't depend on each
+    other and overlap with the Chromium build.  Each Chromium target runs its
+    installs as soon as it is built and the extension and Node.js are ready.
+    """
+    if args.src_dir:
+        src_dir = Path(args.src_dir).resolve()
+    else:
+        src_dir = get_source_dir()
+
+    # Install icons before build
+    # Source: ocbot/chromium/icons
+    # Dest: src/chrome/app/theme/chromium
+    icons_src = get_project_root() / 'chromium' / 'icons'
+    icons_dest = src_dir / 'chrome' / 'app' / 'theme' / 'chromium'
+    extension_out = get_agent_root() / '.output' / 'chrome-mv3'
+
+    cpu_budget = args.cpu_budget or os.cpu_count() or 1
+
+    install_inputs = [
+        Step('extension', lambda: _build_extension(logger, zip=True),
+             outputs=[extension_out], cpus=min(2, max(1, cpu_budget - 1))),
+        # Waits on the network, not the CPU
+        Step('node-download', lambda: fetch_node_archive(logger),
+             outputs=[NODE_CACHE_DIR], cpus=0),
+    ]
+    # autoninja saturates the machine on its own; it gets what the steps
+    # overlapping it leave, so it never waits for a slot.
+    chromium_cpus = max(1, cpu_budget - sum(s.cpus for s in install_inputs))
+
+    def _install_ready():
+        while True:
+            states = {s.status for s in install_inputs}
+            if states == {'done'}:
+                return True
+            if 'failed' in states:
+                return False
+            time.sleep(0.5)
+
+    def _chromium_step():
+        if not build_chromium(args, install_ready=_install_ready):
+            logger.error("Chromium build failed.")
+            sys.exit(1)
+
+    steps = install_inputs + [
+        Step('icons', lambda: install_icons(icons_src, icons_dest),
+             inputs=[icons_src], outputs=[icons_dest]),
+        Step('chromium', _chromium_step,
+             inputs=[icons_dest], outputs=get_build_out_dirs(args), cpus=chromium_cpus),
+    ]
+    run_steps(steps, cpu_budget=cpu_budget, logger=logger)
+
+
+def _csv_choices(choices):
+    """argparse type for comma-separated values restricted to `choices`."""
+    def _parse(value):
+        items = [v.strip() for v in value.split(',') if v.strip()]
+        bad = [v for v in items if v not in choices]
+        if not items or bad:
+            raise argparse.ArgumentTypeError(
+                f"invalid choice(s) {', '.join(bad) or repr(value)} (choose from {', '.join(choices)})")
+        return ','.join(items)
+    return _parse
+
 
 def main():
     parser = argparse.ArgumentParser(description='ocbot development utility')
@@ -99,8 +167,17 @@ def main():
     parser_build.add_argument('--official', action='store_true', help='Build official release (optimized)')
     parser_build.add_argument('--clean', action='store_true', help='Clean output directory before building')
     parser_build.add_argument('--arch', default=None,
-        choices=['arm64', 'x64', 'universal'],
-        help='Target architecture (default: native)')
+        type=_csv_choices(['arm64', 'x64', 'universal']),
+        help='Target architecture(s), comma-separated for a build matrix (default: native)')
+    parser_build.add_argument('--variant', default=None,
+        type=_csv_choices(['default', 'official']),
+        help='Build variant(s), comma-separated, e.g. default,official (overrides --official)')
+    parser_build.add_argument('--jobs', '-j', type=int, default=None,
+        help='Ninja jobs, shared by all builds in a matrix (default: number of cores; autoninja decides for a single target)')
+    parser_build.add_argument('--force', action='store_true',
+        help='Run autoninja even when the build fingerprint says the out dir is up to date')
+    parser_build.add_argument('--cpu-budget', type=int, default=None,
+        help='CPU weight shared by concurrent build steps (default: number of cores)')
 
     # Run
     parser_run = subparsers.add_parser('run', help='Run Ocbot with OpenClaw gateway', parents=[parent_parser])
@@ -137,6 +214,41 @@ def main():
     # Release Runtime
     parser_release_runtime = subparsers.add_parser('release-runtime', help='Build and upload OpenClaw runtime layers to R2', parents=[parent_parser])
 
+    # Prune node_modules (dry-run report of what the layer builds remove)
+    parser_prune = subparsers.add_parser('prune-node-modules', help='Prune a node_modules tree with the runtime layer rules', parents=[parent_parser])
+    parser_prune.add_argument('path', help='Path to a node_modules directory')
+    parser_prune.add_argument('--platform-tag', default=None,
+        help='Drop prebuilt binaries for other targets, e.g. macos-arm64 (default: keep all)')
+    parser_prune.add_argument('--config', default=None, help='Overrides file (default: runtime_prune.json)')
+    parser_prune.add_argument('--dry-run', action='store_true', help='Only report what would be removed')
+
+    # Runtime layer size report
+    parser_runtime_report = subparsers.add_parser('runtime-report', help='Size breakdown of a runtime layer, optionally diffed against a previous one', parents=[parent_parser])
+    parser_runtime_report.add_argument('layer', help='Layer archive (ocbot-runtime-*.tar.gz)')
+    parser_runtime_report.add_argument('--previous', help='Previous layer archive or saved JSON report to diff against')
+    parser_runtime_report.add_argument('--output', help='Write the report as JSON (reuse later with --previous)')
+    parser_runtime_report.add_argument('--top', type=int, default=20, help='Number of packages/dirs/files to list')
+    parser_runtime_report.add_argument('--max-growth-mb', type=float, default=None,
+        help='Fail if the compressed layer grew by more than this many MB')
+    parser_runtime_report.add_argument('--max-growth-percent', type=float, default=None,
+        help='Fail if the compressed layer grew by more than this percentage')
+    parser_runtime_report.add_argument('--max-package-growth-mb', type=float, default=None,
+        help='Fail if any single package grew by more than this many MB (uncompressed)')
+
+    # Artifact size/time history
+    parser_artifacts_report = subparsers.add_parser('artifacts-report', help='Size and packaging-time trends of release artifacts, checked against budgets', parents=[parent_parser])
+    parser_artifacts_report.add_argument('--artifact', action='append', default=None,
+        help='Only report this artifact, e.g. dmg-arm64 (repeatable; default: all)')
+    parser_artifacts_report.add_argument('--last', type=int, default=10, help='Number of records to show per artifact')
+    parser_artifacts_report.add_argument('--history', default=None, help='History file (default: dist/artifact-history.json)')
+    parser_artifacts_report.add_argument('--budgets', default=None, help='Budgets file (default: artifact_budgets.json)')
+    parser_artifacts_report.add_argument('--max-size-mb', type=float, default=None,
+        help='Fail if the latest build of an artifact is larger than this many MB')
+    parser_artifacts_report.add_argument('--max-growth-percent', type=float, default=None,
+        help='Fail if an artifact grew by more than this percentage since its previous record')
+    parser_artifacts_report.add_argument('--max-total-seconds', type=float, default=None,
+        help='Fail if producing an artifact took longer than this')
+
     # Sync Models
     parser_sync_models = subparsers.add_parser('sync-models', help='Upload models.json to CDN', parents=[parent_parser])
 
@@ -220,23 +332,7 @@ def main():
     elif args.command == 'update_patches':
         update_patches(args)
     elif args.command == 'build':
-        if args.src_dir:
-            src_dir = Path(args.src_dir).resolve()
-        else:
-            src_dir = get_source_dir()
-
-        # Install icons before build
-        # Source: ocbot/chromium/icons
-        # Dest: src/chrome/app/theme/chromium
-        icons_src = get_project_root() / 'chromium' / 'icons'
-        icons_dest = src_dir / 'chrome' / 'app' / 'theme' / 'chromium'
-
-        install_icons(icons_src, icons_dest)
-        
-        # Build extension
-        _build_extension(logger, zip=True)
-
-        build_chromium(args)
+        _build_all(args, logger)
     elif args.command == 'run':
         if getattr(args, 'update_web', False):
              _build_extension(logger, zip=False)
@@ -264,6 +360,48 @@ def main():
         release_browser(args)
     elif args.command == 'release-runtime':
         release_runtime(args)
+    elif args.command == 'prune-node-modules':
+        from prune import load_prune_config, prune_node_modules
+        try:
+            prune_node_modules(args.path, platform_tag=args.platform_tag,
+                               config=load_prune_config(args.config), dry_run=args.dry_run,
+                               logger=logger)
+        except RuntimeError as e:
+            logger.error(str(e))
+            sys.exit(1)
+    elif args.command == 'runtime-report':
+        from layer_report import analyze_layer, compare_reports, load_report, log_report
+        report = analyze_layer(args.layer, top_n=args.top)
+        log_report(report, top_n=args.top, logger=logger)
+        if args.output:
+            Path(args.output).write_text(json.dumps(report, indent=2))
+            logger.info(f"Report written to {args.output}")
+        if args.previous:
+            violations = compare_reports(
+                report, load_report(args.previous),
+                max_growth_mb=args.max_growth_mb,
+                max_growth_percent=args.max_growth_percent,
+                max_package_growth_mb=args.max_package_growth_mb,
+                top_n=args.top, logger=logger)
+            if violations:
+                sys.exit(1)
+    elif args.command == 'artifacts-report':
+        from artifact_stats import load_budgets, load_history, report
+        budgets = load_budgets(args.budgets)
+        # Command-line budgets apply to every artifact
+        overrides = {
+            'max_size_mb': args.max_size_mb,
+            'max_growth_percent': args.max_growth_percent,
+            'max_total_seconds': args.max_total_seconds,
+        }
+        overrides = {k: v for k, v in overrides.items() if v is not None}
+        budgets.setdefault('*', {})
+        for budget in budgets.values():
+            budget.update(overrides)
+        violations = report(load_history(args.history), budgets=budgets,
+                            artifacts=args.artifact, last=args.last, logger=logger)
+        if violations:
+            sys.exit(1)
     elif args.command == 'sync-models':
         upload_config_to_r2()
     elif args.command == 'gen-channels':
@@ -173,29 +173,31 @@ def write_catalog_ts(entries, output_path):
     output_path.write_text('\n'.join(lines))
 
 
-def _compute_input_hash(openclaw_root):
-    """Compute a hash of all input files that feed the channel catalog."""
-    h = hashlib.sha256()
-
-    # Hash this script itself (logic changes should invalidate cache)
-    h.update(Path(__file__).read_bytes())
-
-    # Hash registry.ts
-    registry_path = openclaw_root / 'src' / 'channels' / 'registry.ts'
-    if registry_path.is_file():
-        h.update(registry_path.read_bytes())
-
-    # Hash all extension manifests and package.json channel metadata
+def _input_paths(openclaw_root):
+    """Every file that feeds the channel catalog, this script included."""
+    # Logic changes in this script should invalidate the cache too
+    paths = [Path(__file__), openclaw_root / 'src' / 'channels' / 'registry.ts']
     extensions_dir = openclaw_root / 'extensions'
     if extensions_dir.is_dir():
         for ext_dir in sorted(extensions_dir.iterdir()):
-            manifest_path = ext_dir / 'openclaw.plugin.json'
-            if manifest_path.is_file():
-                h.update(manifest_path.read_bytes())
-            pkg_path = ext_dir / 'package.json'
-            if pkg_path.is_file():
-                h.update(pkg_path.read_bytes())
+            paths += [ext_dir / 'openclaw.plugin.json', ext_dir / 'package.json']
+    return [p for p in paths if p.is_file()]
+
 
+def _input_stat(paths):
+    """[path, size, mtime] of each input: unchanged stats mean nothing to re-read."""
+    stats = []
+    for path in paths:
+        st = path.stat()
+        stats.append([str(path), st.st_size, st.st_mtime_ns])
+    return stats
+
+
+def _compute_input_hash(paths):
+    """Compute a hash of all input files that feed the channel catalog."""
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(path.read_bytes())
     return h.hexdigest()
 
 
@@ -212,20 +214,28 @@ def generate(logger=None):
     output_path = get_project_root() / 'web' / 'src' / 'generated' / 'channel-catalog.ts'
     hash_path = output_path.with_suffix('.hash')
 
-    # Skip regeneration if inputs haven't changed
-    current_hash = _compute_input_hash(openclaw_root)
-    if output_path.is_file() and hash_path.is_file():
-        try:
-            saved_hash = hash_path.read_text().strip()
-            if saved_hash == current_hash:
-                logger.info('Channel catalog up to date, skipping generation.')
-                return True
-        except OSError:
-            pass
+    # Skip regeneration if inputs haven't changed.  The inputs are only
+    # hashed when their sizes or mtimes moved (e.g. a fresh checkout).
+    paths = _input_paths(openclaw_root)
+    stat = _input_stat(paths)
+    try:
+        saved = json.loads(hash_path.read_text())
+    except (OSError, ValueError):
+        saved = {}
+    if not isinstance(saved, dict):
+        saved = {}
+    if output_path.is_file() and saved.get('stat') == stat:
+        logger.info('Channel catalog up to date, skipping generation.')
+        return True
+    current_hash = _compute_input_hash(paths)
+    if output_path.is_file() and saved.get('sha256') == current_hash:
+        hash_path.write_text(json.dumps({'sha256': current_hash, 'stat': stat}) + '\n')
+        logger.info('Channel catalog up to date, skipping generation.')
+        return True
 
     entries = build_catalog(openclaw_root)
     write_catalog_ts(entries, output_path)
-    hash_path.write_text(current_hash + '\n')
+    hash_path.write_text(json.dumps({'sha256': current_hash, 'stat': stat}) + '\n')
 
     logger.info(f'Generated channel catalog: {len(entries)} channels → {output_path}')
     return True
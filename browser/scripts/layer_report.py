@@ -0,0 +1,186 @@
+"""Size analytics for runtime layer archives.
+
+analyze_layer() reads a built layer (ocbot-runtime-*.tar.gz) once, in
+stream mode, and breaks its size down per package (for node_modules) and
+per directory, both uncompressed and compressed, plus the largest files.
+compare_reports() diffs two such reports and checks growth budgets, so
+`dev.py runtime-report` can fail CI when a dependency suddenly adds tens
+of MB to every user's download.
+
+Compressed sizes are attributed by how far the gzip stream advanced while
+each entry was read.  The decompressor reads ahead in chunks, so this is
+approximate for small entries but accurate enough at package level.
+"""
+
+import json
+import tarfile
+from pathlib import Path
+
+from common import get_logger
+
+TOP_N = 20
+DIR_DEPTH = 2
+# Package bucket for files directly under node_modules/ (.package-lock.json, .bin links)
+ROOT_PACKAGE = '(root)'
+
+
+class _CountingReader:
+    """Read-only file wrapper that counts the compressed bytes consumed."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.pos = 0
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.pos += len(data)
+        return data
+
+
+def package_of(path):
+    """Return the top-level npm package a layer path belongs to, or None.
+
+    Files directly under node_modules/ are attributed to ROOT_PACKAGE.
+    """
+    parts = path.split('/')
+    if 'node_modules' not in parts:
+        return None
+    i = parts.index('node_modules') + 1
+    if i >= len(parts):
+        return None
+    if i == len(parts) - 1:
+        return ROOT_PACKAGE
+    if parts[i].startswith('@') and i + 1 < len(parts):
+        return f'{parts[i]}/{parts[i + 1]}'
+    return parts[i]
+
+
+def directory_of(path, depth=DIR_DEPTH):
+    parts = path.split('/')[:-1]
+    return '/'.join(parts[:depth]) or '.'
+
+
+def _add(bucket, key, size, compressed):
+    entry = bucket.setdefault(key, {'files': 0, 'size': 0, 'compressed': 0})
+    entry['files'] += 1
+    entry['size'] += size
+    entry['compressed'] += compressed
+
+
+def analyze_layer(archive_path, top_n=TOP_N):
+    """Analyze a layer tar.gz and return a JSON-serializable report."""
+    archive_path = Path(archive_path)
+    files = []
+    with open(archive_path, 'rb') as raw:
+        reader = _CountingReader(raw)
+        with tarfile.open(fileobj=reader, mode='r|gz') as tar:
+            prev = None
+            for member in tar:
+                if prev is not None:
+                    prev[2] = reader.pos - prev[2]
+                    files.append(prev)
+                    prev = None
+                if member.isfile():
+                    prev = [member.name, member.size, reader.pos]
+            if prev is not None:
+                prev[2] = archive_path.stat().st_size - prev[2]
+                files.append(prev)
+
+    packages = {}
+    dirs = {}
+    for name, size, compressed in files:
+        pkg = package_of(name)
+        if pkg:
+            _add(packages, pkg, size, compressed)
+        _add(dirs, directory_of(name), size, compressed)
+
+    largest = sorted(files, key=lambda f: f[1], reverse=True)[:top_n]
+    return {
+        'archive': archive_path.name,
+        'compressed_size': archive_path.stat().st_size,
+        'uncompressed_size': sum(f[1] for f in files),
+        'files': len(files),
+        'packages': packages,
+        'dirs': dirs,
+        'top_files': [{'path': name, 'size': size, 'compressed': compressed}
+                      for name, size, compressed in largest],
+    }
+
+
+def load_report(path):
+    """Load a previous report from a saved JSON report or a layer archive."""
+    path = Path(path)
+    if path.name.endswith('.tar.gz') or path.suffix == '.tgz':
+        return analyze_layer(path)
+    return json.loads(path.read_text())
+
+
+def _mb(size):
+    return f'{size / (1024 * 1024):.1f} MB'
+
+
+def _signed_mb(delta):
+    return f'{delta / (1024 * 1024):+.1f} MB'
+
+
+def log_report(report, top_n=TOP_N, logger=None):
+    if logger is None:
+        logger = get_logger()
+    logger.info("=" * 60)
+    logger.info(f"  {report['archive']}: {report['files']} files, "
+                f"{_mb(report['compressed_size'])} compressed, "
+                f"{_mb(report['uncompressed_size'])} uncompressed")
+    for title, bucket in (('Packages', report['packages']), ('Directories', report['dirs'])):
+        if not bucket:
+            continue
+        logger.info(f"  {title} (largest {min(top_n, len(bucket))} of {len(bucket)}):")
+        for key, entry in sorted(bucket.items(), key=lambda kv: kv[1]['size'], reverse=True)[:top_n]:
+            logger.info(f"    {_mb(entry['size']):>10} {_mb(entry['compressed']):>10} gz "
+                        f"{entry['files']:>6} files  {key}")
+    logger.info("  Largest files:")
+    for f in report['top_files'][:top_n]:
+        logger.info(f"    {_mb(f['size']):>10}  {f['path']}")
+    logger.info("=" * 60)
+
+
+def compare_reports(report, previous, max_growth_mb=None, max_growth_percent=None,
+                    max_package_growth_mb=None, top_n=TOP_N, logger=None):
+    """Log the size diff against a previous report and check growth budgets.
+
+    Budgets apply to the compressed size (what users download); package
+    budgets to the uncompressed size, which is what attribution measures
+    exactly.  Returns the list of budget violations (empty if within budget).
+    """
+    if logger is None:
+        logger = get_logger()
+    growth = report['compressed_size'] - previous['compressed_size']
+    percent = growth / previous['compressed_size'] * 100 if previous['compressed_size'] else 0.0
+    logger.info(f"  vs {previous['archive']}: {_signed_mb(growth)} compressed ({percent:+.1f}%), "
+                f"{_signed_mb(report['uncompressed_size'] - previous['uncompressed_size'])} uncompressed, "
+                f"{report['files'] - previous['files']:+d} files")
+
+    changes = []
+    names = set(report['packages']) | set(previous['packages'])
+    for name in names:
+        now = report['packages'].get(name, {}).get('size', 0)
+        before = previous['packages'].get(name, {}).get('size', 0)
+        if now != before:
+            changes.append((now - before, name, now, before))
+    changes.sort(key=lambda c: abs(c[0]), reverse=True)
+    for delta, name, now, before in changes[:top_n]:
+        status = 'added' if not before else 'removed' if not now else ''
+        logger.info(f"    {_signed_mb(delta):>10}  {name} {status}".rstrip())
+
+    violations = []
+    if max_growth_mb is not None and growth > max_growth_mb * 1024 * 1024:
+        violations.append(f"layer grew {_signed_mb(growth)} (budget {max_growth_mb} MB)")
+    if max_growth_percent is not None and percent > max_growth_percent:
+        violations.append(f"layer grew {percent:+.1f}% (budget {max_growth_percent}%)")
+    if max_package_growth_mb is not None:
+        for delta, name, _, _ in changes:
+            if delta > max_package_growth_mb * 1024 * 1024:
+                violations.append(f"package {name} grew {_signed_mb(delta)} "
+                                  f"(budget {max_package_growth_mb} MB)")
+    for violation in violations:
+        logger.error(f"Size budget exceeded: {violation}")
+    return violations
@@ -0,0 +1,182 @@
+"""Build telemetry from ninja's .ninja_log.
+
+After each autoninja run, the edges executed by that build are read back
+from out/<dir>/.ninja_log and summarized: slowest edges, total CPU time
+versus wall time (effective parallelism), and where ocbot-patched code
+spends its compile time.  Summaries are appended to a JSON history in the
+out dir so each build can be compared with the previous one.
+"""
+
+import json
+import re
+import time
+from pathlib import Path
+
+from common import get_logger
+
+NINJA_LOG = '.ninja_log'
+HISTORY_FILE = '.ocbot_build_history.json'
+# Keep the history file small; older builds are rarely interesting.
+HISTORY_LIMIT = 50
+TOP_N = 15
+
+# Output path fragments that identify ocbot-owned sources.
+HOT_SPOT_PATTERNS = ('chrome/browser/ocbot/', 'oc_fingerprint/')
+
+# "[123/4567] CXX obj/..." (ninja with NINJA_STATUS='[%f/%t] ', siso pads numbers)
+_PROGRESS_RE = re.compile(r'^\[\s*(\d+)\s*/\s*(\d+)\s*\]')
+
+
+def parse_progress(line):
+    """Return (finished, total) from a ninja/siso status line, or None."""
+    m = _PROGRESS_RE.match(line)
+    if not m:
+        return None
+    return int(m.group(1)), int(m.group(2))
+
+
+def ninja_log_size(out_dir):
+    """Return the current size of .ninja_log, used as the read offset after a build."""
+    try:
+        return (Path(out_dir) / NINJA_LOG).stat().st_size
+    except OSError:
+        return 0
+
+
+def read_ninja_log(out_dir, offset=0):
+    """Return the edges of the most recent build as [(start_ms, end_ms, output)].
+
+    Only lines after `offset` are considered, so a no-op build yields no
+    edges instead of repeating the previous build.  If ninja recompacted the
+    log (it shrank), the whole log is read and the last build is found the
+    way ninja's own post_build_ninja_summary.py does it: each build's times
+    restart at zero, so a decreasing end time marks a new build.
+    Outputs of one multi-output edge share a command hash and are merged.
+    """
+    path = Path(out_dir) / NINJA_LOG
+    try:
+        with open(path, 'rb') as f:
+            size = f.seek(0, 2)
+            f.seek(offset if offset <= size else 0)
+            lines = f.read().decode('utf-8', errors='replace').splitlines()
+    except OSError:
+        return []
+
+    edges = {}
+    last_end = 0
+    for line in lines:
+        if line.startswith('#'):
+            continue
+        parts = line.split('\t')
+        if len(parts) < 5:
+            continue
+        try:
+            start, end = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue
+        if end < last_end:
+            edges = {}
+        last_end = end
+        output, cmdhash = parts[3], parts[4]
+        if cmdhash in edges:
+            edges[cmdhash][2].append(output)
+        else:
+            edges[cmdhash] = (start, end, [output])
+    return [(start, end, min(outputs)) for start, end, outputs in edges.values()]
+
+
+def summarize(edges, top_n=TOP_N):
+    """Summarize build edges into a JSON-serializable dict."""
+    if not edges:
+        return {'edges': 0, 'cpu_s': 0.0, 'wall_s': 0.0, 'parallelism': 0.0,
+                'slowest': [], 'hot_spots': {}}
+
+    cpu_ms = sum(end - start for start, end, _ in edges)
+    wall_ms = max(end for _, end, _ in edges) - min(start for start, _, _ in edges)
+    slowest = sorted(edges, key=lambda e: e[1] - e[0], reverse=True)[:top_n]
+
+    hot_spots = {}
+    for start, end, output in edges:
+        for pattern in HOT_SPOT_PATTERNS:
+            if pattern in output:
+                spot = hot_spots.setdefault(pattern, {'edges': 0, 'cpu_s': 0.0})
+                spot['edges'] += 1
+                spot['cpu_s'] = round(spot['cpu_s'] + (end - start) / 1000, 3)
+
+    return {
+        'edges': len(edges),
+        'cpu_s': round(cpu_ms / 1000, 3),
+        'wall_s': round(wall_ms / 1000, 3),
+        'parallelism': round(cpu_ms / wall_ms, 2) if wall_ms else 0.0,
+        'slowest': [{'output': output, 'seconds': round((end - start) / 1000, 3)}
+                    for start, end, output in slowest],
+        'hot_spots': hot_spots,
+    }
+
+
+def load_history(out_dir):
+    try:
+        history = json.loads((Path(out_dir) / HISTORY_FILE).read_text())
+    except (OSError, json.JSONDecodeError):
+        return []
+    return history if isinstance(history, list) else []
+
+
+def _fmt_delta(now, before, unit=''):
+    delta = now - before
+    pct = f" ({delta / before * 100:+.0f}%)" if before else ''
+    return f"{delta:+.1f}{unit}{pct}"
+
+
+def log_summary(summary, previous=None, logger=None):
+    """Log a build summary and its delta against the previous build."""
+    if logger is None:
+        logger = get_logger()
+    if not summary['edges']:
+        logger.info("Build telemetry: no edges were rebuilt.")
+        return
+
+    logger.info("=" * 50)
+    logger.info(f"  Build telemetry ({summary['edges']} edges)")
+    logger.info(f"  CPU time    : {summary['cpu_s']:.1f}s")
+    logger.info(f"  Wall time   : {summary['wall_s']:.1f}s "
+                f"(effective parallelism {summary['parallelism']:.1f}x)")
+    if previous and previous.get('edges'):
+        logger.info(f"  vs previous : edges {summary['edges'] - previous['edges']:+d}, "
+                    f"cpu {_fmt_delta(summary['cpu_s'], previous['cpu_s'], 's')}, "
+                    f"wall {_fmt_delta(summary['wall_s'], previous['wall_s'], 's')}")
+    for pattern, spot in summary['hot_spots'].items():
+        share = spot['cpu_s'] / summary['cpu_s'] * 100 if summary['cpu_s'] else 0
+        logger.info(f"  {pattern:<24}: {spot['edges']} edges, {spot['cpu_s']:.1f}s CPU ({share:.0f}%)")
+    logger.info("  Slowest edges:")
+    for edge in summary['slowest']:
+        logger.info(f"    {edge['seconds']:>8.1f}s  {edge['output']}")
+    logger.info("=" * 50)
+
+
+def record_build(out_dir, offset, target, returncode, logger=None):
+    """Summarize the build that just ran in out_dir and append it to the history."""
+    if logger is None:
+        logger = get_logger()
+    out_dir = Path(out_dir)
+    if not (out_dir / NINJA_LOG).exists():
+        logger.info(f"No {NINJA_LOG} in {out_dir}, skipping build telemetry.")
+        return None
+
+    summary = summarize(read_ninja_log(out_dir, offset))
+    history = load_history(out_dir)
+    previous = next((h for h in reversed(history)
+                     if h.get('edges') and h.get('target') == target), None)
+    log_summary(summary, previous, logger)
+
+    summary.update({
+        'timestamp': int(time.time()),
+        'target': target,
+        'returncode': returncode,
+    })
+    history = (history + [summary])[-HISTORY_LIMIT:]
+    try:
+        (out_dir / HISTORY_FILE).write_text(json.dumps(history, indent=2))
+    except OSError as e:
+        logger.warning(f"Could not write build history: {e}")
+    return summary
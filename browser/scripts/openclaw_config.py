@@ -106,3 +106,25 @@ def ensure_ocbot_openclaw_config(config_dir=None, workspace_dir=None):
                 json.dump(config, f, indent=2)
 
     return config_file
+
+
+def get_enabled_channels(config_file):
+    """
+    Return the channel ids configured in openclaw.json, plus plugin ids
+    explicitly enabled under plugins.entries.  Channels with
+    "enabled": false don't count.  Returns None if the config can't be read.
+    """
+    try:
+        with open(config_file, 'r') as f:
+            config = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    enabled = set()
+    for channel_id, entry in (config.get('channels') or {}).items():
+        if isinstance(entry, dict) and entry.get('enabled', True) is not False:
+            enabled.add(channel_id)
+    for plugin_id, entry in ((config.get('plugins') or {}).get('entries') or {}).items():
+        if isinstance(entry, dict) and entry.get('enabled') is True:
+            enabled.add(plugin_id)
+    return enabled
@@ -4,14 +4,19 @@
 import argparse
 import json
 import os
+import shlex
 import shutil
 import subprocess
 import sys
 import tempfile
+import time
 import zipfile
+from collections import Counter
 from pathlib import Path
 
-from common import get_logger, get_project_root, get_source_dir, get_product_version, get_agent_root, get_out_dir_name
+from archive import ARTIFACT_LEVELS, iter_entries, write_zip
+from artifact_stats import PhaseTimer, record_artifact
+from common import copy_file, copy_tree, format_copy_stats, get_logger, get_project_root, get_source_dir, get_product_version, get_agent_root, get_out_dir_name
 
 if sys.platform == 'darwin':
     import plistlib
@@ -49,26 +54,87 @@ def _read_plist(app_path):
     return name, version
 
 
-def sign_app(app_path, identity, entitlements=None):
+# codesign mostly waits on the timestamp server, so more jobs than cores help.
+SIGN_JOBS = 8
+
+
+def _signing_targets(app_path):
+    """Return [(path, with_entitlements)] of everything sign_app() signs.
+
+    Covers dylibs in the main framework, standalone helper executables,
+    helper .app bundles and their executables, the main framework, the
+    main executable and the app bundle itself.
+    """
+    contents = app_path / 'Contents'
+    frameworks_dir = contents / 'Frameworks'
+    targets = []
+
+    # Find the main framework (e.g. Ocbot Framework.framework)
+    main_framework = None
+    for item in frameworks_dir.iterdir():
+        if item.name.endswith('.framework'):
+            main_framework = item
+            break
+
+    if main_framework:
+        for lib in main_framework.glob('**/*.dylib'):
+            targets.append((lib, False))
+        for helper_dir in main_framework.glob('**/Helpers'):
+            if not helper_dir.is_dir():
+                continue
+            for item in sorted(helper_dir.iterdir()):
+                if item.name.startswith('.'):
+                    continue
+                if item.is_file() and os.access(item, os.X_OK):
+                    targets.append((item, True))
+        for helper_app in main_framework.glob('**/Helpers/*.app'):
+            macos_dir = helper_app / 'Contents' / 'MacOS'
+            if macos_dir.exists():
+                for exe in macos_dir.iterdir():
+                    if exe.is_file():
+                        targets.append((exe, True))
+            targets.append((helper_app, True))
+        targets.append((main_framework, False))
+
+    # Sign the main executable explicitly to ensure Hardened Runtime is applied
+    main_executable = contents / 'MacOS' / app_path.stem
+    if main_executable.exists():
+        targets.append((main_executable, True))
+    targets.append((app_path, True))
+    # Frameworks reach the same files through Versions/Current symlinks;
+    # each real file is signed once (and never twice concurrently).
+    unique = {}
+    for path, with_entitlements in targets:
+        unique.setdefault(path.resolve(), with_entitlements)
+    return list(unique.items())
+
+
+def sign_app(app_path, identity, entitlements=None, codesign=None, jobs=SIGN_JOBS):
     """Sign the application bundle for notarization.
 
-    Signing order (inside-out):
-      1. dylibs in Libraries/
-      2. Standalone helper executables (app_mode_loader, crashpad, etc.)
-      3. Helper .app bundles (inner exe first, then the bundle)
-      4. The main framework bundle
-      5. The top-level .app bundle
+    Signing has to go inside-out: a bundle's signature seals the signatures
+    of everything nested in it.  Each target (dylib, helper executable,
+    helper .app, framework, main executable, the .app itself) is a step
+    that depends on the targets nested inside it, and independent targets
+    are signed concurrently, `jobs` at a time.
     Every binary gets --options runtime --timestamp so notarization passes.
+
+    codesign is the signer command (default: $OCBOT_CODESIGN or codesign),
+    so the ordering can be exercised with a stub that records its calls.
     """
+    from dag import Step, run_steps
+
     logger.info(f"Signing {app_path} with identity '{identity}'...")
+    if codesign is None:
+        codesign = shlex.split(os.environ.get('OCBOT_CODESIGN', 'codesign'))
 
     if "Apple Distribution" in identity:
         logger.warning("WARNING: 'Apple Distribution' certificates cannot be notarized.")
         logger.warning("Use a 'Developer ID Application' certificate instead.")
 
     def _codesign(path, with_entitlements=False):
-        cmd = [
-            'codesign', '--force', '--verbose',
+        cmd = codesign + [
+            '--force', '--verbose',
             '--options', 'runtime',
             '--timestamp',
             '--sign', identity,
@@ -76,66 +142,25 @@ def sign_app(app_path, identity, entitlements=None):
         if with_entitlements and entitlements:
             cmd.extend(['--entitlements', str(entitlements)])
         cmd.append(str(path))
-        logger.info(f"  Signing {path.name}")
         subprocess.run(cmd, check=True)
 
     try:
-        contents = app_path / 'Contents'
-        frameworks_dir = contents / 'Frameworks'
-
-        # Find the main framework (e.g. Ocbot Framework.framework)
-        main_framework = None
-        for item in frameworks_dir.iterdir():
-            if item.name.endswith('.framework'):
-                main_framework = item
-                break
-
-        if main_framework:
-            # 1. Sign all dylibs (Libraries/*.dylib)
-            logger.info("Signing dylibs...")
-            for lib in main_framework.glob('**/*.dylib'):
-                _codesign(lib)
-
-            # 2. Sign standalone helper executables (not inside .app bundles)
-            logger.info("Signing standalone helper executables...")
-            for helper_dir in main_framework.glob('**/Helpers'):
-                if not helper_dir.is_dir():
-                    continue
-                for item in sorted(helper_dir.iterdir()):
-                    if item.name.startswith('.'):
-                        continue
-                    if item.is_file() and os.access(item, os.X_OK):
-                        _codesign(item, with_entitlements=True)
-
-            # 3. Sign helper .app bundles (exe inside first, then the bundle)
-            logger.info("Signing helper app bundles...")
-            for helper_app in main_framework.glob('**/Helpers/*.app'):
-                macos_dir = helper_app / 'Contents' / 'MacOS'
-                if macos_dir.exists():
-                    for exe in macos_dir.iterdir():
-                        if exe.is_file():
-                            _codesign(exe, with_entitlements=True)
-                _codesign(helper_app, with_entitlements=True)
-
-            # 4. Sign the framework bundle itself
-            logger.info("Signing framework bundle...")
-            _codesign(main_framework)
-
-        # 5. Sign the top-level app bundle
-        logger.info("Signing app bundle...")
-        
-        # Explicitly sign the main executable first to ensure Hardened Runtime is applied
-        main_executable = app_path / 'Contents' / 'MacOS' / app_path.stem
-        if main_executable.exists():
-             logger.info(f"Signing main executable: {main_executable.name}")
-             _codesign(main_executable, with_entitlements=True)
-             
-        _codesign(app_path, with_entitlements=True)
+        targets = _signing_targets(app_path)
+        root = app_path.resolve().parent
+        steps = []
+        for path, with_entitlements in targets:
+            nested = [other for other, _ in targets if path in other.parents]
+            steps.append(Step(
+                path.relative_to(root).as_posix(),
+                lambda path=path, ent=with_entitlements: _codesign(path, ent),
+                deps=[other.relative_to(root).as_posix() for other in nested]))
+        logger.info(f"Signing {len(steps)} targets ({jobs} at a time)...")
+        run_steps(steps, cpu_budget=jobs, logger=logger, report=False)
 
         # Verify the signature
         logger.info("Verifying signature...")
-        subprocess.run([
-            'codesign', '--verify', '--deep', '--strict', '--verbose=2',
+        subprocess.run(codesign + [
+            '--verify', '--deep', '--strict', '--verbose=2',
             str(app_path),
         ], check=True)
         logger.info("Signature verification passed.")
@@ -249,6 +274,7 @@ def package_dmg(args):
             logger.error("Code signing identity (--sign) is required for notarization.")
             sys.exit(1)
 
+    timer = PhaseTimer()
     with tempfile.TemporaryDirectory() as tmpdir:
         staging = Path(tmpdir) / 'staging'
         staging.mkdir()
@@ -256,9 +282,10 @@ def package_dmg(args):
         # Copy .app and create Applications symlink
         dest_app = staging / f"{app_name}.app"
         logger.info("Copying app bundle to staging area...")
-        if dest_app.exists():
-            shutil.rmtree(dest_app)
-        shutil.copytree(app_path, dest_app, symlinks=True)
+        with timer.phase('staging'):
+            stats = copy_tree(app_path, dest_app)
+        logger.info(f"  {format_copy_stats(stats)}")
+        file_count = sum(len(files) for _, _, files in os.walk(dest_app))
 
         # Copy extension if provided
         # ext_src = getattr(args, 'extension_src', None)
@@ -274,13 +301,15 @@ def package_dmg(args):
         # Sign the app in staging
         if sign_identity:
             entitlements = entitlements_file if entitlements_file.exists() else None
-            sign_app(dest_app, sign_identity, entitlements)
+            with timer.phase('signing'):
+                sign_app(dest_app, sign_identity, entitlements)
 
         (staging / 'Applications').symlink_to('/Applications')
 
         # Create writable DMG
         rw_dmg = Path(tmpdir) / 'rw.dmg'
         logger.info("Creating writable DMG...")
+        image_start = time.monotonic()
         subprocess.run([
             'hdiutil', 'create',
             '-srcfolder', str(staging),
@@ -316,16 +345,18 @@ def package_dmg(args):
                 subprocess.run([
                     'hdiutil', 'detach', str(mount_point), '-quiet',
                 ], check=True)
+        timer.add('image', time.monotonic() - image_start)
 
         # Convert to compressed DMG
         logger.info("Compressing DMG (LZMA)...")
         if final_dmg.exists():
             final_dmg.unlink()
-        subprocess.run([
-            'hdiutil', 'convert', str(rw_dmg),
-            '-format', 'ULMO',
-            '-o', str(final_dmg),
-        ], check=True)
+        with timer.phase('compression'):
+            subprocess.run([
+                'hdiutil', 'convert', str(rw_dmg),
+                '-format', 'ULMO',
+                '-o', str(final_dmg),
+            ], check=True)
 
     # Notarization
     notary_profile = getattr(args, 'notarize', None) or os.environ.get('NOTARY_PROFILE')
@@ -334,21 +365,27 @@ def package_dmg(args):
     password = getattr(args, 'password', None) or os.environ.get('NOTARY_PASSWORD')
 
     if notary_profile or (apple_id and team_id and password):
-        notarize_dmg(final_dmg, notary_profile, apple_id, team_id, password)
+        with timer.phase('notarization'):
+            notarize_dmg(final_dmg, notary_profile, apple_id, team_id, password)
 
     # Verify
     logger.info("Verifying DMG...")
-    subprocess.run(['hdiutil', 'verify', str(final_dmg)], check=True)
+    with timer.phase('verification'):
+        subprocess.run(['hdiutil', 'verify', str(final_dmg)], check=True)
 
     size_mb = final_dmg.stat().st_size / (1024 * 1024)
     logger.info(f"Done: {final_dmg} ({size_mb:.1f} MB)")
+    arch = getattr(args, 'arch', None)
+    record_artifact(f"dmg-{arch}" if arch else 'dmg', final_dmg, product_version,
+                    phases=timer.phases, files=file_count, total_s=timer.elapsed)
 
 
-def _stage_files(out_dir, staging_dir):
-    """Copy runtime files to staging directory."""
-    staging_dir = Path(staging_dir)
-    staging_dir.mkdir(parents=True, exist_ok=True)
-    
+def _portable_files(out_dir):
+    """Return the sorted (source path, arcname) list of runtime files in out_dir.
+
+    This is the single source of truth for what ships in the portable zip
+    and the Inno Setup installer.
+    """
     portable_patterns = [
         '*.exe', '*.dll', '*.pak', '*.bin', '*.dat','*.manifest'
     ]
@@ -359,28 +396,44 @@ def _stage_files(out_dir, staging_dir):
     ]
     extra_files = ['icudtl.dat', 'v8_context_snapshot.bin', 'snapshot_blob.bin']
 
-    logger.info(f"Staging files from {out_dir} to {staging_dir}...")
+    files = {}
 
-    # Copy patterns
+    # Patterns
     for pattern in portable_patterns:
         for f in out_dir.glob(pattern):
             if f.is_file():
-                shutil.copy2(f, staging_dir / f.name)
+                files[f.name] = f
 
-    # Copy directories
+    # Directories
     for dirname in portable_dirs:
         src = out_dir / dirname
         if src.exists() and src.is_dir():
-            dest = staging_dir / dirname
-            if dest.exists():
-                shutil.rmtree(dest)
-            shutil.copytree(src, dest)
+            for path, arcname in iter_entries([(src, dirname)], include_dirs=False,
+                                              follow_symlinks=True):
+                files[arcname] = path
 
-    # Copy extra files
+    # Extra files
     for extra in extra_files:
         src = out_dir / extra
         if src.exists():
-            shutil.copy2(src, staging_dir / extra)
+            files[extra] = src
+
+    return sorted(((path, arcname) for arcname, path in files.items()), key=lambda e: e[1])
+
+
+def _stage_files(out_dir, staging_dir):
+    """Copy runtime files to staging directory."""
+    staging_dir = Path(staging_dir)
+    staging_dir.mkdir(parents=True, exist_ok=True)
+
+    logger.info(f"Staging files from {out_dir} to {staging_dir}...")
+    stats = Counter()
+    for src, arcname in _portable_files(out_dir):
+        dest = staging_dir / arcname
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        # ISCC only reads the staged files
+        stats[copy_file(src, dest, immutable=True)] += 1
+    logger.info(f"  {format_copy_stats(stats)}")
 
 # VC++ Redistributable download URL (VS 2015-2022, x64)
 _VCREDIST_URL = "https://aka.ms/vs/17/release/vc_redist.x64.exe"
@@ -423,9 +476,8 @@ def _ensure_vcredist(staging_dir):
         logger.warning("Install may fail on systems without VC++ Runtime.")
         logger.warning(f"Manually download from {_VCREDIST_URL} and place at {cached}")
 
-def _create_inno_installer(staging_dir, dist_dir, version):
-    """Create Inno Setup installer."""
-    # Check for ISCC
+def _find_iscc():
+    """Return the Inno Setup Compiler path, or None."""
     iscc = shutil.which('iscc')
     if not iscc:
         # Check common paths
@@ -437,11 +489,11 @@ def _create_inno_installer(staging_dir, dist_dir, version):
             if os.path.exists(p):
                 iscc = p
                 break
+    return iscc
 
-    if not iscc:
-        logger.warning("Inno Setup Compiler (ISCC) not found. Skipping installer creation.")
-        return
 
+def _create_inno_installer(iscc, staging_dir, dist_dir, version):
+    """Create Inno Setup installer. Returns its path, or None if it wasn't built."""
     # Ensure VC++ Redistributable is available for bundling
     _ensure_vcredist(staging_dir)
 
@@ -467,8 +519,10 @@ def _create_inno_installer(staging_dir, dist_dir, version):
         if installer_path.exists():
             size_mb = installer_path.stat().st_size / (1024 * 1024)
             logger.info(f"Inno Installer: {installer_path} ({size_mb:.1f} MB)")
+            return installer_path
     except subprocess.CalledProcessError as e:
         logger.error(f"Inno Setup failed: {e}")
+    return None
 
 
 def package_windows(args):
@@ -487,12 +541,12 @@ def package_windows(args):
 
     # Sync extension before packaging
     extension_src = get_agent_root() / '.output' / 'chrome-mv3'
+    sync_timer = PhaseTimer()
     if extension_src.exists():
         dest = out_dir / 'resources' / 'ocbot'
-        if dest.exists():
-            shutil.rmtree(dest)
-        shutil.copytree(extension_src, dest)
-        logger.info(f"Extension synced to {dest}")
+        with sync_timer.phase('staging'):
+            stats = copy_tree(extension_src, dest, immutable=True)
+        logger.info(f"Extension synced to {dest} ({format_copy_stats(stats)})")
     else:
         logger.warning(f"Extension build output not found: {extension_src}")
 
@@ -505,20 +559,39 @@ def package_windows(args):
     mini_installer = out_dir / 'mini_installer.exe'
     if mini_installer.exists():
         dest_installer = dist_dir / f"Ocbot-{product_version}-win-x64-mini.exe"
-        shutil.copy2(mini_installer, dest_installer)
+        timer = PhaseTimer()
+        with timer.phase('staging'):
+            shutil.copy2(mini_installer, dest_installer)
         size_mb = dest_installer.stat().st_size / (1024 * 1024)
         logger.info(f"Mini Installer: {dest_installer} ({size_mb:.1f} MB)")
-
-    # --- 2. Create Staging Directory ---
-    import tempfile
-    with tempfile.TemporaryDirectory() as staging_dir_str:
-        staging_dir = Path(staging_dir_str)
-        _stage_files(out_dir, staging_dir)
-
-        # --- 3. Create Portable Zip ---
-        portable_zip_path = dist_dir / f"Ocbot-{product_version}-win-x64-portable"
-        logger.info(f"Creating portable zip: {portable_zip_path}.zip")
-        shutil.make_archive(str(portable_zip_path), 'zip', staging_dir)
-        
-        # --- 4. Create Inno Setup Installer ---
-        _create_inno_installer(staging_dir, dist_dir, product_version)
+        record_artifact('win-mini', dest_installer, product_version, phases=timer.phases)
+
+    # --- 2. Create Portable Zip (streamed from out_dir, no staging copy) ---
+    portable_zip_path = dist_dir / f"Ocbot-{product_version}-win-x64-portable.zip"
+    logger.info(f"Creating portable zip: {portable_zip_path}")
+    timer = PhaseTimer()
+    timer.phases.update(sync_timer.phases)
+    portable_files = _portable_files(out_dir)
+    with timer.phase('compression'):
+        _, _, size = write_zip(portable_zip_path, portable_files,
+                               level=ARTIFACT_LEVELS['portable'])
+    logger.info(f"Portable zip: {portable_zip_path} ({size / (1024 * 1024):.1f} MB)")
+    record_artifact('win-portable', portable_zip_path, product_version,
+                    phases=timer.phases, files=len(portable_files))
+
+    # --- 3. Create Inno Setup Installer ---
+    # setup.iss reads its files from a SourceDir, so only this step stages.
+    iscc = _find_iscc()
+    if not iscc:
+        logger.warning("Inno Setup Compiler (ISCC) not found. Skipping installer creation.")
+        return
+    timer = PhaseTimer()
+    with tempfile.TemporaryDirectory() as tmp:
+        staging_dir = Path(tmp) / 'staging'
+        with timer.phase('staging'):
+            _stage_files(out_dir, staging_dir)
+        with timer.phase('compression'):
+            installer_path = _create_inno_installer(iscc, staging_dir, dist_dir, product_version)
+    if installer_path:
+        record_artifact('win-setup', installer_path, product_version,
+                        phases=timer.phases, files=len(portable_files))
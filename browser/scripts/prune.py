@@ -0,0 +1,363 @@
+"""Prune production node_modules before they are archived.
+
+npm installs a lot that never runs: READMEs, changelogs, test suites,
+TypeScript declarations, source maps, and prebuilt native binaries for
+every platform.  prune_node_modules() removes those using a conservative
+built-in rule set before the base layer or an extension's .deps.tar.gz is
+written, then checks that every top-level package that could be
+require()d before still can.
+
+Rules can be adjusted per package in runtime_prune.json at the project
+root (optional):
+
+    {
+      "disable": ["*.d.ts"],
+      "packages": {
+        "some-package": {"keep": ["docs/**"], "remove": ["assets/*.psd"]},
+        "@scope/other": {"skip": true}
+      }
+    }
+
+"disable" turns off built-in rules globally, "keep" protects paths that a
+rule would remove, "remove" adds package-specific removals and "skip"
+leaves a package untouched.  Patterns are matched against the path
+relative to the package root, and bare names (no '/') also against each
+file or directory name.  package.json and anything reachable from its
+main/bin/exports fields is never removed.
+"""
+
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+from fnmatch import fnmatchcase
+from pathlib import Path, PurePosixPath
+
+from common import get_logger, get_project_root
+
+PRUNE_CONFIG = 'runtime_prune.json'
+
+# Directories removed from the package root only: deeper ones (lib/spec/)
+# may well be loaded at runtime.
+DEFAULT_DIR_RULES = (
+    '__tests__', 'test', 'tests', 'spec', 'example', 'examples',
+    'benchmark', 'benchmarks', 'coverage', '.github', 'docs',
+)
+
+# Documentation file names, removed bare or with a doc extension only:
+# lib/history.js or authors.json are code and must survive.
+DOC_NAMES = ('readme', 'changelog', 'changes', 'history', 'contributing', 'authors')
+DOC_EXTENSIONS = ('', '.md', '.markdown', '.txt', '.rst')
+
+# Files removed by (case-insensitive) name.  License files are kept.
+DEFAULT_FILE_RULES = tuple(name + ext for name in DOC_NAMES for ext in DOC_EXTENSIONS) + (
+    '*.md', '*.markdown', '*.map',
+    # Declarations only: .ts sources can be entry points (e.g. via jiti)
+    '*.d.ts', '*.d.mts', '*.d.cts', '*.tsbuildinfo', 'tsconfig*.json',
+    '.eslintrc*', '.prettierrc*', '.editorconfig', '.travis.yml', '.npmignore',
+)
+
+# Node's process.platform values, used to recognise prebuilds/<platform>-<arch>/
+NODE_PLATFORMS = ('darwin', 'win32', 'linux', 'freebsd', 'openbsd', 'android', 'sunos', 'aix')
+
+
+def node_target(platform_tag):
+    """Map a layer platform tag (macos-arm64, win-x64, linux-x86_64) to (platform, arch)."""
+    system, _, machine = platform_tag.partition('-')
+    platform = {'macos': 'darwin', 'win': 'win32'}.get(system, system)
+    arch = {'x86_64': 'x64', 'amd64': 'x64', 'aarch64': 'arm64'}.get(machine, machine)
+    return platform, arch or None
+
+
+def load_prune_config(path=None):
+    """Load the pruning overrides, or an empty config if there are none."""
+    path = Path(path) if path else get_project_root() / PRUNE_CONFIG
+    try:
+        config = json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        get_logger().warning(f"Ignoring unreadable prune config {path}: {e}")
+        return {}
+    return config if isinstance(config, dict) else {}
+
+
+def _matches(rel, patterns):
+    """True if a package-relative posix path matches any pattern."""
+    rel_lower = rel.lower()
+    name = rel_lower.rsplit('/', 1)[-1]
+    for pattern in patterns:
+        pattern = pattern.lower()
+        if '/' in pattern:
+            if fnmatchcase(rel_lower, pattern):
+                return True
+        elif fnmatchcase(name, pattern):
+            return True
+    return False
+
+
+def _entry_points(pkg_dir):
+    """Package-relative paths referenced by package.json main/bin/exports."""
+    try:
+        pkg = json.loads((pkg_dir / 'package.json').read_text())
+    except (OSError, json.JSONDecodeError):
+        return set()
+
+    found = set()
+
+    def _collect(value):
+        if isinstance(value, str):
+            found.add(str(PurePosixPath(value[2:] if value.startswith('./') else value)))
+        elif isinstance(value, dict):
+            for v in value.values():
+                _collect(v)
+        elif isinstance(value, list):
+            for v in value:
+                _collect(v)
+
+    for field in ('main', 'module', 'bin', 'exports'):
+        _collect(pkg.get(field))
+    return found
+
+
+def _protected(rel, entry_points):
+    if rel == 'package.json' or rel.lower().startswith('license'):
+        return True
+    for entry in entry_points:
+        if '*' in entry:
+            if fnmatchcase(rel, entry):
+                return True
+        elif rel == entry or entry.startswith(rel + '/'):
+            return True
+    return False
+
+
+def _is_foreign_prebuild(rel, platform, arch):
+    """True for prebuilds/<platform>-<arch>[+<arch>...] dirs of another target."""
+    parts = rel.split('/')
+    if len(parts) != 2 or parts[0] != 'prebuilds' or platform is None:
+        return False
+    os_part, _, arch_part = parts[1].partition('-')
+    if os_part not in NODE_PLATFORMS:
+        return False
+    if os_part != platform:
+        return True
+    return bool(arch and arch_part and arch not in arch_part.split('+'))
+
+
+def _iter_packages(node_modules):
+    """Yield (name, path) for every package, including nested node_modules."""
+    stack = [Path(node_modules)]
+    while stack:
+        nm = stack.pop()
+        try:
+            children = sorted(nm.iterdir())
+        except OSError:
+            continue
+        for child in children:
+            if child.is_symlink() or not child.is_dir() or child.name.startswith('.'):
+                continue
+            candidates = sorted(child.iterdir()) if child.name.startswith('@') else [child]
+            for pkg_dir in candidates:
+                if pkg_dir.is_symlink() or not (pkg_dir / 'package.json').is_file():
+                    continue
+                name = pkg_dir.relative_to(nm).as_posix()
+                yield name, pkg_dir
+                if (pkg_dir / 'node_modules').is_dir():
+                    stack.append(pkg_dir / 'node_modules')
+
+
+def _tree_size(path):
+    if path.is_symlink() or not path.is_dir():
+        return 1, path.lstat().st_size
+    files = size = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                size += os.lstat(os.path.join(dirpath, name)).st_size
+                files += 1
+            except OSError:
+                pass
+    return files, size
+
+
+def _prune_package(pkg_dir, dir_rules, file_rules, overrides, platform, arch, dry_run):
+    """Remove prunable paths inside one package. Returns (files, bytes)."""
+    entry_points = _entry_points(pkg_dir)
+    keep = overrides.get('keep', [])
+    remove = overrides.get('remove', [])
+    files = size = 0
+
+    for dirpath, dirnames, filenames in os.walk(pkg_dir):
+        rel_dir = Path(dirpath).relative_to(pkg_dir).as_posix()
+        prefix = '' if rel_dir == '.' else rel_dir + '/'
+
+        # Nested packages are pruned on their own
+        if 'node_modules' in dirnames:
+            dirnames.remove('node_modules')
+
+        victims = []
+        for name in list(dirnames):
+            rel = prefix + name
+            if (_matches(rel, keep) or _protected(rel, entry_points)
+                    or any(k.lower().startswith(rel.lower() + '/') for k in keep)):
+                continue
+            if ((not prefix and name in dir_rules) or _matches(rel, remove)
+                    or _is_foreign_prebuild(rel, platform, arch)):
+                dirnames.remove(name)
+                victims.append(Path(dirpath) / name)
+        for name in filenames:
+            rel = prefix + name
+            if _matches(rel, keep) or _protected(rel, entry_points):
+                continue
+            if _matches(rel, file_rules) or _matches(rel, remove):
+                victims.append(Path(dirpath) / name)
+
+        for victim in victims:
+            count, nbytes = _tree_size(victim)
+            files += count
+            size += nbytes
+            if dry_run:
+                continue
+            if victim.is_dir() and not victim.is_symlink():
+                shutil.rmtree(victim)
+            else:
+                victim.unlink()
+    return files, size
+
+
+# Requires (or, for ES modules, imports) each named package from the
+# node_modules next to argv[2] and prints the names that loaded.
+_LOAD_CHECK_JS = r"""
+const { pathToFileURL } = require('url');
+const [names, base] = [JSON.parse(process.argv[1]), process.argv[2]];
+(async () => {
+  const loaded = [];
+  for (const name of names) {
+    try {
+      const resolved = require.resolve(name, { paths: [base] });
+      try {
+        require(resolved);
+      } catch (e) {
+        if (e.code !== 'ERR_REQUIRE_ESM' && e.code !== 'ERR_REQUIRE_ASYNC_MODULE') throw e;
+        await import(pathToFileURL(resolved).href);
+      }
+      loaded.push(name);
+    } catch (e) {}
+  }
+  process.stdout.write(JSON.stringify(loaded));
+  process.exit(0);
+})();
+"""
+LOAD_CHECK_TIMEOUT = 300
+
+
+def loadable_packages(node_modules, names):
+    """Return the subset of names that node can load from node_modules.
+
+    Returns None if the check could not run (no node, crash, timeout).
+    """
+    node_modules = Path(node_modules)
+    try:
+        result = subprocess.run(
+            ['node', '-e', _LOAD_CHECK_JS, json.dumps(sorted(names)), str(node_modules.parent)],
+            cwd=node_modules.parent, capture_output=True, text=True,
+            timeout=LOAD_CHECK_TIMEOUT,
+        )
+        return set(json.loads(result.stdout)) if result.returncode == 0 else None
+    except (OSError, subprocess.TimeoutExpired, json.JSONDecodeError):
+        return None
+
+
+def _top_level_packages(node_modules):
+    """Names of the packages directly in node_modules (not nested ones)."""
+    node_modules = Path(node_modules)
+    return {name for name, pkg_dir in _iter_packages(node_modules)
+            if node_modules in (pkg_dir.parent, pkg_dir.parent.parent)}
+
+
+def _host_target():
+    return node_target(f'{sys.platform}-{platform.machine().lower()}')
+
+
+def prune_node_modules(node_modules, platform_tag=None, platform=None, arch=None,
+                       config=None, dry_run=False, verify=True, logger=None):
+    """Prune a node_modules tree in place.
+
+    Args:
+        node_modules: Path to the node_modules directory.
+        platform_tag: Layer platform tag (e.g. macos-arm64); prebuilt
+            binaries for other platforms/architectures are removed.
+        platform, arch: Node platform/arch to keep prebuilds for, when no
+            platform_tag is given.  arch=None keeps every architecture
+            (needed for universal macOS bundles).
+        config: Overrides dict; loaded from runtime_prune.json if None.
+        dry_run: Only report what would be removed.
+        verify: Check with node that every top-level package that loaded
+            before pruning still loads afterwards.  Skipped for trees
+            built for another platform, whose native modules can't load here.
+
+    Returns:
+        {package name: (files, bytes)} for every package that lost something.
+
+    Raises:
+        RuntimeError: A package no longer loads after pruning.
+    """
+    if logger is None:
+        logger = get_logger()
+    if platform_tag:
+        platform, arch = node_target(platform_tag)
+    if config is None:
+        config = load_prune_config()
+
+    disabled = set(config.get('disable', []))
+    dir_rules = {r for r in DEFAULT_DIR_RULES if r not in disabled}
+    file_rules = [r for r in DEFAULT_FILE_RULES if r not in disabled]
+    package_overrides = config.get('packages', {})
+
+    loaded = None
+    if verify and not dry_run:
+        host_platform, host_arch = _host_target()
+        if platform == host_platform and arch in (None, host_arch):
+            packages = _top_level_packages(node_modules)
+            loaded = loadable_packages(node_modules, packages)
+            if loaded is None:
+                logger.warning("Could not run node; skipping the post-prune load check")
+        else:
+            logger.info(f"Not checking package loads for {platform}-{arch or 'any'} on this host")
+
+    report = {}
+    for name, pkg_dir in _iter_packages(node_modules):
+        overrides = package_overrides.get(name, {})
+        if overrides.get('skip'):
+            continue
+        files, size = _prune_package(pkg_dir, dir_rules, file_rules, overrides,
+                                     platform, arch, dry_run)
+        if files:
+            prev_files, prev_size = report.get(name, (0, 0))
+            report[name] = (prev_files + files, prev_size + size)
+
+    log_prune_report(report, dry_run=dry_run, logger=logger)
+
+    if loaded:
+        broken = sorted(loaded - (loadable_packages(node_modules, loaded) or set()))
+        if broken:
+            raise RuntimeError(f"Pruning broke loading {', '.join(broken)}; "
+                               f"add keep rules in {PRUNE_CONFIG}")
+        logger.info(f"Load check: {len(loaded)} packages still load after pruning")
+    return report
+
+
+def log_prune_report(report, dry_run=False, top_n=20, logger=None):
+    """Log the total saving and the packages that shrank the most."""
+    if logger is None:
+        logger = get_logger()
+    total_files = sum(files for files, _ in report.values())
+    total_size = sum(size for _, size in report.values())
+    verb = 'Would prune' if dry_run else 'Pruned'
+    logger.info(f"{verb} {total_files} files ({total_size / (1024 * 1024):.1f} MB) "
+                f"from {len(report)} packages")
+    for name, (files, size) in sorted(report.items(), key=lambda kv: kv[1][1], reverse=True)[:top_n]:
+        logger.info(f"  {size / 1024:>10.0f} KB  {files:>6} files  {name}")
@@ -0,0 +1,148 @@
+"""Local directory stand-in for the R2 bucket.
+
+Set OCBOT_R2_LOCAL_DIR to a directory and release.py uploads there instead
+of Cloudflare R2, so the release pipeline (including latest.json merging
+and runtime deltas) can be exercised without credentials.  Only the small
+subset of the boto3 S3 client API that release.py uses is implemented.
+
+Objects live at <root>/<bucket>/<key>; their content type, metadata and
+ETag are kept in a JSON sidecar under <root>/.meta/<bucket>/<key>.json.
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import os
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+_thread_lock = threading.Lock()
+
+
+class ClientError(Exception):
+    """Mirrors botocore's ClientError closely enough for error-code checks."""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code}: {message}")
+        self.response = {'Error': {'Code': code, 'Message': message}}
+
+
+class NoSuchKey(ClientError):
+    def __init__(self, key):
+        super().__init__('NoSuchKey', f"The specified key does not exist: {key}")
+
+
+class _Exceptions:
+    ClientError = ClientError
+    NoSuchKey = NoSuchKey
+
+
+class LocalR2Client:
+    """boto3-compatible S3 client backed by a local directory."""
+
+    exceptions = _Exceptions
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with _thread_lock, open(self.root / '.lock', 'a+b') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _paths(self, bucket, key):
+        if key.startswith('/') or '..' in Path(key).parts:
+            raise ClientError('InvalidKey', key)
+        return self.root / bucket / key, self.root / '.meta' / bucket / f'{key}.json'
+
+    def _write(self, bucket, key, src, extra):
+        obj, meta = self._paths(bucket, key)
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        meta.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp = obj.with_name(obj.name + '.part')
+        md5 = hashlib.md5()
+        with open(tmp, 'wb') as f:
+            while True:
+                chunk = src.read(1 << 20)
+                if not chunk:
+                    break
+                md5.update(chunk)
+                f.write(chunk)
+        os.replace(tmp, obj)
+
+        info = {
+            'ETag': f'"{md5.hexdigest()}"',
+            'ContentType': extra.get('ContentType', 'binary/octet-stream'),
+            'CacheControl': extra.get('CacheControl'),
+            'Metadata': extra.get('Metadata', {}),
+        }
+        meta.write_text(json.dumps(info, indent=2))
+        return info
+
+    def _read_meta(self, bucket, key):
+        obj, meta = self._paths(bucket, key)
+        if not obj.is_file():
+            raise NoSuchKey(key)
+        try:
+            return obj, json.loads(meta.read_text())
+        except (OSError, json.JSONDecodeError):
+            return obj, {'ETag': '""', 'ContentType': 'binary/octet-stream', 'Metadata': {}}
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None, Config=None, Callback=None):
+        with open(Filename, 'rb') as f:
+            self._write(Bucket, Key, f, ExtraArgs or {})
+        if Callback:
+            Callback(Path(Filename).stat().st_size)
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, **kwargs):
+        if isinstance(Body, str):
+            Body = Body.encode()
+        if isinstance(Body, (bytes, bytearray)):
+            Body = io.BytesIO(Body)
+        if IfMatch is None and IfNoneMatch is None:
+            return {'ETag': self._write(Bucket, Key, Body, kwargs)['ETag']}
+
+        # Conditional PUT: check and write under a lock shared by every
+        # process using this directory, like R2 does atomically.
+        with self._locked():
+            try:
+                _, current = self._read_meta(Bucket, Key)
+                etag = current['ETag']
+            except NoSuchKey:
+                etag = None
+            if IfNoneMatch == '*' and etag is not None:
+                raise ClientError('PreconditionFailed', f"{Key} already exists")
+            if IfMatch is not None and IfMatch != etag:
+                raise ClientError('PreconditionFailed', f"{Key} ETag is {etag}, not {IfMatch}")
+            return {'ETag': self._write(Bucket, Key, Body, kwargs)['ETag']}
+
+    def head_object(self, Bucket, Key):
+        obj, info = self._read_meta(Bucket, Key)
+        return dict(info, ContentLength=obj.stat().st_size)
+
+    def get_object(self, Bucket, Key):
+        obj, info = self._read_meta(Bucket, Key)
+        return dict(info, ContentLength=obj.stat().st_size, Body=io.BytesIO(obj.read_bytes()))
+
+    def delete_object(self, Bucket, Key):
+        obj, meta = self._paths(Bucket, Key)
+        for path in (obj, meta):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        return {}
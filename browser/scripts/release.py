@@ -4,8 +4,15 @@ import json
 import sys
 import subprocess
 import os
+import random
 import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from archive import ARTIFACT_LEVELS, iter_entries, write_zip
+from artifact_stats import PhaseTimer, record_artifact
+from build_runtime import sha256_file
 from common import get_logger, get_project_root, get_agent_root, get_product_version
 
 logger = get_logger()
@@ -30,19 +37,31 @@ _load_env()
 
 
 def get_r2_client():
-    """Create a boto3 S3 client for Cloudflare R2."""
+    """Create a boto3 S3 client for Cloudflare R2.
+
+    If OCBOT_R2_LOCAL_DIR is set, a local directory stands in for the
+    bucket instead (see r2_local.py).
+    """
+    local_dir = os.environ.get('OCBOT_R2_LOCAL_DIR')
+    if local_dir:
+        from r2_local import LocalR2Client
+        logger.info(f"Using local directory as R2 stand-in: {local_dir}")
+        return LocalR2Client(local_dir)
+
     import boto3
 
     account_id = os.environ.get('R2_ACCOUNT_ID')
     access_key = os.environ.get('R2_ACCESS_KEY_ID')
     secret_key = os.environ.get('R2_SECRET_ACCESS_KEY')
+    # R2_ENDPOINT_URL points at any S3-compatible server (e.g. a local MinIO)
+    endpoint_url = os.environ.get('R2_ENDPOINT_URL')
 
-    if not all([account_id, access_key, secret_key]):
+    if not all([account_id or endpoint_url, access_key, secret_key]):
         return None
 
     return boto3.client(
         's3',
-        endpoint_url=f'https://{account_id}.r2.cloudflarestorage.com',
+        endpoint_url=endpoint_url or f'https://{account_id}.r2.cloudflarestorage.com',
         aws_access_key_id=access_key,
         aws_secret_access_key=secret_key,
         region_name='auto',
@@ -50,7 +69,221 @@ def get_r2_client():
 
 
 R2_BUCKET = 'ocbot'
-R2_CDN_BASE = 'https://cdn.oc.bot'
+R2_CDN_BASE = os.environ.get('R2_CDN_BASE', 'https://cdn.oc.bot')
+
+
+def _r2_key_for_url(url):
+    """Return the bucket key behind a CDN URL, or None if it isn't ours."""
+    prefix = f'{R2_CDN_BASE}/'
+    if url and url.startswith(prefix):
+        return url[len(prefix):]
+    return None
+
+
+# Multipart settings for the large DMG/EXE installers; anything under the
+# threshold goes up in a single PUT.
+R2_MULTIPART_THRESHOLD = 16 * 1024 * 1024
+R2_MULTIPART_CHUNKSIZE = 16 * 1024 * 1024
+R2_MULTIPART_CONCURRENCY = 8
+# Artifacts uploaded at the same time
+R2_UPLOAD_WORKERS = 4
+# blobs/sha256/<digest> never change, so edges and clients may cache forever
+R2_IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def _transfer_config():
+    try:
+        from boto3.s3.transfer import TransferConfig
+    except ImportError:
+        return None
+    return TransferConfig(
+        multipart_threshold=R2_MULTIPART_THRESHOLD,
+        multipart_chunksize=R2_MULTIPART_CHUNKSIZE,
+        max_concurrency=R2_MULTIPART_CONCURRENCY,
+    )
+
+
+def _content_type(artifact):
+    if artifact.suffix == '.zip':
+        return 'application/zip'
+    if artifact.suffix == '.dmg':
+        return 'application/x-apple-diskimage'
+    if artifact.suffix == '.exe':
+        return 'application/x-msdownload'
+    if artifact.suffix == '.json':
+        return 'application/json'
+    if artifact.suffix == '.gz' and artifact.name.endswith('.tar.gz'):
+        return 'application/gzip'
+    return 'application/octet-stream'
+
+
+def _is_not_found(error):
+    code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+    return code in ('404', 'NoSuchKey', 'NotFound')
+
+
+def _remote_sha256(client, key):
+    """Return the sha256 metadata of an existing object, or None."""
+    try:
+        resp = client.head_object(Bucket=R2_BUCKET, Key=key)
+    except Exception as e:
+        if not _is_not_found(e):
+            logger.warning(f"HEAD {key} failed, uploading anyway: {e}")
+        return None
+    return resp.get('Metadata', {}).get('sha256')
+
+
+class _UploadProgress:
+    """boto3 transfer callback that logs progress of one upload every 25%."""
+
+    def __init__(self, label, path):
+        self.label = label
+        self.name = path.name
+        self.total = path.stat().st_size
+        self.seen = 0
+        self.next_mark = 25
+        self._lock = threading.Lock()
+
+    def __call__(self, nbytes):
+        with self._lock:
+            self.seen += nbytes
+            percent = self.seen * 100 // self.total if self.total else 100
+            if percent < self.next_mark:
+                return
+            self.next_mark = (percent // 25 + 1) * 25
+        logger.info(f"[{self.label}] {self.name}: {percent}% of {self.total / (1024 * 1024):.1f} MB")
+
+
+def blob_key(sha256):
+    """Content-addressed key: the same bytes are stored (and cached) once."""
+    return f'blobs/sha256/{sha256}'
+
+
+def upload_artifact(client, artifact, key, sha256=None, extra_args=None, label='r2'):
+    """Upload one file unless the object at key already has the same sha256.
+
+    The digest is stored as x-amz-meta-sha256 so later runs (or a re-run
+    of a failed release) can skip it with a HEAD request.
+    Returns the sha256 of the file.
+    """
+    if sha256 is None:
+        sha256 = sha256_file(artifact)
+    if _remote_sha256(client, key) == sha256:
+        logger.info(f"[{label}] {key} already uploaded (sha256={sha256[:16]}...), skipping")
+        return sha256
+
+    args = {'ContentType': _content_type(artifact), 'Metadata': {'sha256': sha256}}
+    args.update(extra_args or {})
+    logger.info(f"[{label}] Uploading {artifact.name} to R2 ({key})...")
+    client.upload_file(
+        str(artifact), R2_BUCKET, key,
+        ExtraArgs=args,
+        Config=_transfer_config(),
+        Callback=_UploadProgress(label, artifact),
+    )
+    logger.info(f"[{label}]   → {R2_CDN_BASE}/{key}")
+    return sha256
+
+
+def upload_artifacts(client, uploads, label='r2'):
+    """Upload [(path, key or None, sha256 or None)] concurrently.
+
+    A key of None stores the file content-addressed under blobs/sha256/
+    with an immutable Cache-Control, so identical bytes are uploaded and
+    cached once no matter how many versions reference them.
+
+    Returns {key: {name, url, sha256, size}} for every artifact, uploaded
+    or skipped.  Keyed by destination, not file name: artifacts from
+    different directories may share a name.
+    """
+    def _upload(path, key, sha256):
+        if key is None:
+            sha256 = sha256 or sha256_file(path)
+            return blob_key(sha256), upload_artifact(
+                client, path, blob_key(sha256), sha256,
+                extra_args={'CacheControl': R2_IMMUTABLE_CACHE_CONTROL}, label=label)
+        return key, upload_artifact(client, path, key, sha256, label=label)
+
+    with ThreadPoolExecutor(max_workers=R2_UPLOAD_WORKERS,
+                            thread_name_prefix='ocbot-upload') as pool:
+        futures = [(path, pool.submit(_upload, path, key, sha256))
+                   for path, key, sha256 in uploads]
+        results = {}
+        for path, future in futures:
+            key, sha256 = future.result()
+            results[key] = {
+                'name': path.name,
+                'url': f'{R2_CDN_BASE}/{key}',
+                'sha256': sha256,
+                'size': path.stat().st_size,
+            }
+    return results
+
+
+def record_version_index(client, version, uploaded):
+    """Merge uploaded artifacts into releases/<version>/index.json.
+
+    The index maps the key of each artifact of a version to its file name,
+    digest, size and URL, so any version can be resolved to content-addressed
+    blobs.
+    """
+    update_manifest(
+        client,
+        lambda index: index.setdefault('artifacts', {}).update(uploaded),
+        key=f'releases/{version}/index.json',
+    )
+
+
+# Conditional-PUT retries before giving up on a contended manifest
+MANIFEST_UPDATE_ATTEMPTS = 8
+
+
+def _is_precondition_failed(error):
+    code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+    return code in ('PreconditionFailed', '412', 'ConditionalRequestConflict', '409')
+
+
+def read_manifest(client, key='latest.json'):
+    """Return (manifest dict, ETag) of a JSON manifest; ({}, None) if it doesn't exist."""
+    try:
+        resp = client.get_object(Bucket=R2_BUCKET, Key=key)
+    except Exception as e:
+        if not _is_not_found(e):
+            logger.warning(f"Could not read existing {key}: {e}")
+        return {}, None
+    return json.loads(resp['Body'].read()), resp.get('ETag')
+
+
+def update_manifest(client, mutate, key='latest.json'):
+    """Read-modify-write a JSON manifest without losing concurrent updates.
+
+    mutate(manifest) edits the dict in place.  The write is conditional on
+    the ETag that was read (or on the key not existing yet); if another
+    release runner got there first, the manifest is re-read and mutate is
+    applied again, so the result is always the union of all updates.
+    Returns the manifest as written.
+    """
+    for attempt in range(1, MANIFEST_UPDATE_ATTEMPTS + 1):
+        manifest, etag = read_manifest(client, key)
+        mutate(manifest)
+        condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+        try:
+            client.put_object(
+                Bucket=R2_BUCKET,
+                Key=key,
+                Body=json.dumps(manifest, indent=2),
+                ContentType='application/json',
+                **condition,
+            )
+        except Exception as e:
+            if not _is_precondition_failed(e) or attempt == MANIFEST_UPDATE_ATTEMPTS:
+                raise
+            delay = min(0.2 * 2 ** attempt, 5.0) * random.uniform(0.5, 1.0)
+            logger.info(f"{key} changed concurrently, re-merging (attempt {attempt + 1})...")
+            time.sleep(delay)
+            continue
+        logger.info(f"  → {R2_CDN_BASE}/{key}")
+        return manifest
 
 
 def upload_to_r2(artifacts, version, category):
@@ -67,63 +300,30 @@ def upload_to_r2(artifacts, version, category):
                        "Set R2_ACCOUNT_ID, R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY.")
         return
 
-    # Upload each artifact
-    uploaded = {}
-    for artifact in artifacts:
-        key = f'releases/{version}/{artifact.name}'
-        logger.info(f"Uploading {artifact.name} to R2 ({key})...")
-
-        content_type = 'application/octet-stream'
-        if artifact.suffix == '.zip':
-            content_type = 'application/zip'
-        elif artifact.suffix == '.dmg':
-            content_type = 'application/x-apple-diskimage'
-        elif artifact.suffix == '.exe':
-            content_type = 'application/x-msdownload'
-        elif artifact.suffix == '.json':
-            content_type = 'application/json'
-        elif artifact.suffix == '.gz' and artifact.name.endswith('.tar.gz'):
-            content_type = 'application/gzip'
-
-        client.upload_file(
-            str(artifact), R2_BUCKET, key,
-            ExtraArgs={'ContentType': content_type},
-        )
-        uploaded[artifact.name] = f'{R2_CDN_BASE}/{key}'
-        logger.info(f"  → {uploaded[artifact.name]}")
-
-    # Read-merge-write latest.json
-    latest = {}
-    try:
-        resp = client.get_object(Bucket=R2_BUCKET, Key='latest.json')
-        latest = json.loads(resp['Body'].read())
-    except client.exceptions.NoSuchKey:
-        pass
-    except Exception as e:
-        logger.warning(f"Could not read existing latest.json: {e}")
-
-    latest['version'] = version
-
-    if category == 'extension':
-        for name, url in uploaded.items():
-            if name.endswith('.zip'):
-                latest.setdefault('extension', {})['url'] = url
-    elif category == 'browser':
-        latest.setdefault('browser', {})
-        for name, url in uploaded.items():
-            if name.endswith('.dmg'):
-                latest['browser'].setdefault('macos', {})['url'] = url
-            elif name.endswith('.exe') and 'Setup' in name:
-                latest['browser'].setdefault('windows', {})['url'] = url
+    # Installers keep their human-readable releases/<version>/ URLs (linked
+    # from the README); the version index records their digests.
+    uploaded = upload_artifacts(
+        client, [(a, f'releases/{version}/{a.name}', None) for a in artifacts], label=category)
+    record_version_index(client, version, uploaded)
+
+    def _merge(latest):
+        latest['version'] = version
+
+        if category == 'extension':
+            for info in uploaded.values():
+                if info['name'].endswith('.zip'):
+                    latest.setdefault('extension', {})['url'] = info['url']
+        elif category == 'browser':
+            latest.setdefault('browser', {})
+            for info in uploaded.values():
+                name = info['name']
+                if name.endswith('.dmg'):
+                    latest['browser'].setdefault('macos', {})['url'] = info['url']
+                elif name.endswith('.exe') and 'Setup' in name:
+                    latest['browser'].setdefault('windows', {})['url'] = info['url']
 
     logger.info("Updating latest.json on R2...")
-    client.put_object(
-        Bucket=R2_BUCKET,
-        Key='latest.json',
-        Body=json.dumps(latest, indent=2),
-        ContentType='application/json',
-    )
-    logger.info(f"  → {R2_CDN_BASE}/latest.json")
+    update_manifest(client, _merge)
 
 logger = get_logger()
 
@@ -167,8 +367,10 @@ def release_extension(args):
     logger.info(f"Preparing release for Ocbot v{version} (tag: {tag})...")
     
     # Build extension
+    timer = PhaseTimer()
     logger.info("Building extension...")
-    run_command(['npm', 'run', 'build'], cwd=agent_root)
+    with timer.phase('build'):
+        run_command(['npm', 'run', 'build'], cwd=agent_root)
 
     # Package
     build_output = agent_root / '.output' / 'chrome-mv3'
@@ -184,11 +386,11 @@ def release_extension(args):
         zip_path.unlink()
         
     logger.info(f"Creating zip archive at {zip_path}...")
-    # Use shutil.make_archive or zip command. 
-    # shutil.make_archive creates .zip automatically, so we pass base_name without extension
-    # But to match script behavior (cd build_output && zip -r ... .), we need to be careful with structure.
-    # shutil.make_archive(base_name, format, root_dir)
-    shutil.make_archive(str(dist_dir / 'ocbot-extension'), 'zip', build_output)
+    # Same layout as `cd build_output && zip -r ... .`: entries at the zip root
+    entries = [(item, item.name) for item in build_output.iterdir()]
+    with timer.phase('compression'):
+        write_zip(zip_path, entries, level=ARTIFACT_LEVELS['extension'])
+    file_count = len(iter_entries(entries, include_dirs=False, follow_symlinks=True))
     
     # Check if release exists
     logger.info(f"Checking if release {tag} exists...")
@@ -199,7 +401,8 @@ def release_extension(args):
         capture_output=True, text=True
     )
     exists = result.returncode == 0
-        
+
+    upload_start = time.monotonic()
     if exists:
         logger.info(f"Release {tag} already exists. Updating...")
         run_command([
@@ -218,6 +421,8 @@ def release_extension(args):
         
     # Upload to R2 CDN
     upload_to_r2([zip_path], version, 'extension')
+    timer.add('upload', time.monotonic() - upload_start)
+    record_artifact('extension-zip', zip_path, version, phases=timer.phases, files=file_count)
 
     # Sync models.json to CDN
     upload_config_to_r2()
@@ -240,17 +445,15 @@ def release_browser(args):
     version = get_product_version()
     tag = f"v{version}"
 
-    # Collect all browser artifacts that exist in dist/
-    artifacts = []
-    candidates = [
-        dist_dir / f"Ocbot-{version}.dmg",
-        dist_dir / f"Ocbot-Setup-{version}.exe",
-        dist_dir / f"Ocbot-{version}-win-x64-portable.zip",
-        dist_dir / f"Ocbot-{version}-win-x64-mini.exe",
-    ]
-    for c in candidates:
-        if c.exists():
-            artifacts.append(c)
+    # Collect all browser artifacts that exist in dist/, with their history names
+    candidates = {
+        'release-dmg': dist_dir / f"Ocbot-{version}.dmg",
+        'release-win-setup': dist_dir / f"Ocbot-Setup-{version}.exe",
+        'release-win-portable': dist_dir / f"Ocbot-{version}-win-x64-portable.zip",
+        'release-win-mini': dist_dir / f"Ocbot-{version}-win-x64-mini.exe",
+    }
+    present = {name: path for name, path in candidates.items() if path.exists()}
+    artifacts = list(present.values())
 
     if not artifacts:
         logger.error(f"No browser artifacts found in {dist_dir}. Run 'dev.py package' first.")
@@ -267,24 +470,82 @@ def release_browser(args):
     )
     exists = result.returncode == 0
 
-    if exists:
-        logger.info(f"Release {tag} already exists. Uploading artifacts...")
-        cmd = ['gh', 'release', 'upload', tag] + [str(a) for a in artifacts] + ['--clobber', '--repo', repo]
-        run_command(cmd)
-    else:
-        logger.info(f"Creating release {tag} with artifacts...")
-        cmd = ['gh', 'release', 'create', tag] + [str(a) for a in artifacts] + ['--repo', repo, '--title', f"Ocbot v{version}", '--notes', f"Ocbot v{version}"]
-        run_command(cmd)
+    timer = PhaseTimer()
+    with timer.phase('github'):
+        if exists:
+            logger.info(f"Release {tag} already exists. Uploading artifacts...")
+            cmd = ['gh', 'release', 'upload', tag] + [str(a) for a in artifacts] + ['--clobber', '--repo', repo]
+            run_command(cmd)
+        else:
+            logger.info(f"Creating release {tag} with artifacts...")
+            cmd = ['gh', 'release', 'create', tag] + [str(a) for a in artifacts] + ['--repo', repo, '--title', f"Ocbot v{version}", '--notes', f"Ocbot v{version}"]
+            run_command(cmd)
 
     # Upload to R2 CDN
-    upload_to_r2(artifacts, version, 'browser')
+    with timer.phase('r2'):
+        upload_to_r2(artifacts, version, 'browser')
+    # The uploads are batched, so every artifact records the batch's phases
+    for name, path in present.items():
+        record_artifact(name, path, version, phases=timer.phases)
 
     logger.info(f"Done! Ocbot v{version} released as {tag}")
     logger.info("Running instances will auto-update in the background.")
 
 
+def _fetch_layer_manifest(client, layer_info):
+    """Download the file manifest advertised for a published layer, if any."""
+    key = _r2_key_for_url((layer_info or {}).get('manifest', {}).get('url'))
+    if not key:
+        return None
+    try:
+        resp = client.get_object(Bucket=R2_BUCKET, Key=key)
+        return json.loads(resp['Body'].read())
+    except Exception as e:
+        logger.warning(f"Could not read previous manifest {key}, publishing without delta: {e}")
+        return None
+
+
+def _layer_entry(layer, uploaded):
+    """latest.json entry for one built layer: full archive, manifest and delta."""
+    entry = {
+        'url': uploaded[blob_key(layer['sha256'])]['url'],
+        'sha256': layer['sha256'],
+        'size': layer['size'],
+        'manifest': {
+            'url': uploaded[blob_key(layer['manifest_sha256'])]['url'],
+            'sha256': layer['manifest_sha256'],
+        },
+    }
+    if layer['delta'] is not None:
+        entry['delta'] = {
+            'from': layer['delta_from'],
+            'url': uploaded[blob_key(layer['delta_sha256'])]['url'],
+            'sha256': layer['delta_sha256'],
+            'size': layer['delta_size'],
+        }
+    return entry
+
+
+def _upload_layer(client, label, layer):
+    """Upload a built layer with its manifest and delta as blobs.
+
+    Layers are reproducible, so a layer whose node_modules (or app files)
+    didn't change has the same digest as before and isn't uploaded again.
+    Returns (latest.json entry, {key: {name, url, sha256, size}}).
+    """
+    uploads = [
+        (layer['path'], None, layer['sha256']),
+        (layer['manifest'], None, layer['manifest_sha256']),
+    ]
+    if layer['delta'] is not None:
+        uploads.append((layer['delta'], None, layer['delta_sha256']))
+    uploaded = upload_artifacts(client, uploads, label=label)
+    return _layer_entry(layer, uploaded), uploaded
+
+
 def release_runtime(args):
     """Build and upload OpenClaw runtime layers to R2 CDN."""
+    from dag import Step, run_steps
     from build_runtime import (
         build_base_layer,
         build_app_layer,
@@ -302,79 +563,66 @@ def release_runtime(args):
     platform_tag = get_platform_tag()
     version = get_runtime_version(openclaw_dir)
 
-    # Build both layers
-    base_path, base_sha, base_size, base_version = build_base_layer(
-        openclaw_dir, dist_dir, platform_tag
-    )
-    app_path, app_sha, app_size, app_version = build_app_layer(
-        openclaw_dir, dist_dir
-    )
-
-    # Upload to R2
+    # Read latest.json first: the previously published manifests are the
+    # baseline for this release's deltas.
     client = get_r2_client()
     if not client:
         logger.error("R2 credentials not set. "
                      "Set R2_ACCOUNT_ID, R2_ACCESS_KEY_ID, R2_SECRET_ACCESS_KEY.")
         sys.exit(1)
 
-    uploaded = {}
-    for artifact in [base_path, app_path]:
-        key = f'releases/{version}/{artifact.name}'
-        logger.info(f"Uploading {artifact.name} to R2 ({key})...")
-        client.upload_file(
-            str(artifact), R2_BUCKET, key,
-            ExtraArgs={'ContentType': 'application/gzip'},
-        )
-        uploaded[artifact.name] = f'{R2_CDN_BASE}/{key}'
-        logger.info(f"  → {uploaded[artifact.name]}")
-
-    # Read-merge-write latest.json with runtime section
-    latest = {}
-    try:
-        resp = client.get_object(Bucket=R2_BUCKET, Key='latest.json')
-        latest = json.loads(resp['Body'].read())
-    except client.exceptions.NoSuchKey:
-        pass
-    except Exception as e:
-        logger.warning(f"Could not read existing latest.json: {e}")
-
+    latest, _ = read_manifest(client)
     runtime = latest.get('runtime', {})
-    runtime['version'] = version
-
-    # Base layer (per-platform)
-    base_layer = runtime.get('baseLayer', {})
-    base_layer['version'] = base_version
-    base_layer[platform_tag] = {
-        'url': uploaded[base_path.name],
-        'sha256': base_sha,
-        'size': base_size,
-    }
-    runtime['baseLayer'] = base_layer
-
-    # App layer (platform-independent)
-    runtime['appLayer'] = {
-        'version': app_version,
-        'url': uploaded[app_path.name],
-        'sha256': app_sha,
-        'size': app_size,
-    }
-
-    # Shell compatibility
-    runtime['minShellVersion'] = get_product_version()
-    runtime['node'] = 'v22.14.0'
-
-    latest['runtime'] = runtime
+    prev_base = _fetch_layer_manifest(client, runtime.get('baseLayer', {}).get(platform_tag))
+    prev_app = _fetch_layer_manifest(client, runtime.get('appLayer'))
+
+    # The layers don't depend on each other: build them concurrently and
+    # upload each one as soon as it is ready.  The budget lets every ready
+    # step run; they mostly wait on npm/pnpm, compression threads or the network.
+    steps = [
+        Step('base-build', lambda: build_base_layer(
+            openclaw_dir, dist_dir, platform_tag, previous_manifest=prev_base)),
+        Step('app-build', lambda: build_app_layer(
+            openclaw_dir, dist_dir, previous_manifest=prev_app)),
+        Step('base-upload', lambda: _upload_layer(client, 'base', results['base-build'].result),
+             deps=['base-build']),
+        Step('app-upload', lambda: _upload_layer(client, 'app', results['app-build'].result),
+             deps=['app-build']),
+    ]
+    results = {step.name: step for step in steps}
+    run_steps(steps, cpu_budget=len(steps), logger=logger)
+    base = results['base-build'].result
+    app = results['app-build'].result
+    base_entry, base_uploaded = results['base-upload'].result
+    app_entry, app_uploaded = results['app-upload'].result
+    for label, layer in (('base', base), ('app', app)):
+        manifest = json.loads(layer['manifest'].read_text())
+        build_s, upload_s = results[f'{label}-build'].duration, results[f'{label}-upload'].duration
+        record_artifact(f'runtime-{label}-{platform_tag}' if label == 'base' else 'runtime-app',
+                        layer['path'], layer['version'], files=len(manifest['files']),
+                        phases={'build': round(build_s, 3), 'upload': round(upload_s, 3)})
+    record_version_index(client, version, dict(base_uploaded, **app_uploaded))
+
+    def _merge(latest):
+        runtime = latest.setdefault('runtime', {})
+        runtime['version'] = version
+
+        # Base layer (per-platform)
+        base_layer = runtime.setdefault('baseLayer', {})
+        base_layer['version'] = base['version']
+        base_layer[platform_tag] = base_entry
+
+        # App layer (platform-independent)
+        runtime['appLayer'] = dict(version=app['version'], **app_entry)
+
+        # Shell compatibility
+        runtime['minShellVersion'] = get_product_version()
+        runtime['node'] = 'v22.14.0'
 
     logger.info("Updating latest.json on R2...")
-    client.put_object(
-        Bucket=R2_BUCKET,
-        Key='latest.json',
-        Body=json.dumps(latest, indent=2),
-        ContentType='application/json',
-    )
-    logger.info(f"  → {R2_CDN_BASE}/latest.json")
+    update_manifest(client, _merge)
 
-    logger.info(f"Done! Runtime {version} released (base={base_version}, app={app_version})")
+    logger.info(f"Done! Runtime {version} released (base={base['version']}, app={app['version']})")
 
 
 def upload_config_to_r2():
@@ -1,97 +1,348 @@
+import csv
+import hashlib
 import json
 import os
+import re
 import shutil
 import socket
 import subprocess
 import sys
 import tarfile
 import tempfile
+import threading
 import time
-import urllib.request
-from pathlib import Path
-from common import get_logger, get_source_dir, get_project_root, get_agent_root
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from build_runtime import sha256_file
+from common import copy_tree, format_copy_stats, get_logger, get_source_dir, get_project_root, get_agent_root
 from openclaw_config import (
     ensure_ocbot_openclaw_config,
+    get_enabled_channels,
     get_ocbot_config_dir,
     get_ocbot_state_dir,
     get_ocbot_workspace_dir,
 )
 
 
-def _ensure_extension_deps(logger, extensions_dir):
-    """Ensure node_modules are available for all bundled extensions.
+DEPS_ARCHIVE = '.deps.tar.gz'
+# Records which archive node_modules was extracted from
+DEPS_STAMP = '.deps.stamp.json'
+DEPS_WORKERS = 4
+# Extracted archives (by sha256) and npm installs (by dependency set),
+# shared by every out dir; bundles get a cloned/hardlinked tree.
+EXTDEPS_STORE = Path.home() / '.cache' / 'ocbot' / 'extdeps'
+# Per-entry (size, mtime) of every file, checked before an entry is reused
+STORE_MANIFEST = 'manifest.json'
+CONFIG_POLL_INTERVAL = 2.0
 
-    Checks each extension dir for node_modules. If missing:
+
+def _archive_stat(archive):
+    st = archive.stat()
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _deps_current(ext_dir, archive):
+    """True if node_modules was extracted from this archive (per the stamp).
+
+    Normally only the archive's size and mtime are compared; it is hashed
+    only when those changed, e.g. because a build rewrote an identical file.
+    """
+    stamp_path = ext_dir / DEPS_STAMP
+    try:
+        stamp = json.loads(stamp_path.read_text())
+    except (OSError, json.JSONDecodeError):
+        return False
+    if not (ext_dir / 'node_modules').is_dir():
+        return False
+    stat = _archive_stat(archive)
+    if stamp.get('stat') == stat:
+        return True
+    if stamp.get('sha256') != sha256_file(archive):
+        return False
+    stamp['stat'] = stat
+    stamp_path.write_text(json.dumps(stamp))
+    return True
+
+
+def _tree_manifest(root):
+    """{relative path: [size, mtime_ns]} for every file and symlink under root."""
+    manifest = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in filenames + [d for d in dirnames if os.path.islink(os.path.join(dirpath, d))]:
+            path = os.path.join(dirpath, name)
+            st = os.lstat(path)
+            manifest[os.path.relpath(path, root)] = [st.st_size, st.st_mtime_ns]
+    return manifest
+
+
+def _entry_intact(entry):
+    """True if a store entry still matches the manifest written when it was created.
+
+    Bundles hardlink their files to the store, so a bundle that writes into
+    its node_modules in place (npm rebuild, caches) changes the entry for
+    every out dir.  Only sizes and mtimes are compared; that catches such
+    writes without hashing the tree.
+    """
+    try:
+        manifest = json.loads((entry / STORE_MANIFEST).read_text())
+    except (OSError, json.JSONDecodeError):
+        return False
+    return (entry / 'node_modules').is_dir() and _tree_manifest(entry / 'node_modules') == manifest
+
+
+def _store_entry(key, populate):
+    """Return EXTDEPS_STORE/<key>/node_modules, creating it with populate(tmp_dir) once.
+
+    populate fills a private temp dir which is then renamed into place, so
+    concurrent runs (other out dirs, other dev.py processes) never see a
+    half-written entry; whoever renames first wins.  An entry that no
+    longer matches its manifest is moved aside and rebuilt.
+    """
+    entry = EXTDEPS_STORE / key
+    if _entry_intact(entry):
+        return entry / 'node_modules'
+    EXTDEPS_STORE.mkdir(parents=True, exist_ok=True)
+    if entry.exists():
+        get_logger().warning(f"Rebuilding modified extension deps store entry {entry}")
+        stale = Path(tempfile.mkdtemp(prefix=f'.{key[:16]}-stale-', dir=EXTDEPS_STORE))
+        try:
+            entry.rename(stale / key)
+        except OSError:
+            pass  # another run already moved it
+        shutil.rmtree(stale, ignore_errors=True)
+    tmp = Path(tempfile.mkdtemp(prefix=f'.{key[:16]}-', dir=EXTDEPS_STORE))
+    try:
+        populate(tmp)
+        if not (tmp / 'node_modules').is_dir():
+            raise RuntimeError("no node_modules produced")
+        (tmp / STORE_MANIFEST).write_text(json.dumps(_tree_manifest(tmp / 'node_modules')))
+        try:
+            tmp.rename(entry)
+        except OSError:
+            if not (entry / 'node_modules').is_dir():
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return entry / 'node_modules'
+
+
+def _link_deps(ext_dir, store_nm, stamp):
+    """Point ext_dir/node_modules at a store entry (cloned or hardlinked, not copied).
+
+    A real tree rather than a symlink: bundles stay self-contained when
+    they are later staged into a DMG or zip.  Where cloning is unavailable
+    (Linux) the files are hardlinks into the store, so nothing may write
+    into a bundle's node_modules in place; _store_entry rebuilds entries
+    that were modified anyway, but other out dirs keep the changed files
+    until their deps are relinked.
+    """
+    stamp_path = ext_dir / DEPS_STAMP
+    stamp_path.unlink(missing_ok=True)
+    node_modules = ext_dir / 'node_modules'
+    if node_modules.is_symlink() or node_modules.is_file():
+        node_modules.unlink()
+    copy_tree(store_nm, node_modules, immutable=True)
+    stamp_path.write_text(json.dumps(stamp))
+
+
+def _safe_extract(tar, dest):
+    """Extract tar into dest, refusing members that would land outside it.
+
+    Uses tarfile's 'data' filter where this Python has it (3.12 and the
+    security backports); older ones, such as the macOS CLT python 3.9,
+    check paths and link targets here instead.
+    """
+    if hasattr(tarfile, 'data_filter'):
+        tar.extractall(path=str(dest), filter='data')
+        return
+    members = tar.getmembers()
+    for member in members:
+        name = PurePosixPath(member.name)
+        if name.is_absolute() or '..' in name.parts:
+            raise tarfile.TarError(f"Unsafe path in {tar.name}: {member.name}")
+        if member.issym() or member.islnk():
+            # Symlinks are relative to their directory, hardlinks to the root
+            target = PurePosixPath(member.linkname)
+            base = name.parent if member.issym() else PurePosixPath()
+            depth = len(base.parts)
+            for part in target.parts:
+                depth += -1 if part == '..' else part != '.'
+                if depth < 0:
+                    break
+            if target.is_absolute() or depth < 0:
+                raise tarfile.TarError(f"Unsafe link in {tar.name}: {member.name} -> {member.linkname}")
+        elif not (member.isfile() or member.isdir()):
+            raise tarfile.TarError(f"Unsupported member in {tar.name}: {member.name}")
+    tar.extractall(path=str(dest), members=members)
+
+
+def _extract_deps(ext_dir, archive):
+    """Extract archive into the shared store (once per digest) and link it in."""
+    stat = _archive_stat(archive)
+    digest = sha256_file(archive)
+
+    def _extract(tmp):
+        with tarfile.open(archive, 'r:gz') as tar:
+            _safe_extract(tar, tmp)
+
+    _link_deps(ext_dir, _store_entry(digest, _extract), {'sha256': digest, 'stat': stat})
+
+
+def _npm_install_deps(ext_dir):
+    """npm install the extension's package into the shared store and link it in.
+
+    The extension's own package.json (and package-lock.json, if any) is
+    installed, so its lockfile, optionalDependencies and overrides apply;
+    only workspace: dependencies, which npm cannot resolve, are dropped.
+    Entries are keyed by both files, once per platform.
+    """
+    manifests = {name: (ext_dir / name).read_bytes()
+                 for name in ('package.json', 'package-lock.json') if (ext_dir / name).is_file()}
+    digest = hashlib.sha256(sys.platform.encode())
+    for name, data in sorted(manifests.items()):
+        digest.update(f'\0{name}\0{len(data)}\0'.encode() + data)
+    key = 'npm-' + digest.hexdigest()
+
+    def _install(tmp):
+        for name, data in manifests.items():
+            (tmp / name).write_bytes(data)
+        pkg = json.loads(manifests['package.json'])
+        deps = pkg.get('dependencies', {})
+        if any(str(v).startswith('workspace:') for v in deps.values()):
+            pkg['dependencies'] = _real_deps(ext_dir)
+            (tmp / 'package.json').write_text(json.dumps(pkg, indent=2))
+        subprocess.run(
+            ['npm', 'install', '--production'],
+            cwd=tmp, check=True, shell=sys.platform == 'win32',
+            capture_output=True, text=True,
+        )
+
+    _link_deps(ext_dir, _store_entry(key, _install), {'npm': key})
+
+
+def _extension_ids(ext_dir):
+    """Plugin id and channel ids declared by an extension's openclaw.plugin.json."""
+    try:
+        manifest = json.loads((ext_dir / 'openclaw.plugin.json').read_text())
+    except (OSError, json.JSONDecodeError):
+        return None, set()
+    channels = {c for c in manifest.get('channels', []) if isinstance(c, str)}
+    return manifest.get('id') or ext_dir.name, channels
+
+
+def _real_deps(ext_dir):
+    """A source-tree extension's dependencies, without workspace references."""
+    try:
+        pkg = json.loads((ext_dir / 'package.json').read_text())
+    except (json.JSONDecodeError, OSError):
+        return {}
+    deps = pkg.get('dependencies', {})
+    return {k: v for k, v in deps.items() if not str(v).startswith('workspace:')}
+
+
+def _prepare_extension(logger, ext_dir, openclaw_src):
+    """Make node_modules available for one extension."""
+    ext_name = ext_dir.name
+    node_modules = ext_dir / 'node_modules'
+
+    # Option 1: Extract .deps.tar.gz archive
+    archive = ext_dir / DEPS_ARCHIVE
+    if archive.is_file():
+        logger.info(f"Extracting deps for extension {ext_name}...")
+        try:
+            _extract_deps(ext_dir, archive)
+            logger.info(f"  {ext_name}: deps extracted from archive")
+            return
+        except Exception as e:
+            logger.warning(f"  {ext_name}: archive extraction failed: {e}")
+
+    # Option 2: Symlink from source tree (dev builds)
+    src_nm = openclaw_src / 'extensions' / ext_name / 'node_modules'
+    if src_nm.is_dir():
+        logger.info(f"Symlinking deps for extension {ext_name} from source tree...")
+        try:
+            node_modules.symlink_to(src_nm)
+            logger.info(f"  {ext_name}: symlinked to {src_nm}")
+            return
+        except OSError as e:
+            logger.warning(f"  {ext_name}: symlink failed: {e}")
+
+    # Option 3: npm install (last resort)
+    logger.info(f"Installing deps for extension {ext_name} via npm...")
+    try:
+        _npm_install_deps(ext_dir)
+        logger.info(f"  {ext_name}: deps installed via npm")
+    except (subprocess.CalledProcessError, OSError, ValueError, RuntimeError) as e:
+        logger.warning(f"  {ext_name}: npm install failed: {e}")
+
+
+def _ensure_extension_deps(logger, extensions_dir, config_file=None):
+    """Ensure node_modules are available for the bundled extensions that need them.
+
+    An extension whose node_modules came from its current .deps.tar.gz (see
+    DEPS_STAMP) costs a stat or two.  Channel extensions are only prepared
+    if one of their channels (or the plugin) is enabled in config_file;
+    the rest are deferred until they are configured (see
+    _watch_channel_config).  Missing deps are prepared concurrently:
     1. Extract .deps.tar.gz if present (official builds)
     2. Symlink from source openclaw tree (dev builds)
     3. Fall back to npm install --production
+    Extractions and npm installs go through EXTDEPS_STORE, so each archive
+    or dependency set is unpacked once however many out dirs use it.
+
+    Returns the names of the deferred extensions.
     """
     if not extensions_dir.is_dir():
-        return
+        return []
 
     openclaw_src = get_project_root().parent / 'openclaw'
+    enabled = get_enabled_channels(config_file) if config_file else None
 
+    pending = []
+    deferred = []
     for ext_dir in sorted(extensions_dir.iterdir()):
         if not ext_dir.is_dir():
             continue
-        pkg_json = ext_dir / 'package.json'
-        if not pkg_json.is_file():
-            continue
-
-        # Check if this extension has dependencies
-        try:
-            pkg = json.loads(pkg_json.read_text())
-        except (json.JSONDecodeError, OSError):
-            continue
-        deps = pkg.get('dependencies', {})
-        # Filter out workspace references
-        real_deps = {k: v for k, v in deps.items()
-                     if not str(v).startswith('workspace:')}
-        if not real_deps:
+        archive = ext_dir / DEPS_ARCHIVE
+        if archive.is_file():
+            if _deps_current(ext_dir, archive):
+                continue
+        elif (ext_dir / 'node_modules').exists() or not _real_deps(ext_dir):
             continue
 
-        node_modules = ext_dir / 'node_modules'
-        if node_modules.exists():
+        plugin_id, channels = _extension_ids(ext_dir)
+        if enabled is not None and channels and not (channels & enabled) and plugin_id not in enabled:
+            deferred.append(ext_dir.name)
             continue
+        pending.append(ext_dir)
 
-        ext_name = ext_dir.name
+    if deferred:
+        logger.info(f"Deferring deps for {len(deferred)} unconfigured channel extension(s): "
+                    f"{', '.join(deferred)}")
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(DEPS_WORKERS, len(pending))) as pool:
+            list(pool.map(lambda ext_dir: _prepare_extension(logger, ext_dir, openclaw_src), pending))
+    return deferred
 
-        # Option 1: Extract .deps.tar.gz archive
-        archive = ext_dir / '.deps.tar.gz'
-        if archive.is_file():
-            logger.info(f"Extracting deps for extension {ext_name}...")
-            try:
-                with tarfile.open(archive, 'r:gz') as tar:
-                    tar.extractall(path=str(ext_dir))
-                if node_modules.exists():
-                    logger.info(f"  {ext_name}: deps extracted from archive")
-                    continue
-            except Exception as e:
-                logger.warning(f"  {ext_name}: archive extraction failed: {e}")
 
-        # Option 2: Symlink from source tree (dev builds)
-        src_nm = openclaw_src / 'extensions' / ext_name / 'node_modules'
-        if src_nm.is_dir():
-            logger.info(f"Symlinking deps for extension {ext_name} from source tree...")
-            try:
-                node_modules.symlink_to(src_nm)
-                logger.info(f"  {ext_name}: symlinked to {src_nm}")
-                continue
-            except OSError as e:
-                logger.warning(f"  {ext_name}: symlink failed: {e}")
-
-        # Option 3: npm install (last resort)
-        logger.info(f"Installing deps for extension {ext_name} via npm...")
-        _shell = sys.platform == 'win32'
+def _watch_channel_config(logger, extensions_dir, config_file, stop):
+    """Prepare deferred channel deps as soon as openclaw.json enables them."""
+    def _mtime():
+        try:
+            return config_file.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    seen = _mtime()
+    while not stop.wait(CONFIG_POLL_INTERVAL):
+        mtime = _mtime()
+        if mtime == seen:
+            continue
+        seen = mtime
         try:
-            subprocess.run(
-                ['npm', 'install', '--production', '--prefix', str(ext_dir)],
-                check=True, shell=_shell,
-                capture_output=True, text=True,
-            )
-            logger.info(f"  {ext_name}: deps installed via npm")
-        except (subprocess.CalledProcessError, FileNotFoundError) as e:
-            logger.warning(f"  {ext_name}: npm install failed: {e}")
+            _ensure_extension_deps(logger, extensions_dir, config_file)
+        except Exception as e:
+            logger.warning(f"Preparing channel deps failed: {e}")
 
 
 def _sync_extension(logger, out_dir):
@@ -122,10 +373,8 @@ def _sync_extension(logger, out_dir):
 
         dest = framework / 'Resources' / 'ocbot'
 
-    if dest.exists():
-        shutil.rmtree(dest)
-    shutil.copytree(extension_src, dest)
-    logger.info(f"Extension synced to {dest}")
+    stats = copy_tree(extension_src, dest, immutable=True)
+    logger.info(f"Extension synced to {dest} ({format_copy_stats(stats)})")
 
 
 def _find_embedded_runtime(out_dir):
@@ -157,39 +406,83 @@ def _find_embedded_runtime(out_dir):
     return None, None
 
 
-def _wait_for_gateway(logger, port=18789, timeout=15):
-    """Wait for OpenClaw gateway to become ready on the given port."""
-    url = f'http://127.0.0.1:{port}/'
-    deadline = time.time() + timeout
-    last_error = None
-    while time.time() < deadline:
-        try:
-            with urllib.request.urlopen(url, timeout=1) as response:
-                # Any response means the server is up
-                logger.info(f"OpenClaw gateway ready on port {port}")
-                return True
-        except Exception as e:
-            last_error = e
-        time.sleep(0.5)
-    # Gateway may return errors but still be listening - check with socket
+GATEWAY_PORT = 18789
+GATEWAY_READY_TIMEOUT = 15
+# Supervisor: health check and resource sample interval, failed checks
+# before a restart, restart backoff cap, and uptime that resets the backoff.
+GATEWAY_CHECK_INTERVAL = 5.0
+GATEWAY_MAX_MISSES = 3
+GATEWAY_RESTART_MAX_DELAY = 60
+GATEWAY_STABLE_AFTER = 60.0
+# How long stop() waits for the supervisor: a restart in progress may be
+# waiting on readiness (its backoff wait ends at once on stop).
+GATEWAY_STOP_JOIN = GATEWAY_READY_TIMEOUT + GATEWAY_CHECK_INTERVAL + 10
+GATEWAY_METRICS = 'gateway-metrics.csv'
+# The gateway logs e.g. "[gateway] listening on ws://127.0.0.1:18789" once
+# its server is bound.
+_GATEWAY_READY_RE = re.compile(rb'listening on \S*?:(\d+)', re.IGNORECASE)
+
+
+def _pump_gateway_output(stream, ready, port):
+    """Echo gateway output to our stdout and set `ready` on its listening line.
+
+    Runs until the gateway closes its output, so the pipe never fills up.
+    """
+    out = sys.stdout.buffer
+    for line in iter(stream.readline, b''):
+        if not ready.is_set():
+            m = _GATEWAY_READY_RE.search(line)
+            if m and int(m.group(1)) == port:
+                ready.set()
+        out.write(line)
+        out.flush()
+    stream.close()
+
+
+def _port_open(port):
     try:
-        with socket.create_connection(('127.0.0.1', port), timeout=1):
-            logger.info(f"OpenClaw gateway ready on port {port} (socket check)")
+        with socket.create_connection(('127.0.0.1', port), timeout=0.1):
             return True
-    except Exception:
-        pass
-    logger.error(f"Timed out waiting for OpenClaw gateway on port {port}: {last_error}")
-    return False
-
+    except OSError:
+        return False
 
-def _start_embedded_runtime(logger, out_dir):
-    """Start embedded OpenClaw gateway. Returns subprocess or exits on failure."""
-    node_path, openclaw_dir = _find_embedded_runtime(out_dir)
-    if not node_path:
-        return None
 
-    logger.info("Found embedded runtime, starting OpenClaw gateway...")
+def _wait_for_gateway(logger, proc, ready, port=GATEWAY_PORT, timeout=GATEWAY_READY_TIMEOUT,
+                      stale=False):
+    """Wait until the gateway is listening. Returns False if it exited or timed out.
 
+    The listening line on its output (`ready`) is the primary signal; a
+    connect probe with a short backoff covers gateways that don't print it.
+    The process is checked on every round, so a crash is reported at once.
+    stale means another process held the port at launch (--force replaces
+    it); the probe is only trusted after the port was seen free.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    delay = 0.01
+    while True:
+        if ready.wait(delay):
+            source = 'listening line'
+            break
+        if proc.poll() is not None:
+            return False
+        if _port_open(port):
+            if not stale:
+                source = 'socket check'
+                break
+        else:
+            stale = False
+        if time.monotonic() >= deadline:
+            logger.error(f"Timed out waiting for OpenClaw gateway on port {port}")
+            return False
+        delay = min(delay * 2, 0.1)
+    logger.info(f"OpenClaw gateway ready on port {port} "
+                f"in {time.monotonic() - start:.2f}s ({source})")
+    return True
+
+
+def _gateway_environment(logger, openclaw_dir):
+    """Write the OpenClaw config and return (env, config_file) for the gateway."""
     os.environ.setdefault('OCBOT_RUNTIME_MODE', 'dev')
     config_dir = get_ocbot_config_dir()
     state_dir = get_ocbot_state_dir()
@@ -207,57 +500,221 @@ def _start_embedded_runtime(logger, out_dir):
     extensions_dir = openclaw_dir / 'extensions'
     if extensions_dir.exists():
         env['OPENCLAW_BUNDLED_PLUGINS_DIR'] = str(extensions_dir)
+    return env, config_file
 
-    # Ensure extension dependencies are available before starting the gateway.
-    # In dev builds, node_modules are not included; this handles extraction,
-    # symlinking from source, or npm install as needed.
-    _ensure_extension_deps(logger, extensions_dir)
 
+def _spawn_gateway(logger, node_path, openclaw_dir, env):
+    """Start the OpenClaw gateway. Returns (proc, ready event, stale port flag)."""
     gateway_cmd = [
         str(node_path),
         str(openclaw_dir / 'openclaw.mjs'),
         'gateway', 'run',
-        '--port', '18789',
+        '--port', str(GATEWAY_PORT),
         '--bind', 'loopback',
         '--force',
     ]
 
     logger.info(f"Gateway command: {' '.join(gateway_cmd)}")
 
-    try:
-        proc = subprocess.Popen(
-            gateway_cmd,
-            env=env,
-            stdout=None,   # inherit terminal so logs are visible
-            stderr=None,
-        )
-    except Exception as e:
-        logger.error(f"Failed to start embedded OpenClaw: {e}")
-        sys.exit(1)
-
-    # Wait for gateway to be ready; abort if it crashed or timed out.
-    if not _wait_for_gateway(logger):
-        # Check if process already died
-        exit_code = proc.poll()
-        if exit_code is not None:
-            logger.error(f"OpenClaw gateway exited with code {exit_code}. Check config: {config_file}")
-        else:
-            logger.error("OpenClaw gateway did not become ready (timed out)")
-            proc.terminate()
-        sys.exit(1)
+    # Output goes through a pipe so the listening line can be watched;
+    # it is echoed to the terminal, in color if that is a tty.
+    if sys.stdout.isatty():
+        env.setdefault('FORCE_COLOR', '1')
+    stale = _port_open(GATEWAY_PORT)
+    proc = subprocess.Popen(
+        gateway_cmd,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    ready = threading.Event()
+    threading.Thread(target=_pump_gateway_output, args=(proc.stdout, ready, GATEWAY_PORT),
+                     name='ocbot-gateway-output', daemon=True).start()
+    return proc, ready, stale
+
+
+def _sample_process(pid):
+    """Return (rss bytes, cpu seconds, open fds, threads) for pid; None where unknown."""
+    proc_dir = Path(f'/proc/{pid}')
+    if proc_dir.is_dir():
+        # Fields after the parenthesized command name start at field 3 (state)
+        fields = (proc_dir / 'stat').read_text().rsplit(')', 1)[1].split()
+        ticks = os.sysconf('SC_CLK_TCK')
+        cpu = (int(fields[11]) + int(fields[12])) / ticks
+        rss = int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+        try:
+            fds = len(os.listdir(proc_dir / 'fd'))
+        except OSError:
+            fds = None
+        return rss, cpu, fds, int(fields[17])
+    if sys.platform == 'darwin':
+        out = subprocess.run(['ps', '-o', 'rss=,time=', '-p', str(pid)],
+                             capture_output=True, text=True).stdout.split()
+        if len(out) < 2:
+            return None
+        # time is [[dd-]hh:]mm:ss.ss
+        days, _, clock = out[1].rpartition('-')
+        cpu = 0.0
+        for part in clock.split(':'):
+            cpu = cpu * 60 + float(part)
+        cpu += int(days or 0) * 86400
+        threads = subprocess.run(['ps', '-M', '-p', str(pid)],
+                                 capture_output=True, text=True).stdout.count('\n') - 1
+        return int(out[0]) * 1024, cpu, None, threads if threads > 0 else None
+    return None
+
+
+class GatewaySupervisor(threading.Thread):
+    """Keeps the gateway running for the whole session.
+
+    Restarts it with exponential backoff when it exits or stops accepting
+    connections, and samples its RSS, CPU time, fd and thread counts into
+    a CSV in the state dir (GATEWAY_METRICS) for chasing leaks in long runs.
+    """
+
+    def __init__(self, logger, spawn, metrics_path, port=GATEWAY_PORT):
+        super().__init__(name='ocbot-gateway-supervisor', daemon=True)
+        self.logger = logger
+        self.spawn = spawn
+        self.metrics_path = Path(metrics_path)
+        self.port = port
+        self.proc = None
+        self.restarts = 0
+        self._stop_event = threading.Event()
+
+    def launch(self):
+        """Start a gateway process. Returns (proc, ready event, stale port flag)."""
+        self.proc, ready, stale = self.spawn()
+        return self.proc, ready, stale
+
+    def stop(self):
+        """Stop supervising and the gateway; waits for a restart in progress."""
+        self._stop_event.set()
+        _stop(self.proc, 'embedded OpenClaw gateway', self.logger)
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(GATEWAY_STOP_JOIN)
+            # A restart may have replaced the process after the first _stop
+            _stop(self.proc, 'embedded OpenClaw gateway', self.logger)
+
+    def _write_sample(self, writer, f):
+        try:
+            sample = _sample_process(self.proc.pid)
+        except (OSError, ValueError, IndexError):
+            sample = None
+        if sample is None:
+            return
+        rss, cpu, fds, threads = sample
+        writer.writerow([time.strftime('%Y-%m-%dT%H:%M:%S'), self.proc.pid, self.restarts,
+                         round(rss / (1024 * 1024), 1), round(cpu, 2),
+                         '' if fds is None else fds, '' if threads is None else threads])
+        f.flush()
+
+    def _restart(self, reason):
+        """Restart the gateway with backoff until one becomes ready or stop() is called."""
+        while not self._stop_event.is_set():
+            delay = min(GATEWAY_RESTART_MAX_DELAY, 2 ** min(self._failures, 10))
+            self._failures += 1
+            self.logger.error(f"OpenClaw gateway {reason}; restarting in {delay}s")
+            if self._stop_event.wait(delay):
+                return
+            _stop(self.proc, 'unresponsive OpenClaw gateway', self.logger)
+            try:
+                proc, ready, stale = self.launch()
+            except OSError as e:
+                reason = f"failed to start ({e})"
+                continue
+            self.restarts += 1
+            self._up_since = None
+            if self._stop_event.is_set():
+                _stop(proc, 'embedded OpenClaw gateway', self.logger)
+                return
+            if _wait_for_gateway(self.logger, proc, ready, port=self.port, stale=stale):
+                self._up_since = time.monotonic()
+                return
+            code = proc.poll()
+            reason = (f"exited with code {code}" if code is not None
+                      else f"did not become ready on port {self.port}")
+
+    def run(self):
+        self._failures = 0
+        self._up_since = time.monotonic() if _port_open(self.port) else None
+        misses = 0
+        new_file = not self.metrics_path.exists()
+        self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.metrics_path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(['time', 'pid', 'restarts', 'rss_mb', 'cpu_s', 'fds', 'threads'])
+            while not self._stop_event.wait(GATEWAY_CHECK_INTERVAL):
+                code = self.proc.poll()
+                if code is not None:
+                    misses = 0
+                    self._restart(f"exited with code {code}")
+                    continue
+                if _port_open(self.port):
+                    misses = 0
+                    if self._up_since is None:
+                        self._up_since = time.monotonic()
+                    # A gateway that stayed up for a while resets the backoff
+                    if time.monotonic() - self._up_since > GATEWAY_STABLE_AFTER:
+                        self._failures = 0
+                else:
+                    misses += 1
+                    if self._up_since is not None and misses >= GATEWAY_MAX_MISSES:
+                        misses = 0
+                        self._restart(f"stopped accepting connections on port {self.port}")
+                        continue
+                self._write_sample(writer, f)
+
+
+def _browser_command(logger, executable, extra_args):
+    cmd = [str(executable)]
+
+    extension_dev_path = get_agent_root() / '.output' / 'chrome-mv3'
+    if extension_dev_path.exists():
+        cmd.append(f'--ocbot-extension-dir={extension_dev_path}')
+
+    cmd.append('--remote-debugging-port=9222')
+
+    if extra_args:
+        cmd.extend(extra_args)
+
+    # Default dev profile
+    has_user_data_dir = any(a.startswith('--user-data-dir') for a in cmd)
+    if not has_user_data_dir:
+        dev_profile = Path(tempfile.gettempdir()) / "ocbot-dev-profile"
+        dev_profile.mkdir(parents=True, exist_ok=True)
+        cmd.append(f"--user-data-dir={dev_profile}")
+        logger.info(f"Using dev profile: {dev_profile}")
+    return cmd
 
-    return proc
+
+def _stop(proc, name, logger):
+    if proc and proc.poll() is None:
+        logger.info(f'Stopping {name}...')
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
 
 
 def run_ocbot(src_dir=None, official=False, extra_args=None, update_web=False):
     """Start embedded OpenClaw gateway and launch Ocbot browser.
 
+    The launch runs as a step graph: the extension sync and the browser
+    don't wait for the gateway, and the gateway's dependency preparation
+    and boot overlap with them.  Gateway readiness is reported when it
+    happens; a timeline of the steps is logged once everything is up.
+
     Args:
         src_dir: Chromium source directory (auto-detected if None).
         official: Use Official build output instead of Default.
         extra_args: Additional command-line arguments for the browser.
         update_web: Build extension before running.
     """
+    from dag import Step, run_steps
+
     logger = get_logger()
 
     if src_dir is None:
@@ -288,49 +745,76 @@ def run_ocbot(src_dir=None, official=False, extra_args=None, update_web=False):
         logger.info("Please build first: python ocbot/scripts/dev.py build")
         return
 
-    # --- Start embedded gateway ---
+    # --- Locate embedded gateway ---
     node_path, openclaw_dir = _find_embedded_runtime(out_dir)
     if not node_path:
         logger.error("No embedded runtime found. Run 'dev.py build' first.")
         return
+    extensions_dir = openclaw_dir / 'extensions'
 
-    logger.info('Starting embedded OpenClaw gateway...')
-    gateway_proc = _start_embedded_runtime(logger, out_dir)
-
-    # --- Build browser command ---
-    cmd = [str(executable)]
-
-    _sync_extension(logger, out_dir)
-
-    extension_dev_path = get_agent_root() / '.output' / 'chrome-mv3'
-    if extension_dev_path.exists():
-        cmd.append(f'--ocbot-extension-dir={extension_dev_path}')
-
-    cmd.append('--remote-debugging-port=9222')
-
-    if extra_args:
-        cmd.extend(extra_args)
-
-    # Default dev profile
-    has_user_data_dir = any(a.startswith('--user-data-dir') for a in cmd)
-    if not has_user_data_dir:
-        dev_profile = Path(tempfile.gettempdir()) / "ocbot-dev-profile"
-        dev_profile.mkdir(parents=True, exist_ok=True)
-        cmd.append(f"--user-data-dir={dev_profile}")
-        logger.info(f"Using dev profile: {dev_profile}")
-
-    logger.info(f"Launching Ocbot...")
-    logger.info(f"Command: {' '.join(cmd)}")
+    launched = {}
+
+    def _launch_browser():
+        cmd = _browser_command(logger, executable, extra_args)
+        logger.info(f"Launching Ocbot...")
+        logger.info(f"Command: {' '.join(cmd)}")
+        launched['browser'] = subprocess.Popen(cmd)
+
+    def _launch_gateway():
+        env, _ = results['gateway-config'].result
+        supervisor = GatewaySupervisor(
+            logger, lambda: _spawn_gateway(logger, node_path, openclaw_dir, env),
+            get_ocbot_state_dir() / GATEWAY_METRICS)
+        launched['gateway'] = supervisor
+        return supervisor.launch()
+
+    def _gateway_ready():
+        proc, ready, stale = results['gateway-start'].result
+        ok = _wait_for_gateway(logger, proc, ready, stale=stale)
+        if not ok:
+            _, config_file = results['gateway-config'].result
+            exit_code = proc.poll()
+            if exit_code is not None:
+                logger.error(f"OpenClaw gateway exited with code {exit_code}. Check config: {config_file}")
+            else:
+                logger.error("OpenClaw gateway did not become ready (timed out)")
+                proc.terminate()
+        # Supervise either way: a failed start is retried with backoff
+        launched['gateway'].start()
+        return ok
+
+    steps = [
+        Step('extension-sync', lambda: _sync_extension(logger, out_dir)),
+        Step('browser-start', _launch_browser, deps=['extension-sync']),
+        Step('gateway-config', lambda: _gateway_environment(logger, openclaw_dir)),
+        # In dev builds node_modules are not included; this handles
+        # extraction, symlinking from source, or npm install as needed.
+        Step('extension-deps', lambda: _ensure_extension_deps(
+                 logger, extensions_dir, results['gateway-config'].result[1]),
+             deps=['gateway-config']),
+        Step('gateway-start', _launch_gateway, deps=['extension-deps']),
+        Step('gateway-ready', _gateway_ready, deps=['gateway-start']),
+    ]
+    results = {step.name: step for step in steps}
 
+    stop_watch = threading.Event()
     try:
-        subprocess.run(cmd)
+        try:
+            run_steps(steps, cpu_budget=len(steps), logger=logger)
+        except Exception as e:
+            logger.error(f"Launch failed: {e}")
+            if 'browser' not in launched:
+                return
+        if results['extension-deps'].result:
+            _, config_file = results['gateway-config'].result
+            threading.Thread(target=_watch_channel_config,
+                             args=(logger, extensions_dir, config_file, stop_watch),
+                             name='ocbot-channel-deps', daemon=True).start()
+        launched['browser'].wait()
     except KeyboardInterrupt:
         logger.info('Stopping Ocbot...')
     finally:
-        if gateway_proc and gateway_proc.poll() is None:
-            logger.info('Stopping embedded OpenClaw gateway...')
-            gateway_proc.terminate()
-            try:
-                gateway_proc.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                gateway_proc.kill()
+        stop_watch.set()
+        _stop(launched.get('browser'), 'Ocbot', logger)
+        if 'gateway' in launched:
+            launched['gateway'].stop()
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import os
+import zipfile
+
+import pytest
+
+import build_runtime
+from archive import iter_entries, write_tar_gz, write_zip
+from package import _portable_files
+
+
+@pytest.fixture
+def out_dir(tmp_path):
+    """A synthetic Windows out dir, with a symlinked directory and file."""
+    out = tmp_path / 'out'
+    (out / 'locales').mkdir(parents=True)
+    (out / 'locales' / 'en-US.pak').write_bytes(b'en' * 1000)
+    (out / 'ocbot.exe').write_bytes(b'MZ' + os.urandom(4096))
+    (out / 'icudtl.dat').write_bytes(b'\0' * 8192)
+    shared = tmp_path / 'shared-resources'
+    (shared / 'ocbot' / 'ext').mkdir(parents=True)
+    (shared / 'ocbot' / 'ext' / 'manifest.json').write_text('{"name": "ocbot"}')
+    (shared / 'top.txt').write_text('top')
+    (out / 'resources').symlink_to(shared, target_is_directory=True)
+    (out / 'locales' / 'fr.pak').symlink_to(out / 'locales' / 'en-US.pak')
+    return out
+
+
+def test_iter_entries_keeps_symlinks_unless_following(out_dir):
+    entries = [(out_dir, 'out')]
+    arcnames = [a for _, a in iter_entries(entries, include_dirs=False)]
+    assert 'out/resources' in arcnames
+    assert 'out/resources/top.txt' not in arcnames
+
+    followed = [a for _, a in iter_entries(entries, include_dirs=False, follow_symlinks=True)]
+    assert 'out/resources' not in followed
+    assert 'out/resources/ocbot/ext/manifest.json' in followed
+
+
+def test_write_zip_from_out_dir(out_dir, tmp_path):
+    dest = tmp_path / 'portable.zip'
+    files = _portable_files(out_dir)
+    path, sha256, size = write_zip(dest, files)
+
+    assert path == dest and size == dest.stat().st_size
+    with zipfile.ZipFile(dest) as zf:
+        assert zf.testzip() is None
+        assert sorted(zf.namelist()) == [
+            'icudtl.dat', 'locales/en-US.pak', 'locales/fr.pak', 'ocbot.exe',
+            'resources/ocbot/ext/manifest.json', 'resources/top.txt',
+        ]
+        assert zf.read('locales/fr.pak') == (out_dir / 'locales' / 'en-US.pak').read_bytes()
+        assert zf.read('resources/top.txt') == b'top'
+
+
+def test_write_zip_failure_leaves_no_part_file(out_dir, tmp_path):
+    (out_dir / 'locales' / 'broken.pak').symlink_to(tmp_path / 'missing')
+    dest = tmp_path / 'portable.zip'
+    with pytest.raises(FileNotFoundError):
+        write_zip(dest, [(out_dir, 'out')])
+    assert not dest.exists()
+    assert not dest.with_name(dest.name + '.part').exists()
+
+
+def test_write_zip_rejects_symlink_loops(tmp_path):
+    root = tmp_path / 'root'
+    (root / 'sub').mkdir(parents=True)
+    (root / 'sub' / 'up').symlink_to(root, target_is_directory=True)
+    with pytest.raises(ValueError):
+        write_zip(tmp_path / 'loop.zip', [(root, 'root')])
+    assert list(tmp_path.iterdir()) == [root]
+
+
+def test_layer_manifest_uses_digests_from_the_tar_write(tmp_path, monkeypatch):
+    src = tmp_path / 'node_modules'
+    (src / 'pkg').mkdir(parents=True)
+    (src / 'pkg' / 'index.js').write_text('module.exports = 1;\n')
+    (src / 'pkg' / 'big.bin').write_bytes(os.urandom(300_000))
+    (src / 'pkg' / 'alias.js').symlink_to('index.js')
+    entries = [(src, 'node_modules')]
+
+    digests = {}
+    write_tar_gz(tmp_path / 'layer.tar.gz', entries, digests=digests)
+    assert digests == {
+        f'node_modules/pkg/{name}': hashlib.sha256((src / 'pkg' / name).read_bytes()).hexdigest()
+        for name in ('big.bin', 'index.js')
+    }
+
+    def _no_reread(path):
+        raise AssertionError(f"{path} was read again")
+
+    monkeypatch.setattr(build_runtime, 'sha256_file', _no_reread)
+    meta = build_runtime._write_layer_metadata(entries, tmp_path / 'layer.tar.gz', 'base-1', None,
+                                               digests)
+    files = {f['path']: f for f in json.loads(meta['manifest'].read_text())['files']}
+    assert files['node_modules/pkg/index.js']['sha256'] == digests['node_modules/pkg/index.js']
+    assert files['node_modules/pkg/alias.js'] == {'path': 'node_modules/pkg/alias.js',
+                                                  'link': 'index.js'}
@@ -0,0 +1,176 @@
+import os
+import shutil
+import subprocess
+import types
+
+import pytest
+
+import build
+from build import _get_source_state
+
+
+def _git(repo, *args):
+    subprocess.run(['git', '-c', 'user.name=t', '-c', 'user.email=t@example.com', *args],
+                   cwd=repo, check=True, capture_output=True)
+
+
+def _touch(path, ns):
+    os.utime(path, ns=(ns, ns))
+
+
+@pytest.fixture
+def checkout(tmp_path):
+    (tmp_path / 'xx').mkdir()
+    (tmp_path / 'xx' / 'foo.txt').write_text('moved')
+    (tmp_path / 'foo.txt').write_text('clean')
+    (tmp_path / 'edited.cc').write_text('int a;')
+    _git(tmp_path, 'init', '-q')
+    _git(tmp_path, 'add', '-A')
+    _git(tmp_path, 'commit', '-q', '-m', 'base')
+    return tmp_path
+
+
+def test_source_state_tracks_edits(checkout):
+    head, clean = _get_source_state(checkout)
+    assert head and clean
+    (checkout / 'edited.cc').write_text('int b;')
+    _, edited = _get_source_state(checkout)
+    assert edited != clean
+    _touch(checkout / 'edited.cc', 10**18)
+    assert _get_source_state(checkout)[1] != edited
+
+
+def test_source_state_ignores_untracked_files(checkout):
+    before = _get_source_state(checkout)
+    (checkout / 'scratch.txt').write_text('untracked')
+    assert _get_source_state(checkout) == before
+
+
+def test_source_state_rename_does_not_stat_mangled_old_path(checkout):
+    _git(checkout, 'mv', 'xx/foo.txt', 'bar.txt')
+    _, renamed = _get_source_state(checkout)
+    # "xx/foo.txt" minus its first three bytes is the unrelated foo.txt
+    _touch(checkout / 'foo.txt', 10**18)
+    assert _get_source_state(checkout)[1] == renamed
+    _touch(checkout / 'bar.txt', 10**18)
+    assert _get_source_state(checkout)[1] != renamed
+
+
+def _args(**kwargs):
+    defaults = dict(official=False, arch='arm64', variant=None, jobs=None, target='chrome',
+                    src_dir=None)
+    return types.SimpleNamespace(**dict(defaults, **kwargs))
+
+
+@pytest.mark.parametrize('failing', ['_install_extension', '_install_node',
+                                     '_install_openclaw_runtime'])
+def test_failed_install_fails_the_target(monkeypatch, tmp_path, failing):
+    calls = []
+    for name in ('_install_extension', '_install_node', '_install_openclaw_runtime'):
+        def _install(logger, out_dir, official=False, _name=name):
+            calls.append(_name)
+            return _name != failing
+        monkeypatch.setattr(build, name, _install)
+    monkeypatch.setattr(build, 'sync_extension_version', lambda: None)
+
+    assert not build._install_target(build.get_logger(), _args(), tmp_path, None)
+    # The other installs still run
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize('jobs', [None, 7])
+def test_single_target_passes_jobs_to_ninja(monkeypatch, tmp_path, jobs):
+    seen = {}
+    monkeypatch.setattr(build, '_prepare_out_dir',
+                        lambda args, arch: (tmp_path, tmp_path / 'out', {}, False))
+
+    def _run_ninja(args, src_dir, out_dir, fingerprint, jobs=None, on_progress=None):
+        seen['jobs'] = jobs
+        return True
+
+    monkeypatch.setattr(build, '_run_ninja', _run_ninja)
+    assert build._build_single_arch(_args(jobs=jobs), 'arm64')
+    assert seen['jobs'] == jobs
+
+
+THIN = b'\xcf\xfa\xed\xfe' + b'\x0c\x00\x00\x01' + b'\x00' * 24
+FAT = b'\xca\xfe\xba\xbe' + b'\x00\x00\x00\x02' + b'\x00' * 24
+JAVA_CLASS = b'\xca\xfe\xba\xbe' + b'\x00\x00\x00\x34' + b'\x00' * 24
+
+
+@pytest.mark.parametrize('data, kind', [
+    (THIN, 'thin'),
+    (b'\xce\xfa\xed\xfe' + b'\x00' * 4, 'thin'),
+    (FAT, 'fat'),
+    (b'\xbe\xba\xfe\xca' + b'\x02\x00\x00\x00', 'fat'),
+    (JAVA_CLASS, None),
+    (b'\xca\xfe\xba\xbe', None),
+    (b'#!/bin/sh\n', None),
+    (b'', None),
+])
+def test_macho_kind(tmp_path, data, kind):
+    path = tmp_path / 'f'
+    path.write_bytes(data)
+    assert build.macho_kind(path) == kind
+
+
+def test_macho_kind_missing_file(tmp_path):
+    assert build.macho_kind(tmp_path / 'missing') is None
+
+
+def _bundle(root, files):
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return root
+
+
+def test_lipo_merge_with_stub_merger(tmp_path):
+    binary = 'Contents/MacOS/Ocbot'
+    framework = 'Contents/Frameworks/Ocbot.framework/Ocbot'
+    arm64 = _bundle(tmp_path / 'arm64.app', {
+        binary: THIN, framework: THIN,
+        'Contents/Helpers/already_fat': FAT,
+        'Contents/Helpers/arm64_only': THIN,
+        'Contents/Helpers/x64_not_macho': THIN,
+        'Contents/Resources/Ocbot.class': JAVA_CLASS,
+        'Contents/Info.plist': b'<plist/>',
+        'Contents/Helpers/broken': THIN,
+    })
+    x64 = _bundle(tmp_path / 'x64.app', {
+        binary: THIN, framework: THIN,
+        'Contents/Helpers/already_fat': FAT,
+        'Contents/Helpers/x64_not_macho': b'text',
+        'Contents/Resources/Ocbot.class': JAVA_CLASS,
+        'Contents/Info.plist': b'<plist/>',
+        'Contents/Helpers/broken': THIN,
+    })
+    universal = tmp_path / 'universal.app'
+    shutil.copytree(arm64, universal, symlinks=True)
+    os.symlink('Ocbot', universal / 'Contents/MacOS/link')
+
+    calls = []
+
+    def merge(arm64_path, x64_path, output_path):
+        calls.append((arm64_path, x64_path, output_path))
+        if output_path.name == 'broken':
+            raise subprocess.CalledProcessError(1, 'lipo', stderr='bad architecture\n')
+        output_path.write_bytes(FAT)
+
+    merged, skipped, failed = build._lipo_merge(build.get_logger(), universal, arm64, x64,
+                                                merge=merge, jobs=2)
+
+    assert sorted(map(str, merged)) == sorted([binary, framework])
+    assert dict((str(rel), reason) for rel, reason in skipped) == {
+        'Contents/Helpers/already_fat': 'already universal in arm64 build',
+        'Contents/Helpers/arm64_only': 'missing from x64 build',
+        'Contents/Helpers/x64_not_macho': 'x64 counterpart is not a thin Mach-O',
+    }
+    assert [(str(rel), reason) for rel, reason in failed] == [
+        ('Contents/Helpers/broken', 'bad architecture')]
+    assert len(calls) == 3
+    for arm64_path, x64_path, output_path in calls:
+        rel = output_path.relative_to(universal)
+        assert (arm64_path, x64_path) == (arm64 / rel, x64 / rel)
+    assert build.macho_kind(universal / binary) == 'fat'
@@ -0,0 +1,55 @@
+import threading
+import types
+
+import pytest
+
+import dev
+from dag import Step, run_steps
+
+
+def test_run_steps_respects_dependencies():
+    order = []
+    steps = [
+        Step('b', lambda: order.append('b'), deps=['a']),
+        Step('a', lambda: order.append('a')),
+    ]
+    results = run_steps(steps, cpu_budget=4, report=False)
+    assert order == ['a', 'b']
+    assert set(results) == {'a', 'b'}
+
+
+def test_run_steps_skips_dependents_of_failed_step():
+    def _fail():
+        raise RuntimeError('boom')
+
+    steps = [Step('a', _fail), Step('b', lambda: None, deps=['a'])]
+    with pytest.raises(RuntimeError):
+        run_steps(steps, cpu_budget=4, report=False)
+    assert [s.status for s in steps] == ['failed', 'skipped']
+
+
+@pytest.mark.parametrize('cpu_budget', [2, 4, 16])
+def test_build_all_starts_chromium_while_node_download_runs(monkeypatch, tmp_path, cpu_budget):
+    chromium_started = threading.Event()
+    seen = {}
+
+    # Both only finish once Chromium is running, or time out
+    def _node_download(logger):
+        seen['node'] = chromium_started.wait(10)
+
+    def _build_extension(logger, zip=True):
+        seen['extension'] = chromium_started.wait(10)
+
+    def _build_chromium(args, install_ready=None):
+        chromium_started.set()
+        return install_ready()
+
+    monkeypatch.setattr(dev, 'fetch_node_archive', _node_download)
+    monkeypatch.setattr(dev, 'build_chromium', _build_chromium)
+    monkeypatch.setattr(dev, '_build_extension', _build_extension)
+    monkeypatch.setattr(dev, 'install_icons', lambda src, dest: None)
+    monkeypatch.setattr(dev, 'get_build_out_dirs', lambda args: [tmp_path / 'out'])
+
+    args = types.SimpleNamespace(src_dir=str(tmp_path), cpu_budget=cpu_budget)
+    dev._build_all(args, dev.get_logger())
+    assert seen == {'node': True, 'extension': True}
@@ -0,0 +1,16 @@
+import pytest
+
+from layer_report import ROOT_PACKAGE, package_of
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('lib/node_modules/openclaw/package.json', 'openclaw'),
+    ('lib/node_modules/@scope/pkg/index.js', '@scope/pkg'),
+    ('node_modules/a/node_modules/b/index.js', 'a'),
+    ('node_modules/.package-lock.json', ROOT_PACKAGE),
+    ('lib/node_modules/.package-lock.json', ROOT_PACKAGE),
+    ('bin/node', None),
+    ('node_modules', None),
+])
+def test_package_of(path, expected):
+    assert package_of(path) == expected
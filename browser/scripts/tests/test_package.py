@@ -0,0 +1,102 @@
+import os
+import shlex
+import sys
+import textwrap
+
+import package
+
+# Records "start <path>" / "end <path>" for every signing call, with a short
+# pause in between so concurrently signed targets overlap.
+STUB_CODESIGN = textwrap.dedent('''
+    import sys, time
+    log, args = sys.argv[1], sys.argv[2:]
+    def record(event):
+        with open(log, 'a') as f:
+            f.write(event + '\\n')
+    if '--verify' in args:
+        record('verify ' + args[-1])
+        sys.exit(0)
+    tag = ' entitlements' if '--entitlements' in args else ''
+    record('start ' + args[-1] + tag)
+    time.sleep(0.05)
+    record('end ' + args[-1])
+''')
+
+
+def _executable(path, data=b'\xcf\xfa\xed\xfe'):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    path.chmod(0o755)
+
+
+def _app_bundle(root):
+    app = root / 'Ocbot.app'
+    framework = app / 'Contents' / 'Frameworks' / 'Ocbot Framework.framework'
+    version = framework / 'Versions' / 'A'
+    _executable(app / 'Contents' / 'MacOS' / 'Ocbot')
+    _executable(version / 'Ocbot Framework')
+    _executable(version / 'Libraries' / 'libEGL.dylib')
+    _executable(version / 'Libraries' / 'libGLESv2.dylib')
+    _executable(version / 'Helpers' / 'chrome_crashpad_handler')
+    for helper in ('Ocbot Helper', 'Ocbot Helper (Renderer)'):
+        _executable(version / 'Helpers' / f'{helper}.app' / 'Contents' / 'MacOS' / helper)
+    (version / 'Resources').mkdir()
+    # Framework layout: the same files are reachable through symlinks
+    os.symlink('A', framework / 'Versions' / 'Current')
+    for name in ('Ocbot Framework', 'Libraries', 'Helpers', 'Resources'):
+        os.symlink(f'Versions/Current/{name}', framework / name)
+    return app
+
+
+def test_sign_app_signs_nested_code_before_its_container(monkeypatch, tmp_path):
+    app = _app_bundle(tmp_path)
+    stub = tmp_path / 'codesign.py'
+    stub.write_text(STUB_CODESIGN)
+    log = tmp_path / 'codesign.log'
+    monkeypatch.setenv('OCBOT_CODESIGN', shlex.join([sys.executable, str(stub), str(log)]))
+
+    package.sign_app(app, 'Developer ID Application: Test', entitlements=tmp_path / 'e.plist',
+                     jobs=4)
+
+    events = log.read_text().splitlines()
+    assert events[-1] == f'verify {app}'
+    starts = {}
+    ends = {}
+    entitled = set()
+    for i, event in enumerate(events[:-1]):
+        kind, path = event.split(' ', 1)
+        if path.endswith(' entitlements'):
+            path = path[:-len(' entitlements')]
+            entitled.add(path)
+        target = starts if kind == 'start' else ends
+        assert path not in target, f'{path} signed twice'
+        target[path] = i
+
+    version = app.resolve() / 'Contents/Frameworks/Ocbot Framework.framework/Versions/A'
+    framework = version.parent.parent
+    helper = version / 'Helpers' / 'Ocbot Helper.app'
+    expected = {
+        version / 'Libraries' / 'libEGL.dylib',
+        version / 'Libraries' / 'libGLESv2.dylib',
+        version / 'Helpers' / 'chrome_crashpad_handler',
+        helper / 'Contents' / 'MacOS' / 'Ocbot Helper',
+        helper,
+        version / 'Helpers' / 'Ocbot Helper (Renderer).app',
+        version / 'Helpers' / 'Ocbot Helper (Renderer).app' / 'Contents' / 'MacOS'
+        / 'Ocbot Helper (Renderer)',
+        framework,
+        app.resolve() / 'Contents' / 'MacOS' / 'Ocbot',
+        app.resolve(),
+    }
+    assert set(starts) == set(ends) == {str(p) for p in expected}
+    assert {p for p in entitled if p.endswith('.dylib') or p == str(framework)} == set()
+    assert str(helper) in entitled
+
+    for inner in expected:
+        for outer in expected:
+            if outer in inner.parents:
+                assert ends[str(inner)] < starts[str(outer)], f'{outer} signed before {inner}'
+
+    # Independent targets were signed concurrently
+    first_end = min(ends.values())
+    assert sum(1 for i in starts.values() if i < first_end) > 1
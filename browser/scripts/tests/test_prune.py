@@ -0,0 +1,59 @@
+import json
+import shutil
+import sys
+
+import pytest
+
+from prune import prune_node_modules
+
+needs_node = pytest.mark.skipif(not shutil.which('node'), reason='node not installed')
+
+
+def _write(path, text=''):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+@pytest.fixture
+def node_modules(tmp_path):
+    nm = tmp_path / 'node_modules'
+    pkg = nm / 'lazy'
+    _write(pkg / 'package.json', json.dumps({'name': 'lazy', 'main': 'index.js'}))
+    _write(pkg / 'index.js', "module.exports = () => require('./lib/spec/loader.js');\n"
+                             "require('./lib/history.js');\n")
+    _write(pkg / 'lib' / 'spec' / 'loader.js', 'module.exports = 1;\n')
+    _write(pkg / 'lib' / 'history.js', 'module.exports = 2;\n')
+    _write(pkg / 'lib' / 'entry.ts', 'export const a = 1;\n')
+    _write(pkg / 'lib' / 'index.d.ts', 'export {};\n')
+    _write(pkg / 'test' / 'index.test.js', '')
+    _write(pkg / 'docs' / 'guide.md', '')
+    _write(pkg / 'README.md', '')
+    _write(nm / '@scope' / 'esm' / 'package.json',
+           json.dumps({'name': '@scope/esm', 'type': 'module', 'exports': './index.js'}))
+    _write(nm / '@scope' / 'esm' / 'index.js', 'export default 1;\n')
+    return nm
+
+
+def _files(nm):
+    return sorted(p.relative_to(nm).as_posix() for p in nm.rglob('*') if p.is_file())
+
+
+def test_default_rules_only_touch_package_root_and_declarations(node_modules):
+    prune_node_modules(node_modules, platform=sys.platform, config={}, verify=False)
+    assert _files(node_modules) == [
+        '@scope/esm/index.js', '@scope/esm/package.json',
+        'lazy/index.js', 'lazy/lib/entry.ts', 'lazy/lib/history.js',
+        'lazy/lib/spec/loader.js', 'lazy/package.json',
+    ]
+
+
+@needs_node
+def test_load_check_passes_when_nothing_breaks(node_modules):
+    prune_node_modules(node_modules, platform=sys.platform, config={})
+
+
+@needs_node
+def test_load_check_fails_when_pruning_breaks_a_require(node_modules):
+    config = {'packages': {'lazy': {'remove': ['lib/history.js']}}}
+    with pytest.raises(RuntimeError, match='lazy'):
+        prune_node_modules(node_modules, platform=sys.platform, config=config)
@@ -0,0 +1,152 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import release
+from r2_local import LocalR2Client
+
+
+@pytest.fixture
+def client(tmp_path):
+    return LocalR2Client(tmp_path / 'r2')
+
+
+def _artifact(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_upload_artifacts_keeps_artifacts_with_the_same_name(client, tmp_path):
+    arm64 = _artifact(tmp_path / 'arm64' / 'Ocbot.dmg', b'arm64')
+    x64 = _artifact(tmp_path / 'x64' / 'Ocbot.dmg', b'x64')
+    uploaded = release.upload_artifacts(client, [
+        (arm64, 'releases/1.0/arm64/Ocbot.dmg', None),
+        (x64, 'releases/1.0/x64/Ocbot.dmg', None),
+    ])
+    assert sorted(uploaded) == ['releases/1.0/arm64/Ocbot.dmg', 'releases/1.0/x64/Ocbot.dmg']
+    assert {info['name'] for info in uploaded.values()} == {'Ocbot.dmg'}
+    assert uploaded['releases/1.0/x64/Ocbot.dmg']['size'] == 3
+
+    release.record_version_index(client, '1.0', uploaded)
+    index, _ = release.read_manifest(client, 'releases/1.0/index.json')
+    assert index['artifacts'] == json.loads(json.dumps(uploaded))
+
+
+def test_release_browser_records_each_uploaded_artifact(monkeypatch, tmp_path):
+    import artifact_stats
+    import subprocess
+
+    dist = tmp_path / 'dist'
+    _artifact(dist / 'Ocbot-1.0.dmg', b'dmg')
+    _artifact(dist / 'Ocbot-1.0-win-x64-portable.zip', b'zip')
+    monkeypatch.setattr(release, 'get_project_root', lambda: tmp_path)
+    monkeypatch.setattr(artifact_stats, 'get_project_root', lambda: tmp_path)
+    monkeypatch.setattr(release, 'get_product_version', lambda: '1.0')
+    monkeypatch.setattr(release.shutil, 'which', lambda name: '/usr/bin/' + name)
+    monkeypatch.setattr(release.subprocess, 'run',
+                        lambda *a, **kw: subprocess.CompletedProcess(a, 1, '', ''))
+    monkeypatch.setattr(release, 'run_command', lambda cmd: None)
+    uploads = []
+    monkeypatch.setattr(release, 'upload_to_r2', lambda files, *a: uploads.append(files))
+
+    release.release_browser(None)
+
+    assert [p.name for p in uploads[0]] == ['Ocbot-1.0.dmg', 'Ocbot-1.0-win-x64-portable.zip']
+    history = artifact_stats.load_history()
+    assert [(h['artifact'], h['file']) for h in history] == [
+        ('release-dmg', 'Ocbot-1.0.dmg'),
+        ('release-win-portable', 'Ocbot-1.0-win-x64-portable.zip'),
+    ]
+    assert set(history[0]['phases']) == {'github', 'r2'}
+
+
+def test_concurrent_update_manifest_keeps_every_update(client):
+    release.update_manifest(client, lambda m: m.update(existing=True), 'latest.json')
+    writers = 4
+    barrier = threading.Barrier(writers)
+    calls = []
+
+    def mutate(manifest, name):
+        calls.append(name)
+        manifest[name] = True
+        # Every writer holds the same ETag before anyone writes, so all but
+        # one conditional PUT fails and has to re-read and re-apply
+        if calls.count(name) == 1:
+            barrier.wait(timeout=10)
+
+    def _update(name):
+        release.update_manifest(client, lambda m: mutate(m, name), 'latest.json')
+
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        list(pool.map(_update, [f'writer-{i}' for i in range(writers)]))
+
+    manifest, _ = release.read_manifest(client, 'latest.json')
+    assert manifest == dict({'existing': True}, **{f'writer-{i}': True for i in range(writers)})
+    assert len(calls) > writers
+
+
+def test_update_manifest_gives_up_after_max_attempts(client, monkeypatch):
+    monkeypatch.setattr(release, 'MANIFEST_UPDATE_ATTEMPTS', 2)
+    monkeypatch.setattr(release.time, 'sleep', lambda s: None)
+    release.update_manifest(client, lambda m: m.update(v=0), 'latest.json')
+
+    def mutate(manifest):
+        # Another runner writes between our read and our conditional PUT
+        client.put_object(Bucket=release.R2_BUCKET, Key='latest.json',
+                          Body=json.dumps({'v': manifest['v'] + 1}))
+        manifest['v'] = -1
+
+    with pytest.raises(Exception) as excinfo:
+        release.update_manifest(client, mutate, 'latest.json')
+    assert release._is_precondition_failed(excinfo.value)
+    assert release.read_manifest(client, 'latest.json')[0] == {'v': 2}
+
+
+def _count_uploads(client, monkeypatch):
+    keys = []
+    upload_file = client.upload_file
+
+    def _upload_file(Filename, Bucket, Key, **kwargs):
+        keys.append(Key)
+        return upload_file(Filename, Bucket, Key, **kwargs)
+    monkeypatch.setattr(client, 'upload_file', _upload_file)
+    return keys
+
+
+def test_upload_artifacts_skips_objects_with_the_same_sha256(client, monkeypatch, tmp_path):
+    keys = _count_uploads(client, monkeypatch)
+    dmg = _artifact(tmp_path / 'Ocbot.dmg', b'v1')
+    first = release.upload_artifacts(client, [(dmg, 'releases/1.0/Ocbot.dmg', None)])
+    assert keys == ['releases/1.0/Ocbot.dmg']
+
+    # A re-run of the same release is answered by a HEAD request
+    assert release.upload_artifacts(client, [(dmg, 'releases/1.0/Ocbot.dmg', None)]) == first
+    assert keys == ['releases/1.0/Ocbot.dmg']
+
+    dmg.write_bytes(b'v2')
+    second = release.upload_artifacts(client, [(dmg, 'releases/1.0/Ocbot.dmg', None)])
+    assert keys == ['releases/1.0/Ocbot.dmg'] * 2
+    assert second['releases/1.0/Ocbot.dmg']['sha256'] != first['releases/1.0/Ocbot.dmg']['sha256']
+
+
+def test_upload_artifacts_stores_keyless_files_as_immutable_blobs(client, monkeypatch, tmp_path):
+    keys = _count_uploads(client, monkeypatch)
+    layer = _artifact(tmp_path / '1.0' / 'layer.tar.gz', b'layer')
+    same = _artifact(tmp_path / '1.1' / 'layer.tar.gz', b'layer')
+    sha256 = release.sha256_file(layer)
+
+    uploaded = release.upload_artifacts(client, [(layer, None, None)])
+    key = release.blob_key(sha256)
+    assert key == f'blobs/sha256/{sha256}'
+    assert uploaded == {key: {'name': 'layer.tar.gz', 'url': f'{release.R2_CDN_BASE}/{key}',
+                              'sha256': sha256, 'size': 5}}
+    head = client.head_object(Bucket=release.R2_BUCKET, Key=key)
+    assert head['CacheControl'] == release.R2_IMMUTABLE_CACHE_CONTROL
+    assert head['Metadata'] == {'sha256': sha256}
+
+    # Identical bytes from a later version reuse the blob
+    assert release.upload_artifacts(client, [(same, None, sha256)]) == uploaded
+    assert keys == [key]
@@ -0,0 +1,68 @@
+import io
+import tarfile
+
+import pytest
+
+import run
+
+
+def _tar(path, members):
+    """Write a tar.gz of (name, type, data or link target) members."""
+    with tarfile.open(path, 'w:gz') as tar:
+        for name, kind, payload in members:
+            info = tarfile.TarInfo(name)
+            info.type = kind
+            if kind == tarfile.REGTYPE:
+                info.size = len(payload)
+                tar.addfile(info, io.BytesIO(payload))
+            else:
+                info.linkname = payload
+                tar.addfile(info)
+    return path
+
+
+@pytest.fixture(params=['data_filter', 'manual'])
+def extract(request, monkeypatch):
+    """_safe_extract with and without tarfile's extraction filters."""
+    if request.param == 'manual':
+        monkeypatch.delattr(tarfile, 'data_filter', raising=False)
+    elif not hasattr(tarfile, 'data_filter'):
+        pytest.skip('tarfile has no extraction filters')
+
+    def _extract(archive, dest):
+        with tarfile.open(archive, 'r:gz') as tar:
+            run._safe_extract(tar, dest)
+    return _extract
+
+
+def test_safe_extract_keeps_relative_links(tmp_path, extract):
+    archive = _tar(tmp_path / 'deps.tar.gz', [
+        ('node_modules/pkg/cli.js', tarfile.REGTYPE, b'#!/usr/bin/env node\n'),
+        ('node_modules/.bin/pkg', tarfile.SYMTYPE, '../pkg/cli.js'),
+    ])
+    extract(archive, tmp_path / 'out')
+    link = tmp_path / 'out' / 'node_modules' / '.bin' / 'pkg'
+    assert link.is_symlink() and link.read_bytes() == b'#!/usr/bin/env node\n'
+
+
+@pytest.mark.parametrize('member', [
+    ('node_modules/../../evil.js', tarfile.REGTYPE, b'x'),
+    ('node_modules/.bin/evil', tarfile.SYMTYPE, '../../../evil'),
+    ('node_modules/.bin/evil', tarfile.SYMTYPE, '/etc/passwd'),
+    ('node_modules/evil', tarfile.LNKTYPE, '../outside'),
+])
+def test_safe_extract_rejects_escaping_members(tmp_path, extract, member):
+    archive = _tar(tmp_path / 'deps.tar.gz', [member])
+    with pytest.raises(tarfile.TarError):
+        extract(archive, tmp_path / 'out')
+
+
+def test_safe_extract_never_writes_absolute_paths(tmp_path, extract):
+    # The data filter strips the leading slash; the manual check refuses it
+    target = tmp_path / 'evil.js'
+    archive = _tar(tmp_path / 'deps.tar.gz', [(str(target), tarfile.REGTYPE, b'x')])
+    try:
+        extract(archive, tmp_path / 'out')
+    except tarfile.TarError:
+        pass
+    assert not target.exists()